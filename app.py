@@ -1,11 +1,25 @@
 import os
-import json
-import random
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 
 import streamlit as st
 from openai import OpenAI
 
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_index import CatalogIndex
+from giftai.catalog_source import CatalogSource
+from giftai.engine import (
+    build_description,
+    compute_weights,
+    local_scores,
+    plan_scoring_chunks,
+    request_openai_scores,
+    select_candidates,
+)
+from giftai.models import Recipient, RecommendRequest
+from giftai.ranking import rank_candidates
+from giftai.sessions import RankingSession, rerank_key
+
 # =====================================================
 # 🎁 GIFT AI – STREAMLIT ÖN YÜZ
 # =====================================================
@@ -100,293 +114,90 @@ if not OPENAI_API_KEY:
     )
     st.stop()
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Streamlit her widget etkileşiminde script'i baştan çalıştırır. Client,
+# katalog indeksi ve skorlar cache'lenir; böylece yeni bir hobi eklemek
+# soğuk kurulum maliyeti doğurmaz.
+SCORES_CACHE_TTL_S = int(os.getenv("GIFTAI_SCORE_CACHE_TTL_S", "600"))
+# API ile aynı aday seçimi: LLM'e yerel ön sıralamanın ilk K adayı, cevabı
+# GIFTAI_SCORING_MAX_OUTPUT_TOKENS'a sığan parçalar halinde eşzamanlı gider.
+PRERANK_K = int(os.getenv("GIFTAI_PRERANK_K", "20"))
+TAG_NARROWING = os.getenv("GIFTAI_TAG_NARROWING", "1") == "1"
+SCORING_MAX_OUTPUT_TOKENS = int(os.getenv("GIFTAI_SCORING_MAX_OUTPUT_TOKENS", "600"))
+SCORING_CONCURRENCY = int(os.getenv("GIFTAI_SCORING_CONCURRENCY", "4"))
 
-# -----------------------------------------------------
-# ✅ MODELLER
-# -----------------------------------------------------
-class Recipient:
-    def __init__(
-        self,
-        age: Optional[int],
-        gender: Optional[str],
-        relationship: Optional[str],
-        hobbies: List[str],
-        style_tags: List[str],
-    ):
-        self.age = age
-        self.gender = gender
-        self.relationship = relationship
-        self.hobbies = hobbies
-        self.style_tags = style_tags
-
-
-class RecommendRequest:
-    def __init__(
-        self,
-        recipient: Recipient,
-        purpose: str,
-        risk_level: str,
-        urgency: str,
-        budget_min: Optional[float],
-        budget_max: Optional[float],
-        free_text: str,
-        top_n: int,
-    ):
-        self.recipient = recipient
-        self.purpose = purpose
-        self.risk_level = risk_level
-        self.urgency = urgency
-        self.budget_min = budget_min
-        self.budget_max = budget_max
-        self.free_text = free_text
-        self.top_n = top_n
 
+@st.cache_resource
+def get_openai_client(api_key: str) -> OpenAI:
+    return OpenAI(api_key=api_key)
 
-# -----------------------------------------------------
-# 🎯 ÜRÜN KATALOĞU
-# -----------------------------------------------------
-PRODUCT_CATALOG = [
-    {
-        "id": "yoga_set",
-        "name": "Renkli Premium Yoga Seti",
-        "category": "wellness",
-        "base_price": 4500,
-        "tags": ["spor", "yoga", "sağlık", "kendine_zaman", "wellness"],
-        "base_description": "Yoga matı, blok ve kaydırmaz çorap içeren konforlu set.",
-    },
-    {
-        "id": "vinyl_player",
-        "name": "Retro Pikap ve Plak Seti",
-        "category": "music",
-        "base_price": 5500,
-        "tags": ["müzik", "retro", "dekorasyon", "ev"],
-        "base_description": "Vintage tasarımlı pikap ve sevilen türde başlangıç plakları.",
-    },
-    {
-        "id": "photo_album",
-        "name": "Kişisel Fotoğraf Albümü",
-        "category": "memory",
-        "base_price": 900,
-        "tags": ["fotoğraf", "anı", "kişiselleştirilebilir", "romantik"],
-        "base_description": "Beraber çekildiğiniz fotoğraflarla doldurulabilecek şık albüm.",
-    },
-    {
-        "id": "spa_day",
-        "name": "Çiftlere Spa ve Masaj Günü",
-        "category": "experience",
-        "base_price": 3200,
-        "tags": ["deneyim", "romantik", "rahatlama", "spa"],
-        "base_description": "Spa giriş, sauna ve çift masajı içeren dinlendirici deneyim.",
-    },
-    {
-        "id": "kindle",
-        "name": "Kindle Paperwhite Okuyucu",
-        "category": "tech",
-        "base_price": 6500,
-        "tags": ["kitap", "teknoloji", "okuma", "seyahat"],
-        "base_description": "Kitap kurdu hediyesi, onlarca kitabı tek cihazda taşıma keyfi.",
-    },
-    {
-        "id": "airpods",
-        "name": "Apple AirPods Kulaklık",
-        "category": "tech",
-        "base_price": 7500,
-        "tags": ["müzik", "teknoloji", "günlük", "apple"],
-        "base_description": "Günlük kullanımda konforlu, kablosuz kulaklık.",
-    },
-    {
-        "id": "coffee_set",
-        "name": "3. Nesil Kahve Deneyim Seti",
-        "category": "coffee",
-        "base_price": 1800,
-        "tags": ["kahve", "gurme", "ev", "hobi"],
-        "base_description": "Özel çekirdek kahveler ve pour-over ekipmanı içeren set.",
-    },
-    {
-        "id": "polaroid",
-        "name": "Instax Mini Anlık Fotoğraf Makinesi",
-        "category": "photo",
-        "base_price": 3500,
-        "tags": ["fotoğraf", "anı", "eğlence", "arkadaş"],
-        "base_description": "Anıları anında baskıya döken eğlenceli fotoğraf makinesi.",
-    },
-    {
-        "id": "corporate_box",
-        "name": "Premium Ofis Hediye Kutusu",
-        "category": "corporate",
-        "base_price": 1500,
-        "tags": ["kurumsal", "ofis", "nötr", "şık"],
-        "base_description": "Ajanda, metal kalem ve kahve kupası içeren zarif kutu.",
-    },
-    {
-        "id": "smart_mug",
-        "name": "Akıllı Isı Korumalı Kupa",
-        "category": "tech",
-        "base_price": 2100,
-        "tags": ["ofis", "teknoloji", "kahve", "hediye"],
-        "base_description": "İçeceğin sıcaklığını uzun süre sabit tutan akıllı kupa.",
-    },
-]
-
-
-def generate_price(base_price: int) -> float:
-    factor = random.uniform(0.9, 1.15)
-    price = base_price * factor
-    return float(int(round(price / 10.0) * 10))
-
-
-def build_profile_tone(purpose: str, relationship: Optional[str]) -> str:
-    if relationship == "partner" or purpose == "romantik":
-        return "romantik"
-    if purpose == "kurumsal" or relationship == "colleague":
-        return "kurumsal"
-    if purpose == "ozur":
-        return "telafi"
-    return "nötr"
-
-
-def build_description(product: dict, req: RecommendRequest) -> str:
-    tone = build_profile_tone(req.purpose, req.recipient.relationship)
-    target_map = {
-        "partner": "sevgilin veya eşin",
-        "friend": "yakın arkadaşın",
-        "parent": "annen ya da baban",
-        "sibling": "kardeşin",
-        "colleague": "iş arkadaşın",
-        "other": "hediye almak istediğin kişi",
-        None: "hediye almak istediğin kişi",
-    }
-    hedef = target_map.get(req.recipient.relationship, target_map[None])
 
-    base = product["base_description"]
+@st.cache_resource
+def get_catalog_source() -> CatalogSource:
+    # GIFTAI_CATALOG_PATH varsa dosyadan okunur ve değişince arka planda yenilenir
+    return CatalogSource(os.getenv("GIFTAI_CATALOG_PATH"), default_catalog=PRODUCT_CATALOG)
 
-    if tone == "romantik":
-        return (
-            f"{hedef} için düşünülmüş, birlikte anı biriktirmeyi ön plana çıkaran "
-            f"romantik bir seçenek. {base}"
-        )
-    if tone == "kurumsal":
-        return (
-            "İş ortamında rahatlıkla verilebilecek, şık ama risksiz bir ofis hediyesi. "
-            f"{base}"
-        )
-    if tone == "telafi":
-        return (
-            f"Küçük bir jestle ortamı yumuşatmak ve gönül almak için uygun bir tercih. "
-            f"{base}"
-        )
-    return f"Günlük hayatta kullanılabilir, çoğu kişinin seveceği güvenli bir tercih. {base}"
-
-
-def compute_weights(req: RecommendRequest) -> dict:
-    w_interest = 0.4
-    w_emotion = 0.4
-    w_budget = 0.2
-
-    if req.purpose == "romantik" or req.recipient.relationship == "partner":
-        w_emotion += 0.15
-        w_budget -= 0.1
-
-    if req.purpose == "kurumsal" or req.recipient.relationship == "colleague":
-        w_budget += 0.15
-        w_emotion -= 0.1
-
-    if req.risk_level == "cesur":
-        w_interest += 0.05
-        w_emotion += 0.05
-        w_budget -= 0.1
-    elif req.risk_level == "guvenli":
-        w_budget += 0.1
-        w_emotion -= 0.05
-
-    total = w_interest + w_emotion + w_budget
-    return {
-        "interest": w_interest / total,
-        "emotion": w_emotion / total,
-        "budget": w_budget / total,
-    }
 
+def get_catalog_index() -> CatalogIndex:
+    # Katalog sürümüne bağlı sabit fiyatlar; her rerun'da aynı fiyatlar görünür
+    return get_catalog_source().index()
 
-def call_openai_scoring(req: RecommendRequest, products: List[dict]) -> dict:
-    profile = {
-        "age": req.recipient.age,
-        "gender": req.recipient.gender,
-        "relationship": req.recipient.relationship,
-        "purpose": req.purpose,
-        "risk_level": req.risk_level,
-        "urgency": req.urgency,
-        "hobbies": req.recipient.hobbies,
-        "style_tags": req.recipient.style_tags,
-        "free_text": req.free_text,
-        "budget_min": req.budget_min,
-        "budget_max": req.budget_max,
-    }
 
-    system_prompt = (
-        "You are a scoring engine for a gift recommender system.\n"
-        "Given a user profile and a list of candidate gifts, you ONLY return JSON "
-        "with numeric scores between 0 and 1 for:\n"
-        "- interest_score: How well the gift matches hobbies/style/profile.\n"
-        "- emotion_score: How strong and memorable the emotional impact is.\n"
-        "- budget_score: How well the gift fits the budget and context (corporate vs romantic).\n\n"
-        "Rules:\n"
-        "- Return a JSON object with key 'scores', value is a list.\n"
-        "- Each item has: id, interest_score, emotion_score, budget_score.\n"
-        "- Do NOT generate gift names, prices or descriptions.\n"
-        "- Scores must be floats between 0.0 and 1.0.\n"
-    )
+class IncompleteScores(Exception):
+    """OpenAI bazı ürünleri skorlamadı; exception olduğu için st.cache_data'ya girmez."""
 
-    user_payload = {
-        "profile": profile,
-        "products": [
-            {
-                "id": p["id"],
-                "name": p["name"],
-                "category": p["category"],
-                "tags": p["tags"],
-                "base_price": p["base_price"],
-            }
-            for p in products
-        ],
-    }
+    def __init__(self, scores_by_id: dict):
+        super().__init__(f"{len(scores_by_id)} ürün skorlandı, eksikler var")
+        self.scores_by_id = scores_by_id
 
-    try:
-        response = openai_client.responses.create(
-            model="gpt-4.1-mini",
-            input=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(user_payload, ensure_ascii=False)},
-            ],
-            max_output_tokens=600,
-        )
-        raw = response.output[0].content[0].text  # type: ignore
-        data = json.loads(raw)
-        scores_list = data.get("scores", [])
-    except Exception:
-        # Model hata verirse hepsine nötr skor
-        scores_list = [
-            {
-                "id": p["id"],
-                "interest_score": 0.7,
-                "emotion_score": 0.7,
-                "budget_score": 0.7,
-            }
-            for p in products
-        ]
 
-    scores_by_id = {}
-    for item in scores_list:
+@st.cache_data(ttl=SCORES_CACHE_TTL_S, show_spinner=False)
+def fetch_openai_scores(req_json: str, product_ids: tuple, catalog_version: str) -> dict:
+    """
+    Aynı profil + aday kümesi için OpenAI skorlarını tekrar kullan.
+    Adaylar parçalara bölünüp eşzamanlı skorlanır; hata veren ya da cevabında
+    eksik kalan ürünler bir kez yeniden istenir. Yine eksik kalırsa
+    IncompleteScores fırlatılır, yani sadece tam sonuçlar cache'lenir.
+    catalog_version sadece önbellek anahtarına girer (katalog değişince skorlar yenilenir).
+    """
+    req = RecommendRequest.model_validate_json(req_json)
+    wanted = set(product_ids)
+    products = [p for p in get_catalog_index().all() if p["id"] in wanted]
+    client = get_openai_client(OPENAI_API_KEY)
+
+    def score_chunk(chunk: list) -> dict:
         try:
-            pid = item["id"]
-            scores_by_id[pid] = {
-                "interest_score": float(item.get("interest_score", 0.7)),
-                "emotion_score": float(item.get("emotion_score", 0.7)),
-                "budget_score": float(item.get("budget_score", 0.7)),
-            }
+            return request_openai_scores(client, req, chunk, SCORING_MAX_OUTPUT_TOKENS)
         except Exception:
-            continue
-    return scores_by_id
+            return {}
+
+    scores_by_id: dict = {}
+    pending = products
+    with ThreadPoolExecutor(max_workers=max(1, SCORING_CONCURRENCY)) as pool:
+        for _ in range(2):
+            chunks = plan_scoring_chunks(pending, SCORING_MAX_OUTPUT_TOKENS)
+            for result in pool.map(score_chunk, chunks):
+                scores_by_id.update(result)
+            pending = [p for p in products if p["id"] not in scores_by_id]
+            if not pending:
+                return scores_by_id
+    raise IncompleteScores(scores_by_id)
+
+
+def call_openai_scoring(req: RecommendRequest, products: List) -> dict:
+    try:
+        return fetch_openai_scores(
+            req.model_dump_json(),
+            tuple(p["id"] for p in products),
+            get_catalog_source().version,
+        )
+    except IncompleteScores as e:
+        # Skorlanamayan ürünler nötr 0.7 yerine yerel heuristik skorları alır
+        scores_by_id = dict(e.scores_by_id)
+        scores_by_id.update(local_scores(req, [p for p in products if p["id"] not in scores_by_id]))
+        return scores_by_id
+    except Exception:
+        # Model hata verirse yerel heuristik skorlara düş
+        return local_scores(req, products)
 
 
 # -----------------------------------------------------
@@ -608,49 +419,46 @@ if st.button("🎁 Hediye Önerilerini Getir"):
             top_n=int(top_n),
         )
 
-        # Bütçeye göre ürünleri filtrele
-        filtered_products = []
-        for p in PRODUCT_CATALOG:
-            price = generate_price(p["base_price"])
-            if req.budget_min and price < req.budget_min * 0.6:
-                continue
-            if req.budget_max and price > req.budget_max * 1.4:
-                continue
-            filtered_products.append({**p, "price": price})
-
-        if not filtered_products:
-            filtered_products = [
-                {**p, "price": generate_price(p["base_price"])} for p in PRODUCT_CATALOG
-            ]
-
-        scores_by_id = call_openai_scoring(req, filtered_products)
-        weights = compute_weights(req)
+        # Bütçe filtresi + etiket daraltma + yerel ön sıralama; sadece kısa liste skorlanır
+        catalog_version = get_catalog_source().version
+        _, shortlist = select_candidates(
+            get_catalog_index(), req, PRERANK_K, tag_narrowing=TAG_NARROWING
+        )
 
-        results = []
-        for p in filtered_products:
-            sc = scores_by_id.get(
-                p["id"],
-                {"interest_score": 0.7, "emotion_score": 0.7, "budget_score": 0.7},
+        # Sadece bütçe / risk / top_n değiştiyse ve yeni adaylar zaten
+        # skorlanmışsa OpenAI'ye gitmeden önceki skorlarla yeniden sırala
+        session = st.session_state.get("ranking_session")
+        if (
+            session is not None
+            and session.key == rerank_key(req)
+            and session.catalog_version == catalog_version
+            and session.covers(shortlist)
+        ):
+            req, shortlist, scores_by_id = session.apply(
+                budget_min=req.budget_min,
+                budget_max=req.budget_max,
+                risk_level=req.risk_level,
+                top_n=req.top_n,
             )
-
-            final_score = (
-                sc["interest_score"] * weights["interest"]
-                + sc["emotion_score"] * weights["emotion"]
-                + sc["budget_score"] * weights["budget"]
+        else:
+            scores_by_id = call_openai_scoring(req, shortlist)
+            st.session_state["ranking_session"] = RankingSession(
+                req, shortlist, scores_by_id, catalog_version
             )
+        weights = compute_weights(req)
 
-            desc = build_description(p, req)
-            results.append(
-                {
-                    "name": p["name"],
-                    "description": desc,
-                    "price": p["price"],
-                    "scores": sc,
-                    "final_score": final_score,
-                }
+        results_sorted = [
+            {
+                "name": p["name"],
+                "description": build_description(p, req),
+                "price": p["price"],
+                "scores": sc,
+                "final_score": final_score,
+            }
+            for p, sc, final_score in rank_candidates(
+                shortlist, scores_by_id, weights, req.top_n
             )
-
-        results_sorted = sorted(results, key=lambda x: x["final_score"], reverse=True)[: req.top_n]
+        ]
 
     st.subheader("🎯 Senin için seçilen hediye fikirleri")
 
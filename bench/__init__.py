@@ -0,0 +1 @@
+"""GiftAI yük testi ve mikro benchmark araçları (üretim koduna dahil değil)."""
@@ -0,0 +1,290 @@
+# bench/loadtest.py
+"""
+/recommend için yük testi: mock OpenAI (bench/mock_openai.py) ve GiftAI
+uygulamasını ayrı uvicorn süreçleri olarak başlatır, verilen eşzamanlılık
+seviyelerinde istek yağdırır ve her seviye için RPS, p50/p95/p99 ve hata
+oranını JSON olarak yazar. Sürümler arası karşılaştırma için çıktı dosyası
+saklanabilir.
+
+Örnek:
+    python -m bench.loadtest --concurrency 1,8,32 --duration 10 --out loadtest.json
+    python -m bench.loadtest --target http://127.0.0.1:8000   # çalışan sunucuya karşı
+    python -m bench.loadtest --deadline-ms 1500 --latency-ms 1200  # p99 tavanı
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from typing import List, Optional
+
+import httpx
+
+from bench.mock_openai import add_mock_arguments
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RELATIONSHIPS = ["partner", "friend", "parent", "sibling", "colleague", "other"]
+PURPOSES = ["dogum_gunu", "romantik", "yeni_baslangic", "ozur", "kurumsal", "icimden_geldi"]
+RISK_LEVELS = ["guvenli", "normal", "cesur"]
+URGENCIES = ["flexible", "few_days", "same_day"]
+HOBBIES = ["müzik", "kahve", "yoga", "kitap", "fotoğraf", "seyahat", "teknoloji", "spa"]
+STYLES = ["retro", "sade", "şık", "romantik", "eğlenceli"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_body(rng: random.Random, nonce: Optional[int] = None) -> dict:
+    budget_min = rng.choice([None, 300, 500, 1000])
+    body = {
+        "recipient": {
+            "age": rng.randint(18, 70),
+            "relationship": rng.choice(RELATIONSHIPS),
+            "hobbies": rng.sample(HOBBIES, rng.randint(0, 3)),
+            "style_tags": rng.sample(STYLES, rng.randint(0, 2)),
+        },
+        "purpose": rng.choice(PURPOSES),
+        "risk_level": rng.choice(RISK_LEVELS),
+        "urgency": rng.choice(URGENCIES),
+        "budget_min": budget_min,
+        "budget_max": (budget_min or 0) + rng.choice([1000, 3000, 8000]),
+        "top_n": 3,
+    }
+    if nonce is not None:
+        # Her isteği farklı kılıp skor önbelleğini devre dışı bırak
+        body["free_text"] = f"yük testi #{nonce}"
+    return body
+
+
+class BodyFactory:
+    """distinct_profiles=0 ise her istek benzersiz (soğuk yol), değilse N profil döner."""
+
+    def __init__(self, distinct_profiles: int, seed: int):
+        self.rng = random.Random(seed)
+        self.counter = 0
+        self.pool = [make_body(self.rng) for _ in range(distinct_profiles)]
+
+    def next(self) -> dict:
+        self.counter += 1
+        if self.pool:
+            return self.rng.choice(self.pool)
+        return make_body(self.rng, nonce=self.counter)
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(concurrency: int, elapsed: float, latencies: List[float], statuses: dict) -> dict:
+    total = sum(statuses.values())
+    errors = sum(n for code, n in statuses.items() if code != "200")
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 2)  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": total,
+        "errors": errors,
+        "error_rate": (errors / total) if total else 0.0,
+        "rps": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else None,
+            "p50": ms(percentile(ordered, 0.50)),
+            "p95": ms(percentile(ordered, 0.95)),
+            "p99": ms(percentile(ordered, 0.99)),
+            "max": ms(ordered[-1]) if ordered else None,
+        },
+        "status_codes": statuses,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    path: str,
+    bodies: BodyFactory,
+    concurrency: int,
+    duration_s: float,
+    max_requests: Optional[int],
+) -> dict:
+    latencies: List[float] = []
+    statuses: dict = {}
+    sent = 0
+    stop_at = time.perf_counter() + duration_s
+
+    async def worker() -> None:
+        nonlocal sent
+        while time.perf_counter() < stop_at and (max_requests is None or sent < max_requests):
+            sent += 1
+            body = bodies.next()
+            started = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body)
+                code = str(resp.status_code)
+            except httpx.HTTPError as e:
+                code = e.__class__.__name__
+            latency = time.perf_counter() - started
+            statuses[code] = statuses.get(code, 0) + 1
+            if code == "200":
+                latencies.append(latency)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(concurrency, time.perf_counter() - started, latencies, statuses)
+
+
+def wait_until_ready(url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Sunucu {timeout_s:.0f} sn içinde hazır olmadı: {url}")
+
+
+def start_servers(args) -> tuple:
+    """Mock OpenAI + GiftAI süreçlerini başlat. Dönen: (base_url, [süreçler])"""
+    mock_port = free_port()
+    app_port = free_port()
+    mock_cmd = [
+        sys.executable, "-m", "bench.mock_openai",
+        "--port", str(mock_port),
+        "--latency-ms", str(args.latency_ms),
+        "--latency-dist", args.latency_dist,
+        "--latency-sigma", str(args.latency_sigma),
+        "--error-rate", str(args.error_rate),
+        "--truncate-rate", str(args.truncate_rate),
+    ]
+    if args.seed is not None:
+        mock_cmd += ["--seed", str(args.seed)]
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="mock",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{mock_port}/v1",
+    )
+    app_cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--port", str(app_port),
+        "--workers", str(args.workers),
+        "--log-level", "warning",
+        "--no-access-log",
+    ]
+    procs = [subprocess.Popen(mock_cmd, cwd=REPO_ROOT)]
+    try:
+        wait_until_ready(f"http://127.0.0.1:{mock_port}/stats")
+        procs.append(
+            subprocess.Popen(app_cmd, cwd=REPO_ROOT, env=env, stderr=subprocess.DEVNULL)
+        )
+        wait_until_ready(f"http://127.0.0.1:{app_port}/upstream/status")
+    except Exception:
+        stop_servers(procs)
+        raise
+    return f"http://127.0.0.1:{app_port}", procs
+
+
+def stop_servers(procs: list) -> None:
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def run(args, base_url: str) -> List[dict]:
+    levels = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    headers = {"X-Deadline-Ms": str(args.deadline_ms)} if args.deadline_ms else None
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=args.timeout, limits=limits, headers=headers
+    ) as client:
+        for concurrency in args.concurrency:
+            bodies = BodyFactory(args.distinct_profiles, seed=concurrency)
+            if args.warmup > 0:
+                await run_level(client, args.path, bodies, concurrency, args.warmup, None)
+            level = await run_level(
+                client, args.path, bodies, concurrency, args.duration, args.requests
+            )
+            print(
+                f"c={concurrency:<4} rps={level['rps']:<8} p50={level['latency_ms']['p50']}ms "
+                f"p99={level['latency_ms']['p99']}ms errors={level['error_rate']:.2%}",
+                file=sys.stderr,
+            )
+            levels.append(level)
+    return levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GiftAI /recommend yük testi.")
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda v: [int(x) for x in v.split(",")])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seviye başına süre (sn).")
+    parser.add_argument("--requests", type=int, default=None, help="Seviye başına üst istek sayısı.")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Ölçülmeyen ısınma süresi (sn).")
+    parser.add_argument("--path", default="/recommend")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--distinct-profiles",
+        type=int,
+        default=0,
+        help="0: her istek benzersiz (önbelleksiz); N: N profil arasında tekrar.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="GiftAI uvicorn worker sayısı.")
+    parser.add_argument(
+        "--deadline-ms", type=int, default=None, help="Her isteğe X-Deadline-Ms başlığı olarak eklenir."
+    )
+    parser.add_argument("--target", default=None, help="Çalışan bir GiftAI adresi; verilirse süreç başlatılmaz.")
+    parser.add_argument("--out", default=None, help="JSON çıktı dosyası (yoksa stdout).")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    procs: list = []
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        base_url, procs = start_servers(args)
+    try:
+        levels = asyncio.run(run(args, base_url))
+    finally:
+        stop_servers(procs)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "target": args.target or "local",
+        "path": args.path,
+        "distinct_profiles": args.distinct_profiles,
+        "workers": args.workers,
+        "deadline_ms": args.deadline_ms,
+        "mock": None if args.target else {
+            "latency_ms": args.latency_ms,
+            "latency_dist": args.latency_dist,
+            "latency_sigma": args.latency_sigma,
+            "error_rate": args.error_rate,
+            "truncate_rate": args.truncate_rate,
+        },
+        "levels": levels,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# bench/microbench.py
+"""
+Sıcak yoldaki saf fonksiyonlar için mikro benchmark: fiyat üretimi, bütçe
+filtresi, ağırlıklar, açıklama, skor JSON'unun çözümlenmesi, ön sıralama ve
+top-N sıralama. Katalog boyutuna bağlı olanlar 10 / 1k / 100k / 1M ürünlük
+sentetik kataloglarla ölçülür.
+
+Örnek:
+    python -m bench.microbench --save bench/microbench_baseline.json
+    python -m bench.microbench --compare bench/microbench_baseline.json --max-slowdown-pct 20
+
+--compare modunda baseline'a göre max-slowdown-pct'den fazla yavaşlayan bir
+ölçüm varsa çıkış kodu 1 olur (CI'da regresyon kapısı olarak kullanılabilir).
+Baseline makineye özgüdür; aynı makinede üretilen dosyayla karşılaştırın.
+CI için küçültülmüş boyutlarla (10 / 1k / 10k):
+
+    make bench-baseline   # temel dalda
+    make bench-compare    # değişiklikle, aynı koşucuda
+"""
+import sys
+import json
+import time
+import random
+import timeit
+import argparse
+import platform
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from giftai.catalog_index import CatalogIndex
+from giftai import fastjson
+from giftai.engine import build_description, compute_weights
+from giftai.models import Recipient, RecommendRequest
+from giftai.prerank import prerank
+from giftai.pricing import PriceSnapshot, generate_price
+from giftai.prompt import ScoringPrompt
+from giftai.ranking import rank_candidates
+
+DEFAULT_SIZES = (10, 1_000, 100_000, 1_000_000)
+CATEGORIES = ["wellness", "music", "memory", "experience", "tech", "coffee", "photo", "corporate"]
+TAG_VOCABULARY = [
+    "spor", "yoga", "sağlık", "müzik", "retro", "dekorasyon", "ev", "fotoğraf", "anı",
+    "romantik", "deneyim", "rahatlama", "spa", "kitap", "teknoloji", "okuma", "seyahat",
+    "kahve", "gurme", "hobi", "eğlence", "arkadaş", "kurumsal", "ofis", "nötr", "şık",
+]
+
+SAMPLE_REQUEST = RecommendRequest(
+    recipient=Recipient(
+        age=29,
+        relationship="partner",
+        hobbies=["müzik", "fotoğrafçılık", "kahve"],
+        style_tags=["retro"],
+    ),
+    purpose="romantik",
+    risk_level="normal",
+    urgency="flexible",
+    budget_min=500,
+    budget_max=3000,
+)
+
+
+def synthetic_catalog(size: int, seed: int = 42) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"p{i}",
+            "name": f"Ürün {i}",
+            "category": rng.choice(CATEGORIES),
+            "base_price": rng.randint(200, 20_000),
+            "tags": rng.sample(TAG_VOCABULARY, rng.randint(2, 5)),
+            "base_description": "Sentetik benchmark ürünü.",
+        }
+        for i in range(size)
+    ]
+
+
+def synthetic_scores_text(prompt: ScoringPrompt, seed: int = 7) -> str:
+    """Modelin şemalı çıktıyla döneceği kompakt {"scores": [...]} metni."""
+    rng = random.Random(seed)
+    return json.dumps(
+        {
+            "scores": [
+                {
+                    "id": alias,
+                    "i": round(rng.random(), 3),
+                    "e": round(rng.random(), 3),
+                    "b": round(rng.random(), 3),
+                }
+                for alias in prompt.aliases
+            ]
+        }
+    )
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Çağrı başına en iyi süre (sn). Her tur en az ~0.2 sn sürecek kadar çağrı yapar."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def size_independent_cases() -> List[Tuple[str, Callable[[], object]]]:
+    rng = random.Random(1)
+    product = synthetic_catalog(1)[0]
+    return [
+        ("generate_price", lambda: generate_price(4500, rng)),
+        ("compute_weights", lambda: compute_weights(SAMPLE_REQUEST)),
+        ("build_description", lambda: build_description(product, SAMPLE_REQUEST)),
+    ]
+
+
+def sized_cases(size: int) -> List[Tuple[str, Callable[[], object]]]:
+    catalog = synthetic_catalog(size)
+    snapshot = PriceSnapshot(catalog)
+    prices = snapshot.prices()
+    index = CatalogIndex(catalog, prices, snapshot_key=snapshot.key)
+    candidates = list(index.all())
+    prompt = ScoringPrompt(SAMPLE_REQUEST, candidates)
+    scores_text = synthetic_scores_text(prompt)
+    scores_by_id = prompt.decode(fastjson.loads(scores_text)["scores"])
+    weights = compute_weights(SAMPLE_REQUEST)
+    recipient = SAMPLE_REQUEST.recipient
+
+    return [
+        ("price_snapshot", lambda: PriceSnapshot(catalog).prices()),
+        ("catalog_index_build", lambda: CatalogIndex(catalog, prices, snapshot_key=snapshot.key)),
+        (
+            "filter_budget",
+            lambda: list(index.filter_budget(SAMPLE_REQUEST.budget_min, SAMPLE_REQUEST.budget_max)),
+        ),
+        ("decode_scores", lambda: prompt.decode(fastjson.loads(scores_text)["scores"])),
+        (
+            "prerank_k20",
+            lambda: prerank(candidates, recipient.hobbies, recipient.style_tags, "romantik", 20),
+        ),
+        ("rank_top3", lambda: rank_candidates(candidates, scores_by_id, weights, 3)),
+    ]
+
+
+def run(sizes, only: Optional[str], repeat: int) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+
+    def record(name: str, func: Callable[[], object]) -> None:
+        if only and only not in name:
+            return
+        results[name] = measure(func, repeat)
+        print(f"{name:<40} {format_seconds(results[name]):>12}", file=sys.stderr)
+
+    for name, func in size_independent_cases():
+        record(name, func)
+    for size in sizes:
+        for name, func in sized_cases(size):
+            record(f"{name}[n={size}]", func)
+    return results
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.1f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], max_slowdown_pct: float) -> List[str]:
+    """max_slowdown_pct'den fazla yavaşlayan ölçümlerin adlarını döndür ve tabloyu yaz."""
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline:
+            continue
+        change_pct = (results[name] / baseline[name] - 1.0) * 100
+        flag = ""
+        if change_pct > max_slowdown_pct:
+            regressions.append(name)
+            flag = "  <-- REGRESYON"
+        print(
+            f"{name:<40} {format_seconds(baseline[name]):>12} -> "
+            f"{format_seconds(results[name]):>12} {change_pct:+7.1f}%{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GiftAI sıcak yol mikro benchmark'ları.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        type=lambda v: [int(x) for x in v.split(",") if x],
+    )
+    parser.add_argument("--only", default=None, help="Sadece adında bu metin geçen ölçümler.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", default=None, help="Sonuçları baseline dosyası olarak yaz.")
+    parser.add_argument("--compare", default=None, help="Karşılaştırılacak baseline dosyası.")
+    parser.add_argument("--max-slowdown-pct", type=float, default=20.0)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.only, args.repeat)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_slowdown_pct)
+        if regressions:
+            print(
+                f"{len(regressions)} ölçüm %{args.max_slowdown_pct:g}'den fazla yavaşladı: "
+                + ", ".join(regressions)
+            )
+            sys.exit(1)
+    elif not args.save:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# bench/mock_openai.py
+"""
+Yük testleri için OpenAI Responses API taklidi (POST /v1/responses).
+
+GiftAI'nin gönderdiği skorlama isteklerini (tek profil kompakt tablo ya da
+toplu "profiles" JSON'u) okuyup şemaya uygun {"scores": [...]} /
+{"results": [...]} JSON'u döner; stream=True ise aynı metni SSE olayları halinde parça parça yollar.
+Gecikme dağılımı, hata oranı ve yarım kesilmiş (truncated) cevap oranı
+ayarlanabilir.
+
+Çalıştırma:
+    python -m bench.mock_openai --port 8900 --latency-ms 400 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=mock uvicorn main:app
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Iterator, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Yaklaşık token hesabı için (gerçek tokenizer yerine)
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_CHARS = 24
+
+
+class MockSettings:
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        latency_dist: str = "lognormal",
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        truncate_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.rng = random.Random(seed)
+
+    def latency_s(self) -> float:
+        """latency_ms: fixed'de sabit değer, uniform'da ortalama, lognormal'da medyan."""
+        base = self.latency_ms / 1000.0
+        if self.latency_dist == "fixed":
+            return base
+        if self.latency_dist == "uniform":
+            return self.rng.uniform(0.0, 2 * base)
+        # lognormal: ağır kuyruk; p99 ~ medyan * e^(2.33 * sigma)
+        return self.rng.lognormvariate(0.0, self.latency_sigma) * base
+
+
+def score_row(product_id: str, rng: random.Random) -> dict:
+    return {
+        "id": product_id,
+        "interest_score": round(rng.random(), 3),
+        "emotion_score": round(rng.random(), 3),
+        "budget_score": round(rng.random(), 3),
+    }
+
+
+def compact_score_row(alias: str, rng: random.Random) -> dict:
+    return {
+        "id": alias,
+        "i": round(rng.random(), 3),
+        "e": round(rng.random(), 3),
+        "b": round(rng.random(), 3),
+    }
+
+
+def table_aliases(user_content: str) -> List[str]:
+    """Kompakt prompt: profil satırı, başlık satırı, sonra "takma ad|ad|..." satırları."""
+    return [line.split("|", 1)[0] for line in user_content.split("\n")[2:] if line]
+
+
+def packed_profiles(user_content: str) -> List[tuple]:
+    """Paket prompt: "#profiles" başlığından sonraki "anahtar|id,id,...|profil" satırları."""
+    _, _, rows = user_content.partition("\n#profiles ")
+    profiles = []
+    for line in rows.split("\n")[1:]:
+        if not line:
+            continue
+        key, ids, _ = line.split("|", 2)
+        profiles.append((key, [alias for alias in ids.split(",") if alias]))
+    return profiles
+
+
+def build_output_text(body: dict, rng: random.Random) -> str:
+    """İstekteki user mesajına göre skor JSON'unu üret."""
+    messages = body.get("input") or []
+    user_content = messages[-1]["content"] if messages else "{}"
+    if isinstance(user_content, str) and user_content.startswith("#products "):
+        return json.dumps(
+            {
+                "results": [
+                    {"profile": key, "scores": [compact_score_row(alias, rng) for alias in aliases]}
+                    for key, aliases in packed_profiles(user_content)
+                ]
+            }
+        )
+    try:
+        payload = json.loads(user_content)
+    except (TypeError, ValueError):
+        payload = None
+    if not isinstance(payload, dict):
+        aliases = table_aliases(user_content) if isinstance(user_content, str) else []
+        return json.dumps({"scores": [compact_score_row(alias, rng) for alias in aliases]})
+    return json.dumps(
+        {"scores": [score_row(p["id"], rng) for p in payload.get("products", [])]}
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def build_response(body: dict, text: str, status: str) -> dict:
+    input_tokens = estimate_tokens(json.dumps(body.get("input"), ensure_ascii=False))
+    output_tokens = estimate_tokens(text)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "mock"),
+        "status": status,
+        "incomplete_details": {"reason": "max_output_tokens"} if status == "incomplete" else None,
+        "output": [
+            {
+                "id": f"msg_{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "status": status,
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+def sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def stream_events(response: dict, text: str, chunk_delay_s: float) -> Iterator[tuple]:
+    item_id = response["output"][0]["id"]
+    seq = 0
+    created = dict(response, status="in_progress", output=[], usage=None)
+    yield {"type": "response.created", "sequence_number": seq, "response": created}, 0.0
+    chunks: List[str] = [
+        text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)
+    ]
+    for chunk in chunks:
+        seq += 1
+        yield {
+            "type": "response.output_text.delta",
+            "sequence_number": seq,
+            "item_id": item_id,
+            "output_index": 0,
+            "content_index": 0,
+            "delta": chunk,
+            "logprobs": [],
+        }, chunk_delay_s
+    seq += 1
+    done_type = "response.completed" if response["status"] == "completed" else "response.incomplete"
+    yield {"type": done_type, "sequence_number": seq, "response": response}, 0.0
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI Responses API")
+    app.state.settings = settings
+    app.state.requests = 0
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        latency = settings.latency_s()
+
+        if settings.rng.random() < settings.error_rate:
+            await asyncio.sleep(latency)
+            status_code = settings.rng.choice([429, 500, 503])
+            return JSONResponse(
+                status_code=status_code,
+                content={"error": {"message": "mock upstream error", "type": "server_error"}},
+            )
+
+        text = build_output_text(body, settings.rng)
+        status = "completed"
+        if settings.rng.random() < settings.truncate_rate:
+            # max_output_tokens'a takılmış gibi JSON'u ortasından kes
+            text = text[: max(1, len(text) // 2)]
+            status = "incomplete"
+        response = build_response(body, text, status)
+
+        if body.get("stream"):
+            # İlk olay gecikmenin yarısında, kalan süre parçalara yayılır
+            chunks = max(1, -(-len(text) // STREAM_CHUNK_CHARS))
+            first_delay = latency / 2
+
+            async def events():
+                await asyncio.sleep(first_delay)
+                for event, delay in stream_events(response, text, (latency - first_delay) / chunks):
+                    if delay:
+                        await asyncio.sleep(delay)
+                    yield sse(event)
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(latency)
+        return response
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument(
+        "--latency-dist", choices=["fixed", "uniform", "lognormal"], default="lognormal"
+    )
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI Responses API taklidi.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    settings = MockSettings(
+        latency_ms=args.latency_ms,
+        latency_dist=args.latency_dist,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        truncate_rate=args.truncate_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
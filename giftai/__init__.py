@@ -0,0 +1 @@
+"""GiftAI öneri motorunun yardımcı bileşenleri (önbellek, katalog, skorlama)."""
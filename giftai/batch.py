@@ -0,0 +1,31 @@
+# giftai/batch.py
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def pack_groups(groups: Sequence[T], max_items: int, size: Callable[[T], int]) -> List[List[T]]:
+    """
+    Profil gruplarını, toplam ürün sayısı max_items'ı geçmeyecek şekilde
+    ortak LLM çağrılarına paketle (sırayı koruyan first-fit).
+
+    Tek başına max_items'ı aşan gruplar kendi paketine düşer; bunlar çağıran
+    tarafından tek profil (parçalı) skorlama ile işlenmelidir.
+    """
+    packs: List[List[T]] = []
+    loads: List[int] = []
+    for group in groups:
+        n = size(group)
+        if n > max_items:
+            packs.append([group])
+            loads.append(max_items)
+            continue
+        for i, load in enumerate(loads):
+            if load + n <= max_items:
+                packs[i].append(group)
+                loads[i] += n
+                break
+        else:
+            packs.append([group])
+            loads.append(n)
+    return packs
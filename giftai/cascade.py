@@ -0,0 +1,98 @@
+# giftai/cascade.py
+"""
+Kademeli skorlama: önce ucuz bir skorlayıcı (yerel heuristik ya da küçük
+model) çalışır; N. ve N+1. sıradaki ürünlerin final_score farkı eşikten
+küçükse, yani ilk N belirsizse, pahalı modele yükseltilir.
+"""
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from giftai.ranking import rank_candidates, score_matrix, weight_vector
+
+
+def rank_margin(products: Sequence, scores_by_id: dict, weights: dict, top_n: int) -> Optional[float]:
+    """
+    N. ile N+1. sıranın final_score farkı. Aday sayısı top_n'i aşmıyorsa
+    seçilecek küme zaten belli olduğundan None döner.
+    """
+    if len(products) <= top_n:
+        return None
+    final_scores = score_matrix(products, scores_by_id) @ weight_vector(weights)
+    # Sadece en yüksek top_n + 1 skor gerekir; tam sıralama yok
+    top = np.partition(final_scores, len(final_scores) - top_n - 1)[-(top_n + 1):]
+    return float(np.partition(top, 1)[1] - top.min())
+
+
+def rank_agreement(
+    products: Sequence, first: dict, second: dict, weights: dict, top_n: int
+) -> Tuple[float, bool]:
+    """İki skor kümesinin ilk top_n'i: (ortak ürün oranı, 1. sıra aynı mı)."""
+    first_ids = [p["id"] for p, _, _ in rank_candidates(products, first, weights, top_n)]
+    second_ids = [p["id"] for p, _, _ in rank_candidates(products, second, weights, top_n)]
+    if not second_ids:
+        return 1.0, True
+    overlap = len(set(first_ids) & set(second_ids)) / len(second_ids)
+    return overlap, first_ids[:1] == second_ids[:1]
+
+
+class _Agreement:
+    __slots__ = ("samples", "overlap_sum", "top1_matches")
+
+    def __init__(self):
+        self.samples = 0
+        self.overlap_sum = 0.0
+        self.top1_matches = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "samples": self.samples,
+            "overlap_mean": (self.overlap_sum / self.samples) if self.samples else None,
+            "top1_agreement": (self.top1_matches / self.samples) if self.samples else None,
+        }
+
+
+class CascadeStats:
+    """
+    Yükseltme oranı ve ilk kademe ile pahalı modelin sıralama uyumu.
+
+    - escalated: yükseltilen isteklerde ucuz skorların ilk N'i pahalı
+      modelinkine ne kadar benziyordu (yükseltme ne kadar fark yarattı)
+    - shadow: yükseltilmeyen isteklerin bir örneğinde pahalı model arka
+      planda çalıştırılır; eşiğin kaçırdığı hataları gösterir
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalated = 0
+        self.margin_sum = 0.0
+        self.margin_samples = 0
+        self._agreement = {"escalated": _Agreement(), "shadow": _Agreement()}
+
+    def record_decision(self, margin: Optional[float], escalated: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if escalated:
+                self.escalated += 1
+            if margin is not None:
+                self.margin_sum += margin
+                self.margin_samples += 1
+
+    def record_agreement(self, kind: str, overlap: float, top1_match: bool) -> None:
+        with self._lock:
+            agreement = self._agreement[kind]
+            agreement.samples += 1
+            agreement.overlap_sum += overlap
+            agreement.top1_matches += int(top1_match)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "escalated": self.escalated,
+                "escalation_rate": (self.escalated / self.requests) if self.requests else 0.0,
+                "margin_mean": (self.margin_sum / self.margin_samples) if self.margin_samples else None,
+                "agreement": {kind: a.snapshot() for kind, a in self._agreement.items()},
+            }
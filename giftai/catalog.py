@@ -0,0 +1,85 @@
+# giftai/catalog.py
+"""Ürün kataloğu (gerçekçi hediye tipleri). Fiyatlar pricing.PriceSnapshot ile üretilir."""
+
+PRODUCT_CATALOG = [
+    {
+        "id": "yoga_set",
+        "name": "Renkli Premium Yoga Seti",
+        "category": "wellness",
+        "base_price": 4500,
+        "tags": ["spor", "yoga", "sağlık", "kendine_zaman", "wellness"],
+        "base_description": "Yoga matı, blok ve kaydırmaz çorap içeren konforlu set.",
+    },
+    {
+        "id": "vinyl_player",
+        "name": "Retro Pikap ve Plak Seti",
+        "category": "music",
+        "base_price": 5500,
+        "tags": ["müzik", "retro", "dekorasyon", "ev"],
+        "base_description": "Vintage tasarımlı pikap ve sevilen türde başlangıç plakları.",
+    },
+    {
+        "id": "photo_album",
+        "name": "Kişisel Fotoğraf Albümü",
+        "category": "memory",
+        "base_price": 900,
+        "tags": ["fotoğraf", "anı", "kişiselleştirilebilir", "romantik"],
+        "base_description": "Beraber çekildiğiniz fotoğraflarla doldurulabilecek şık albüm.",
+    },
+    {
+        "id": "spa_day",
+        "name": "Çiftlere Spa ve Masaj Günü",
+        "category": "experience",
+        "base_price": 3200,
+        "tags": ["deneyim", "romantik", "rahatlama", "spa"],
+        "base_description": "Spa giriş, sauna ve çift masajı içeren dinlendirici deneyim.",
+    },
+    {
+        "id": "kindle",
+        "name": "Kindle Paperwhite Okuyucu",
+        "category": "tech",
+        "base_price": 6500,
+        "tags": ["kitap", "teknoloji", "okuma", "seyahat"],
+        "base_description": "Kitap kurdu hediyesi, onlarca kitabı tek cihazda taşıma keyfi.",
+    },
+    {
+        "id": "airpods",
+        "name": "Apple AirPods Kulaklık",
+        "category": "tech",
+        "base_price": 7500,
+        "tags": ["müzik", "teknoloji", "günlük", "apple"],
+        "base_description": "Günlük kullanımda konforlu, kablosuz kulaklık.",
+    },
+    {
+        "id": "coffee_set",
+        "name": "3. Nesil Kahve Deneyim Seti",
+        "category": "coffee",
+        "base_price": 1800,
+        "tags": ["kahve", "gurme", "ev", "hobi"],
+        "base_description": "Özel çekirdek kahveler ve pour-over ekipmanı içeren set.",
+    },
+    {
+        "id": "polaroid",
+        "name": "Instax Mini Anlık Fotoğraf Makinesi",
+        "category": "photo",
+        "base_price": 3500,
+        "tags": ["fotoğraf", "anı", "eğlence", "arkadaş"],
+        "base_description": "Anıları anında baskıya döken eğlenceli fotoğraf makinesi.",
+    },
+    {
+        "id": "corporate_box",
+        "name": "Premium Ofis Hediye Kutusu",
+        "category": "corporate",
+        "base_price": 1500,
+        "tags": ["kurumsal", "ofis", "nötr", "şık"],
+        "base_description": "Ajanda, metal kalem ve kahve kupası içeren zarif kutu.",
+    },
+    {
+        "id": "smart_mug",
+        "name": "Akıllı Isı Korumalı Kupa",
+        "category": "tech",
+        "base_price": 2100,
+        "tags": ["ofis", "teknoloji", "kahve", "hediye"],
+        "base_description": "İçeceğin sıcaklığını uzun süre sabit tutan akıllı kupa.",
+    },
+]
@@ -0,0 +1,142 @@
+# giftai/catalog_index.py
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Bütçe filtresinin esnekliği: alt sınırın %60'ı ile üst sınırın %140'ı arası
+BUDGET_LOW_SLACK = 0.6
+BUDGET_HIGH_SLACK = 1.4
+
+
+class ProductView:
+    """
+    Katalogdaki ürün sözlüğüne + anlık fiyata hafif bir bakış.
+
+    {**p, "price": price} kopyası yerine kullanılır; p["id"], p["price"],
+    p.get("tags") gibi sözlük erişimlerini destekler.
+    """
+
+    __slots__ = ("index", "product", "price")
+
+    def __init__(self, index: int, product: dict, price: float):
+        self.index = index
+        self.product = product
+        self.price = price
+
+    def __getitem__(self, key: str):
+        if key == "price":
+            return self.price
+        return self.product[key]
+
+    def get(self, key: str, default=None):
+        if key == "price":
+            return self.price
+        return self.product.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"ProductView({self.product['id']!r}, price={self.price})"
+
+
+class CandidateView(Sequence):
+    """Filtre sonucu: katalog indekslerinin tembel (lazy) listesi, ProductView üretir."""
+
+    __slots__ = ("_catalog_index", "indices")
+
+    def __init__(self, catalog_index: "CatalogIndex", indices: Sequence[int]):
+        self._catalog_index = catalog_index
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return CandidateView(self._catalog_index, self.indices[i])
+        return self._catalog_index.view(self.indices[i])
+
+    def __iter__(self) -> Iterator[ProductView]:
+        view = self._catalog_index.view
+        for i in self.indices:
+            yield view(i)
+
+
+class CatalogIndex:
+    """
+    Bütçe / etiket filtrelemesi için katalog indeksi.
+
+    - Fiyata göre sıralı bir sütun (array('d')) ve karşılık gelen katalog
+      indeksleri: bütçe aralığı bisect ile O(log n) bulunur.
+    - Etiket -> katalog indeksleri ters indeksi.
+
+    Fiyatlar bir PriceSnapshot'tan gelir; snapshot yenilenince indeks de
+    yeniden kurulmalıdır (bkz. snapshot_key).
+    """
+
+    def __init__(self, catalog: List[dict], prices: Sequence[float], snapshot_key: str = ""):
+        self.catalog = catalog
+        self.prices = prices
+        self.snapshot_key = snapshot_key
+
+        order = sorted(range(len(catalog)), key=prices.__getitem__)
+        self._order = array("l", order)
+        self._sorted_prices = array("d", (prices[i] for i in order))
+
+        tag_lists: Dict[str, List[int]] = {}
+        for i, p in enumerate(catalog):
+            for tag in p.get("tags", ()):
+                tag_lists.setdefault(tag, []).append(i)
+        self._tag_index = {tag: array("l", ids) for tag, ids in tag_lists.items()}
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def view(self, index: int) -> ProductView:
+        return ProductView(index, self.catalog[index], self.prices[index])
+
+    def all(self) -> CandidateView:
+        return CandidateView(self, range(len(self.catalog)))
+
+    @staticmethod
+    def budget_bounds(budget_min: Optional[float], budget_max: Optional[float]) -> tuple:
+        low = budget_min * BUDGET_LOW_SLACK if budget_min else float("-inf")
+        high = budget_max * BUDGET_HIGH_SLACK if budget_max else float("inf")
+        return low, high
+
+    def filter_budget(
+        self, budget_min: Optional[float], budget_max: Optional[float]
+    ) -> CandidateView:
+        """Bütçeye uyan ürünler, fiyata göre artan sırada."""
+        low, high = self.budget_bounds(budget_min, budget_max)
+        start = bisect_left(self._sorted_prices, low)
+        stop = bisect_right(self._sorted_prices, high)
+        # memoryview dilimi kopya üretmez
+        return CandidateView(self, memoryview(self._order)[start:stop])
+
+    def tags(self) -> Iterable[str]:
+        """Katalogdaki tüm (farklı) etiketler."""
+        return self._tag_index.keys()
+
+    def ids_with_tags(self, tags: Iterable[str]) -> List[int]:
+        """Verilen etiketlerden en az birine sahip ürünlerin katalog indeksleri (sıralı)."""
+        found = set()
+        for tag in tags:
+            ids = self._tag_index.get(tag)
+            if ids is not None:
+                found.update(ids)
+        return sorted(found)
+
+    def filter(
+        self,
+        budget_min: Optional[float] = None,
+        budget_max: Optional[float] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> CandidateView:
+        """Bütçe + (isteğe bağlı) etiket filtresi."""
+        if not tags:
+            return self.filter_budget(budget_min, budget_max)
+        low, high = self.budget_bounds(budget_min, budget_max)
+        prices = self.prices
+        return CandidateView(
+            self,
+            array("l", (i for i in self.ids_with_tags(tags) if low <= prices[i] <= high)),
+        )
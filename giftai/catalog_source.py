@@ -0,0 +1,384 @@
+# giftai/catalog_source.py
+"""
+Kataloğu dış bir dosyadan (JSON Lines, CSV, SQLite) yükleme ve dosya
+değişince kesintisiz yeniden yükleme.
+
+Ürünler dict yerine __slots__'lu Product nesneleri olarak tutulur; kategori
+ve etiket string'leri intern edilir, böylece binlerce üründe aynı "müzik"
+etiketi tek bir string nesnesini paylaşır.
+"""
+import os
+import csv
+import sys
+import json
+import hashlib
+import time
+import sqlite3
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from giftai.catalog_index import CatalogIndex
+from giftai.pricing import PriceSnapshot
+
+logger = logging.getLogger("giftai")
+
+PRODUCT_FIELDS = ("id", "name", "category", "base_price", "tags", "base_description")
+# CSV / SQLite'ta etiketler tek sütunda "müzik|retro|ev" şeklinde tutulur
+TAG_SEPARATOR = "|"
+SQLITE_TABLE = "products"
+
+
+class Product:
+    """Katalog ürünü. p["id"], p.get("tags") gibi dict erişimlerini destekler."""
+
+    __slots__ = PRODUCT_FIELDS
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        category: str,
+        base_price: float,
+        tags: Sequence[str],
+        base_description: str,
+    ):
+        self.id = id
+        self.name = name
+        self.category = sys.intern(category)
+        self.base_price = base_price
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+        self.base_description = base_description
+
+    def __getitem__(self, key: str):
+        if key not in PRODUCT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        if key not in PRODUCT_FIELDS:
+            return default
+        return getattr(self, key)
+
+    def __repr__(self) -> str:
+        return f"Product({self.id!r})"
+
+
+def _parse_tags(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(tag).strip() for tag in value if str(tag).strip()]
+    text = str(value).strip()
+    if text.startswith("["):
+        return _parse_tags(json.loads(text))
+    return [tag.strip() for tag in text.split(TAG_SEPARATOR) if tag.strip()]
+
+
+def _parse_price(value) -> float:
+    price = float(value)
+    return int(price) if price.is_integer() else price
+
+
+def product_from_record(record: dict, where: str = "") -> Product:
+    missing = [f for f in PRODUCT_FIELDS if f != "tags" and record.get(f) in (None, "")]
+    if missing:
+        raise ValueError(f"Katalog kaydı eksik alan içeriyor {where}: {', '.join(missing)}")
+    try:
+        base_price = _parse_price(record["base_price"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Geçersiz base_price {where}: {record['base_price']!r}")
+    return Product(
+        id=str(record["id"]),
+        name=str(record["name"]),
+        category=str(record["category"]),
+        base_price=base_price,
+        tags=_parse_tags(record.get("tags")),
+        base_description=str(record["base_description"]),
+    )
+
+
+def compact_catalog(records: Iterable[dict]) -> List[Product]:
+    """Dict listesini (örn. giftai.catalog.PRODUCT_CATALOG) Product listesine çevir."""
+    products = [product_from_record(r, f"#{i}") for i, r in enumerate(records)]
+    ids = set()
+    for p in products:
+        if p.id in ids:
+            raise ValueError(f"Katalogda tekrarlanan ürün id'si: {p.id}")
+        ids.add(p.id)
+    return products
+
+
+def _read_jsonl(path: str) -> Iterable[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no} geçerli JSON değil: {e}")
+
+
+def _read_csv(path: str) -> Iterable[dict]:
+    with open(path, encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def _read_sqlite(path: str) -> Iterable[dict]:
+    # Salt okunur açılır; yazan süreçle yarışmaz
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f"SELECT {', '.join(PRODUCT_FIELDS)} FROM {SQLITE_TABLE}").fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+
+READERS = {
+    ".jsonl": _read_jsonl,
+    ".ndjson": _read_jsonl,
+    ".csv": _read_csv,
+    ".sqlite": _read_sqlite,
+    ".sqlite3": _read_sqlite,
+    ".db": _read_sqlite,
+}
+
+
+def load_catalog(path: str) -> List[Product]:
+    """Uzantıya göre (.jsonl / .csv / .sqlite, .db) kataloğu oku ve doğrula."""
+    ext = os.path.splitext(path)[1].lower()
+    reader = READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Desteklenmeyen katalog biçimi: {ext} (desteklenen: {', '.join(READERS)})")
+    products = compact_catalog(reader(path))
+    if not products:
+        raise ValueError(f"Katalog boş: {path}")
+    return products
+
+
+def content_version(catalog: Sequence) -> str:
+    """
+    Tüm alanları kapsayan katalog sürümü (skor önbelleği anahtarları için).
+    pricing.catalog_version sadece id + base_price'a bakar; açıklama / etiket
+    düzeltmesi fiyatları değiştirmemeli ama LLM skorlarını geçersiz kılmalı.
+    """
+    h = hashlib.sha1()
+    for p in catalog:
+        h.update(
+            json.dumps([p[f] for f in PRODUCT_FIELDS], ensure_ascii=False).encode("utf-8")
+        )
+    return h.hexdigest()[:12]
+
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class CatalogState:
+    """Birlikte değişen katalog + fiyatlar + indeks; tek referansla değiştirilir."""
+
+    __slots__ = ("catalog", "version", "price_snapshot", "index")
+
+    def __init__(
+        self,
+        catalog: List[Product],
+        version: str,
+        price_snapshot: PriceSnapshot,
+        index: CatalogIndex,
+    ):
+        self.catalog = catalog
+        self.version = version
+        self.price_snapshot = price_snapshot
+        self.index = index
+
+
+class CatalogSource:
+    """
+    Güncel kataloğu sunan kaynak.
+
+    path verilirse katalog dosyadan okunur ve arka plandaki bir thread
+    dosyanın mtime / boyutunu poll_interval_s'de bir kontrol eder. Değişiklikte
+    yeni katalog, fiyatlar ve indeks yine o thread'de kurulur; hazır olunca
+    tek bir referans ataması ile devreye alınır. İstekler başladıkları anda
+    aldıkları durumu kullanmaya devam eder, yani yeniden yükleme istekleri
+    bloklamaz ve yarım bir katalog görülmez. Okunamayan / bozuk dosyada eski
+    katalog korunur.
+
+    bucket_s verilirse fiyat dilimi değişimi de aynı thread'de yapılır: bir
+    sonraki dilimin fiyatları ve indeksi önceden kurulur, dilim sınırında
+    referans değiştirilir. İstek yolunda fiyat / indeks hiç yeniden kurulmaz.
+    poll_interval_s <= 0 thread'i kapatır; o zaman check_reload /
+    check_prices elle çağrılmalıdır.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default_catalog: Optional[Iterable[dict]] = None,
+        bucket_s: Optional[float] = None,
+        poll_interval_s: float = 2.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.bucket_s = bucket_s or None
+        self.poll_interval_s = poll_interval_s
+        self._clock = clock
+        # Bir sonraki fiyat dilimi için önceden kurulmuş durum
+        self._pending: Optional[CatalogState] = None
+        self.price_refreshes = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error: Optional[str] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if path:
+            self._stamp = _file_stamp(path)
+            catalog = load_catalog(path)
+            logger.info("Katalog yüklendi: %s (%d ürün)", path, len(catalog))
+        else:
+            self._stamp = None
+            catalog = compact_catalog(default_catalog or [])
+        self._state = self._build(catalog)
+
+        if poll_interval_s > 0 and (path or self.bucket_s):
+            self._thread = threading.Thread(
+                target=self._watch, name="giftai-catalog-watch", daemon=True
+            )
+            self._thread.start()
+
+    def _build(self, catalog: List[Product]) -> CatalogState:
+        snapshot = PriceSnapshot(catalog, bucket_s=self.bucket_s, clock=self._clock)
+        index = CatalogIndex(catalog, snapshot.prices(), snapshot_key=snapshot.key)
+        return CatalogState(catalog, content_version(catalog), snapshot, index)
+
+    @staticmethod
+    def _build_bucket(state: CatalogState, bucket: int) -> CatalogState:
+        snapshot = state.price_snapshot.for_bucket(bucket)
+        index = CatalogIndex(state.catalog, snapshot.prices(), snapshot_key=snapshot.key)
+        return CatalogState(state.catalog, state.version, snapshot, index)
+
+    @property
+    def state(self) -> CatalogState:
+        return self._state
+
+    @property
+    def catalog(self) -> List[Product]:
+        return self._state.catalog
+
+    @property
+    def version(self) -> str:
+        return self._state.version
+
+    def index(self) -> CatalogIndex:
+        """Güncel indeks. Fiyat dilimi değişimi arka plandaki thread'in işidir (check_prices)."""
+        return self._state.index
+
+    def check_reload(self) -> bool:
+        """Dosya değiştiyse yeniden yükle. Yeni katalog devreye girdiyse True."""
+        if not self.path:
+            return False
+        with self._reload_lock:
+            stamp = _file_stamp(self.path)
+            if stamp is None or stamp == self._stamp:
+                return False
+            try:
+                catalog = load_catalog(self.path)
+                if _file_stamp(self.path) != stamp:
+                    # Dosya hâlâ yazılıyor; bir sonraki turda tekrar dene
+                    return False
+                state = self._build(catalog)
+            except Exception as e:
+                # Aynı bozuk dosyayı her turda tekrar denememek için damgayı kaydet
+                self._stamp = stamp
+                self.reload_errors += 1
+                self.last_error = str(e)
+                logger.warning(f"Katalog yeniden yüklenemedi, eski katalog kullanılıyor: {e}")
+                return False
+            self._stamp = stamp
+            old_version = self._state.version
+            self._state = state
+            # Önceden kurulan fiyat dilimi eski kataloğa ait
+            self._pending = None
+            self.reloads += 1
+            self.last_error = None
+            logger.info(
+                "Katalog yeniden yüklendi: %s (%d ürün, sürüm %s -> %s)",
+                self.path,
+                len(catalog),
+                old_version,
+                state.version,
+            )
+            return True
+
+    def check_prices(self) -> bool:
+        """
+        Fiyat dilimi değiştiyse yeni dilimin durumunu devreye al (önceden
+        kurulduysa sadece referans değişir), sonra bir sonraki dilimi hazırla.
+        Yeni fiyatlar devreye girdiyse True.
+        """
+        if not self.bucket_s:
+            return False
+        with self._reload_lock:
+            state = self._state
+            bucket = state.price_snapshot.current_bucket()
+            refreshed = False
+            if bucket != state.price_snapshot.bucket:
+                pending = self._pending
+                if pending is None or pending.price_snapshot.bucket != bucket:
+                    # Hazırlık yetişmedi (ya da dilimler atlandı); şimdi kur
+                    pending = self._build_bucket(state, bucket)
+                self._state = state = pending
+                self._pending = None
+                self.price_refreshes += 1
+                refreshed = True
+            if self._pending is None:
+                self._pending = self._build_bucket(state, state.price_snapshot.bucket + 1)
+            return refreshed
+
+    def _watch_interval(self) -> float:
+        intervals = []
+        if self.path:
+            intervals.append(self.poll_interval_s)
+        until_next = self._state.price_snapshot.seconds_until_next()
+        if until_next is not None:
+            # Dilim sınırının hemen arkasında uyan
+            intervals.append(max(0.0, until_next) + 0.005)
+        return min(intervals)
+
+    def _watch(self) -> None:
+        while True:
+            try:
+                if self.path:
+                    self.check_reload()
+                self.check_prices()
+            except Exception as e:
+                logger.warning(f"Katalog izleme hatası: {e!r}")
+            if self._stop.wait(self._watch_interval()):
+                return
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval_s + 1)
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "path": self.path,
+            "version": state.version,
+            "products": len(state.catalog),
+            "price_bucket": state.price_snapshot.bucket,
+            "price_refreshes": self.price_refreshes,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_error": self.last_error,
+        }
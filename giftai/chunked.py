@@ -0,0 +1,79 @@
+# giftai/chunked.py
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("giftai")
+
+# Tam anahtarlı bir skor satırının ({"id": "...", "interest_score": 0.82, ...}) yaklaşık
+# çıktı token maliyeti; kompakt satırlar için giftai.prompt.COMPACT_OUTPUT_TOKENS_PER_ITEM
+OUTPUT_TOKENS_PER_ITEM = 40
+# {"scores": [ ... ]} sarmalayıcısı + güvenlik payı
+OUTPUT_TOKENS_OVERHEAD = 30
+
+
+def plan_chunks(
+    products: Sequence,
+    max_output_tokens: int,
+    tokens_per_item: int = OUTPUT_TOKENS_PER_ITEM,
+    overhead: int = OUTPUT_TOKENS_OVERHEAD,
+) -> List[list]:
+    """Adayları, her parçanın cevabı max_output_tokens'a sığacak şekilde böl."""
+    per_chunk = max(1, (max_output_tokens - overhead) // tokens_per_item)
+    return [list(products[i:i + per_chunk]) for i in range(0, len(products), per_chunk)]
+
+
+async def score_in_chunks(
+    score_chunk: Callable[[list], Awaitable[dict]],
+    products: Sequence,
+    max_output_tokens: int,
+    concurrency: int = 4,
+    retries: int = 1,
+    tokens_per_item: int = OUTPUT_TOKENS_PER_ITEM,
+    plan: Optional[Callable[[Sequence], List[list]]] = None,
+) -> Tuple[dict, list]:
+    """
+    Adayları parçalara bölüp score_chunk ile eşzamanlı skorla.
+
+    score_chunk(chunk) -> {product_id: {...}} döner, hata durumunda exception
+    fırlatır. Hata veren ya da cevabında eksik ürün olan parçalar (kesilmiş
+    JSON vb.) en fazla `retries` kez, sadece o parçalar için yeniden denenir.
+    plan(products) verilirse parçalar onunla, verilmezse plan_chunks ile çıkarılır.
+
+    Dönen değer: (birleştirilmiş scores_by_id, hiç skorlanamayan ürünler)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    scores_by_id: dict = {}
+
+    def split(items: Sequence) -> List[list]:
+        if plan is not None:
+            return plan(items)
+        return plan_chunks(items, max_output_tokens, tokens_per_item)
+
+    async def run(chunk: list) -> list:
+        async with semaphore:
+            try:
+                result = await score_chunk(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Skor parçası ({len(chunk)} ürün) başarısız: {e!r}")
+                return chunk
+        scores_by_id.update(result)
+        return [p for p in chunk if p["id"] not in result]
+
+    pending = split(products)
+    for attempt in range(retries + 1):
+        missing_lists = await asyncio.gather(*(run(chunk) for chunk in pending))
+        missing = [p for chunk in missing_lists for p in chunk]
+        if not missing:
+            return scores_by_id, []
+        if attempt < retries:
+            logger.info(
+                "%d ürün skorlanamadı, sadece bu parçalar tekrar deneniyor (%d/%d).",
+                len(missing),
+                attempt + 1,
+                retries,
+            )
+            pending = split(missing)
+    return scores_by_id, missing
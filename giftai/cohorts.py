@@ -0,0 +1,349 @@
+# giftai/cohorts.py
+"""
+Kohort (purpose × relationship × cinsiyet × risk_level × urgency × yaş bandı)
+bazında önceden hesaplanmış skor tablosu.
+
+Hobi, stil ve serbest metin içermeyen bir profilin skorları sadece bu ayrık
+alana bağlıdır; böyle istekler LLM'e gitmeden tablodan okunur. Kişisel
+detay içeren profiller canlı skorlamaya devam eder.
+
+Tablo uint8'e nicemlenmiş (kohort, ürün, 3) bir .npy dosyasıdır ve
+np.load(mmap_mode="r") ile açılır; yanına ürün id'leri, katalog sürümü ve
+boyutları içeren bir .json dosyası yazılır. Tabloyu üreten iş kohortları
+bir süreç havuzunda paralel skorlar (OPENAI_API_KEY yoksa veya --local
+verilirse yerel heuristik skorlayıcıyla):
+
+    python -m giftai.cohorts --out data/cohort_scores.npy --workers 8
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_index import CatalogIndex
+from giftai.catalog_source import compact_catalog, content_version, load_catalog
+from giftai.engine import (
+    SCORING_MAX_OUTPUT_TOKENS,
+    SCORING_MODEL,
+    build_profile_tone,
+    local_scores,
+    plan_scoring_chunks,
+    request_openai_scores,
+)
+from giftai.heuristic import budget_score
+from giftai.models import Recipient, RecommendRequest
+from giftai.pricing import PriceSnapshot
+from giftai.ranking import NEUTRAL_SCORES, SCORE_FIELDS
+
+logger = logging.getLogger("giftai")
+
+PURPOSES = ("dogum_gunu", "romantik", "yeni_baslangic", "ozur", "kurumsal", "icimden_geldi")
+RELATIONSHIPS = ("partner", "friend", "parent", "sibling", "colleague", "other")
+RISK_LEVELS = ("guvenli", "normal", "cesur")
+URGENCIES = ("flexible", "few_days", "same_day")
+# Cinsiyet grubu; gender verilmemişse / "bilmiyorum" ise "bilinmiyor"
+GENDERS = ("bilinmiyor", "kadın", "erkek")
+GENDER_ALIASES = {
+    "kadın": "kadın",
+    "kadin": "kadın",
+    "female": "kadın",
+    "woman": "kadın",
+    "erkek": "erkek",
+    "male": "erkek",
+    "man": "erkek",
+}
+# (etiket, alt sınır, kohortu temsil eden yaş); yaş verilmemişse "bilinmiyor"
+AGE_BANDS = (
+    ("bilinmiyor", None, None),
+    ("0-24", 0, 21),
+    ("25-39", 25, 32),
+    ("40-59", 40, 50),
+    ("60+", 60, 67),
+)
+DIMENSIONS = {
+    "purpose": PURPOSES,
+    "relationship": RELATIONSHIPS,
+    "gender": GENDERS,
+    "risk_level": RISK_LEVELS,
+    "urgency": URGENCIES,
+    "age_band": tuple(label for label, _, _ in AGE_BANDS),
+}
+COHORT_COUNT = int(np.prod([len(values) for values in DIMENSIONS.values()]))
+
+# Skorlar 0..1 -> 0..255 (1/255 ~ 0.004 çözünürlük, ürün başına 3 bayt)
+SCORE_SCALE = 255
+
+
+def age_band(age: Optional[int]) -> str:
+    if age is None:
+        return AGE_BANDS[0][0]
+    label = AGE_BANDS[1][0]
+    for band, lower, _ in AGE_BANDS[1:]:
+        if age >= lower:
+            label = band
+    return label
+
+
+def gender_group(gender: Optional[str]) -> Optional[str]:
+    """Cinsiyet grubu; tablonun bilmediği bir değerse None."""
+    value = (gender or "").strip().lower()
+    if not value or value.startswith("bilmiyorum"):
+        return GENDERS[0]
+    return GENDER_ALIASES.get(value)
+
+
+def is_personal(req: RecommendRequest) -> bool:
+    """Kohort tablosunun bilmediği kişisel detay var mı (hobi, stil, serbest metin)?"""
+    recipient = req.recipient
+    return bool(recipient.hobbies or recipient.style_tags or (req.free_text or "").strip())
+
+
+def cohort_of(req: RecommendRequest) -> Optional[int]:
+    """
+    İsteğin kohort numarası; kişisel detay varsa veya bir alan tablonun
+    bilmediği bir değer taşıyorsa None (canlı skorlama gerekir).
+    """
+    if is_personal(req):
+        return None
+    values = (
+        req.purpose,
+        req.recipient.relationship or "other",
+        gender_group(req.recipient.gender),
+        req.risk_level,
+        req.urgency,
+        age_band(req.recipient.age),
+    )
+    cohort = 0
+    for value, choices in zip(values, DIMENSIONS.values()):
+        if value not in choices:
+            return None
+        cohort = cohort * len(choices) + choices.index(value)
+    return cohort
+
+
+def cohort_request(cohort: int) -> RecommendRequest:
+    """Kohortu temsil eden (bütçesiz, kişisel detaysız) istek; cohort_of'un tersi."""
+    values = []
+    for choices in reversed(list(DIMENSIONS.values())):
+        cohort, i = divmod(cohort, len(choices))
+        values.append(choices[i])
+    purpose, relationship, gender, risk_level, urgency, band = reversed(values)
+    age = next(rep for label, _, rep in AGE_BANDS if label == band)
+    return RecommendRequest(
+        recipient=Recipient(
+            age=age, gender=None if gender == GENDERS[0] else gender, relationship=relationship
+        ),
+        purpose=purpose,
+        risk_level=risk_level,
+        urgency=urgency,
+    )
+
+
+def meta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+class CohortScoreTable:
+    """Memory-mapped kohort skor tablosu; satırlar katalog sırasıyla hizalıdır."""
+
+    def __init__(self, matrix: np.ndarray, meta: dict):
+        self.matrix = matrix
+        self.meta = meta
+        self.catalog_version = meta["catalog_version"]
+        self.hits = 0
+
+    @classmethod
+    def load(cls, path: str) -> "CohortScoreTable":
+        with open(meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dimensions") != {k: list(v) for k, v in DIMENSIONS.items()}:
+            raise ValueError("Kohort tablosunun boyutları koddakilerle uyuşmuyor, yeniden üretilmeli.")
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape != (COHORT_COUNT, len(meta["ids"]), len(SCORE_FIELDS)):
+            raise ValueError(f"Kohort tablosu meta ile uyuşmuyor: {matrix.shape}")
+        return cls(matrix, meta)
+
+    def scores_for(self, req: RecommendRequest, products: Sequence) -> Optional[dict]:
+        """
+        Kohort isteği için tablodaki skorlar; kohort dışıysa None.
+        products katalog indeksinden gelen ProductView'lar olmalı (p.index).
+        Bütçe isteğe özgü olduğundan budget_score, bütçe verilmişse tablodan
+        değil gerçek fiyat ve bütçeyle yerel olarak hesaplanır.
+        """
+        cohort = cohort_of(req)
+        if cohort is None:
+            return None
+        rows = self.matrix[cohort, [p.index for p in products]].astype(np.float64) / SCORE_SCALE
+        has_budget = bool(req.budget_min or req.budget_max)
+        tone = build_profile_tone(req.purpose, req.recipient.relationship)
+        scores_by_id = {}
+        for p, row in zip(products, rows.tolist()):
+            scores = dict(zip(SCORE_FIELDS, row))
+            if has_budget:
+                scores["budget_score"] = budget_score(
+                    p["price"], req.budget_min, req.budget_max, p["category"], tone
+                )
+            scores_by_id[p["id"]] = scores
+        self.hits += 1
+        return scores_by_id
+
+    def stats(self) -> dict:
+        return {
+            "cohorts": COHORT_COUNT,
+            "products": len(self.meta["ids"]),
+            "catalog_version": self.catalog_version,
+            "source": self.meta.get("source"),
+            "fallback_cells": self.meta.get("fallback_cells", 0),
+            "created_at": self.meta.get("created_at"),
+            "hits": self.hits,
+        }
+
+
+# -------------------------------------------------
+# Çevrimdışı üretim (süreç havuzu)
+# -------------------------------------------------
+# Her worker süreci kataloğu ve OpenAI istemcisini bir kez kurar
+_worker: dict = {}
+
+
+def _init_worker(catalog_path: Optional[str], use_openai: bool, max_output_tokens: int, retries: int) -> None:
+    catalog = load_catalog(catalog_path) if catalog_path else compact_catalog(PRODUCT_CATALOG)
+    # Heuristik budget_score fiyat ister; bütçesiz kohortlarda değeri skoru etkilemez
+    snapshot = PriceSnapshot(catalog)
+    _worker["products"] = list(CatalogIndex(catalog, snapshot.prices()).all())
+    _worker["client"] = None
+    if use_openai:
+        from openai import OpenAI
+
+        _worker["client"] = OpenAI(timeout=float(os.getenv("OPENAI_TIMEOUT_S", "20")))
+    _worker["max_output_tokens"] = max_output_tokens
+    _worker["retries"] = retries
+
+
+def _score_chunk(req: RecommendRequest, chunk: list) -> dict:
+    client = _worker["client"]
+    scores_by_id: dict = {}
+    pending = chunk
+    for _ in range(_worker["retries"] + 1):
+        try:
+            scores_by_id.update(
+                request_openai_scores(client, req, pending, _worker["max_output_tokens"])
+            )
+        except Exception as e:
+            logger.warning(f"Kohort skor parçası ({len(pending)} ürün) başarısız: {e!r}")
+        pending = [p for p in pending if p["id"] not in scores_by_id]
+        if not pending:
+            break
+    return scores_by_id
+
+
+def score_cohort(cohort: int) -> Tuple[int, np.ndarray, int]:
+    """Bir kohortu tüm katalog için skorla. Dönen: (kohort, uint8 satırlar, fallback sayısı)"""
+    req = cohort_request(cohort)
+    products = _worker["products"]
+    if _worker["client"] is None:
+        scores_by_id = local_scores(req, products)
+    else:
+        scores_by_id = {}
+        for chunk in plan_scoring_chunks(products, _worker["max_output_tokens"]):
+            scores_by_id.update(_score_chunk(req, chunk))
+    missing = [p for p in products if p["id"] not in scores_by_id]
+    if missing:
+        scores_by_id.update(local_scores(req, missing))
+    rows = np.array(
+        [
+            [scores_by_id.get(p["id"], NEUTRAL_SCORES)[field] for field in SCORE_FIELDS]
+            for p in products
+        ],
+        dtype=np.float64,
+    )
+    quantized = np.rint(np.clip(rows, 0.0, 1.0) * SCORE_SCALE).astype(np.uint8)
+    return cohort, quantized, len(missing)
+
+
+def build_cohort_table(
+    path: str,
+    catalog_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    use_openai: bool = False,
+    max_output_tokens: int = SCORING_MAX_OUTPUT_TOKENS,
+    retries: int = 1,
+) -> dict:
+    """Tüm kohortları süreç havuzunda skorla, tabloyu path'e (.npy) ve meta dosyasına yaz."""
+    catalog = load_catalog(catalog_path) if catalog_path else compact_catalog(PRODUCT_CATALOG)
+    table = np.zeros((COHORT_COUNT, len(catalog), len(SCORE_FIELDS)), dtype=np.uint8)
+    fallback_cells = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(catalog_path, use_openai, max_output_tokens, retries),
+    ) as pool:
+        chunksize = 1 if use_openai else max(1, COHORT_COUNT // (4 * (workers or os.cpu_count() or 1)))
+        for done, (cohort, rows, missing) in enumerate(
+            pool.map(score_cohort, range(COHORT_COUNT), chunksize=chunksize), 1
+        ):
+            table[cohort] = rows
+            fallback_cells += missing
+            if done % max(1, COHORT_COUNT // 10) == 0:
+                logger.info("Kohortlar: %d/%d (%.1f sn)", done, COHORT_COUNT, time.perf_counter() - started)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.save(path, table)
+    meta = {
+        "ids": [p["id"] for p in catalog],
+        "catalog_version": content_version(catalog),
+        "dimensions": {k: list(v) for k, v in DIMENSIONS.items()},
+        "source": f"openai:{SCORING_MODEL}" if use_openai else "local",
+        "fallback_cells": fallback_cells,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Kohort skor tablosunu üret.")
+    parser.add_argument("--out", default="data/cohort_scores.npy")
+    parser.add_argument(
+        "--catalog",
+        default=os.getenv("GIFTAI_CATALOG_PATH"),
+        help="Katalog dosyası (.jsonl / .csv / .sqlite); yoksa yerleşik katalog.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Süreç sayısı (varsayılan: CPU sayısı).")
+    parser.add_argument("--local", action="store_true", help="OpenAI yerine yerel heuristik skorlayıcı.")
+    parser.add_argument("--max-output-tokens", type=int, default=SCORING_MAX_OUTPUT_TOKENS)
+    parser.add_argument("--retries", type=int, default=1, help="Başarısız parça başına tekrar sayısı.")
+    args = parser.parse_args()
+
+    use_openai = not args.local
+    if use_openai and not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY yok, yerel heuristik skorlayıcı kullanılıyor.", file=sys.stderr)
+        use_openai = False
+
+    meta = build_cohort_table(
+        args.out,
+        catalog_path=args.catalog,
+        workers=args.workers,
+        use_openai=use_openai,
+        max_output_tokens=args.max_output_tokens,
+        retries=args.retries,
+    )
+    size = os.path.getsize(args.out)
+    print(
+        f"{COHORT_COUNT} kohort × {len(meta['ids'])} ürün -> {args.out} "
+        f"({size / 1024:.1f} KiB, kaynak: {meta['source']}, fallback: {meta['fallback_cells']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# giftai/deadline.py
+"""
+İstek başına süre bütçesi (deadline) ve bu bütçeye sığan skorlama
+stratejisinin seçimi.
+
+Bütçe X-Deadline-Ms başlığından ya da urgency'ye göre bir politikadan
+(GIFTAI_DEADLINE_POLICY_MS) gelir. Önbellek ve kohort tablosu anında
+cevap verdiği için her zaman önce onlara bakılır; sonra kalan süreye göre
+tam model, ucuz model veya yerel heuristik seçilir.
+"""
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from giftai.resilience import LatencyTracker
+
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+STRATEGY_FULL = "full"
+STRATEGY_CHEAP = "cheap"
+STRATEGY_HEURISTIC = "heuristic"
+
+
+class Deadline:
+    """İstek geldiği anda başlayan süre bütçesi."""
+
+    __slots__ = ("budget_s", "expires_at", "_clock")
+
+    def __init__(self, budget_s: float, clock: Callable[[], float] = time.monotonic):
+        self.budget_s = budget_s
+        self.expires_at = clock() + budget_s
+        self._clock = clock
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+
+def parse_policy(text: str) -> Dict[str, float]:
+    """"flexible=20000,same_day=4000" -> {"flexible": 20.0, "same_day": 4.0} (saniye)."""
+    policy = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        urgency, _, ms = part.partition("=")
+        policy[urgency.strip()] = float(ms) / 1000.0
+    return policy
+
+
+def parse_deadline_header(value: Optional[str]) -> Optional[float]:
+    """X-Deadline-Ms değerini saniyeye çevir; yoksa None, geçersizse ValueError."""
+    if value is None or not value.strip():
+        return None
+    ms = float(value)
+    if not ms > 0:
+        raise ValueError(f"{DEADLINE_HEADER} pozitif olmalı: {value!r}")
+    return ms / 1000.0
+
+
+class StrategySelector:
+    """
+    Kalan süreye sığan en iyi skorlama stratejisini seç.
+
+    models: [(strateji, model adı, ön kabul süresi sn), ...] tercih sırasıyla.
+    Bir modelin beklenen süresi, yeterli örnek varsa gözlenen p95'i, yoksa
+    ön kabul süresidir. Kalan süre beklenen süre + margin_s'ye yetmiyorsa
+    sıradakine geçilir; hiçbiri sığmazsa yerel heuristik seçilir.
+    """
+
+    def __init__(
+        self,
+        models: List[Tuple[str, str, float]],
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        margin_s: float = 0.05,
+    ):
+        self.models = models
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.margin_s = margin_s
+        self.latency = {model: LatencyTracker() for _, model, _ in models}
+        self.chosen: Dict[str, int] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        tracker = self.latency.get(model)
+        if tracker is not None:
+            tracker.record(seconds)
+
+    def expected_s(self, model: str, prior_s: float) -> float:
+        tracker = self.latency[model]
+        if len(tracker) < self.min_samples:
+            return prior_s
+        return tracker.quantile(self.quantile)
+
+    def fits_expected(self, model: str, timeout_s: float) -> bool:
+        """
+        timeout_s, modelin beklenen süresine yetiyor mu? Yetmiyorsa o çağrının
+        timeout'u upstream hakkında bir şey söylemez. Bilinmeyen modelde True.
+        """
+        for _, name, prior_s in self.models:
+            if name == model:
+                return timeout_s >= self.expected_s(model, prior_s)
+        return True
+
+    def choose(self, remaining_s: float) -> Tuple[str, Optional[str]]:
+        """(strateji, model) döndür; heuristik için model None."""
+        strategy, chosen_model = STRATEGY_HEURISTIC, None
+        for name, model, prior_s in self.models:
+            if remaining_s >= self.expected_s(model, prior_s) + self.margin_s:
+                strategy, chosen_model = name, model
+                break
+        self.chosen[strategy] = self.chosen.get(strategy, 0) + 1
+        return strategy, chosen_model
+
+    def stats(self) -> dict:
+        return {
+            "margin_s": self.margin_s,
+            "models": [
+                {
+                    "strategy": name,
+                    "model": model,
+                    "expected_s": self.expected_s(model, prior_s),
+                    "samples": len(self.latency[model]),
+                }
+                for name, model, prior_s in self.models
+            ],
+            "chosen": dict(self.chosen),
+        }
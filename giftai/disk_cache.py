@@ -0,0 +1,211 @@
+# giftai/disk_cache.py
+import json
+import time
+import atexit
+import asyncio
+import sqlite3
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger("giftai")
+
+
+class SQLiteScoreStore:
+    """
+    scores_by_id sonuçları için diskte tutulan, süreçler arası paylaşılan önbellek.
+
+    - WAL modu: birden fazla uvicorn/gunicorn worker aynı dosyayı aynı anda
+      okuyabilir, yazma sırasında okuyucular beklemez.
+    - Yazmalar bellekte biriktirilip tek transaction ile (batch) diske basılır.
+    - Kayıt sayısı max_entries'i aşınca en eski kayıtlar silinir.
+    - TTL duvar saatine göre tutulur; böylece restart sonrası da geçerlidir.
+    - Event loop'tan get_async kullanılmalı: disk okuması (ve busy_timeout
+      beklemesi) bir worker thread'inde yapılır, loop bloklanmaz.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        ttl_s: float = 7 * 24 * 3600,
+        batch_size: int = 64,
+        flush_interval_s: float = 1.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+
+        self._local = threading.local()
+        self._pending: dict = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        # get hem event loop'tan (to_thread) hem Streamlit thread'lerinden çağrılır
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS scores_created_at ON scores(created_at)"
+            )
+        self._approx_count = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="giftai-score-db-flush", daemon=True
+        )
+        self._flusher.start()
+        # Lifespan kapanışı çalışmasa bile bekleyen yazmalar kaybolmasın
+        atexit.register(self.close)
+
+    # Her thread kendi bağlantısını kullanır (sqlite3 bağlantıları thread'ler
+    # arasında paylaşılmamalı).
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _get_pending(self, key: str) -> Optional[dict]:
+        """Henüz diske basılmamış yazmalar; disk okuması gerektirmez."""
+        with self._pending_lock:
+            pending = self._pending.get(key)
+        if pending is None:
+            return None
+        self._count(hit=True)
+        return pending[1]
+
+    def _read(self, key: str) -> Optional[dict]:
+        try:
+            row = self._conn().execute(
+                "SELECT value, created_at FROM scores WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Score DB okuma hatası: {e}")
+            self._count(hit=False)
+            return None
+
+        if row is None or row[1] + self.ttl_s <= time.time():
+            self._count(hit=False)
+            return None
+        self._count(hit=True)
+        return json.loads(row[0])
+
+    def get(self, key: str) -> Optional[dict]:
+        pending = self._get_pending(key)
+        if pending is not None:
+            return pending
+        return self._read(key)
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        """get'in event loop'u bloklamayan sürümü."""
+        pending = self._get_pending(key)
+        if pending is not None:
+            return pending
+        return await asyncio.to_thread(self._read, key)
+
+    def set(self, key: str, value: dict) -> None:
+        if self._closed:
+            return
+        with self._pending_lock:
+            self._pending[key] = (time.time(), value)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+
+        rows = [
+            (key, json.dumps(value, ensure_ascii=False, separators=(",", ":")), created_at)
+            for key, (created_at, value) in batch.items()
+        ]
+        with self._flush_lock:
+            conn = self._conn()
+            try:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO scores (key, value, created_at) VALUES (?, ?, ?)",
+                        rows,
+                    )
+                self.writes += len(rows)
+                self._approx_count += len(rows)
+                if self._approx_count > self.max_entries:
+                    self._evict(conn)
+            except sqlite3.Error as e:
+                logger.warning(f"Score DB yazma hatası, {len(rows)} kayıt atlandı: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM scores WHERE created_at <= ?", (time.time() - self.ttl_s,))
+            count = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM scores WHERE key IN ("
+                    " SELECT key FROM scores ORDER BY created_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+                count -= overflow
+        self._approx_count = count
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval_s)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=self.flush_interval_s + 1.0)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "path": self.path,
+            "approx_size": self._approx_count,
+            "max_entries": self.max_entries,
+            "pending_writes": len(self._pending),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": (hits / lookups) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
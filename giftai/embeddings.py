@@ -0,0 +1,165 @@
+# giftai/embeddings.py
+"""
+Katalog gömmeleri (embedding) için çevrimdışı üretim + istek anında benzerlik.
+
+Matris float32 .npy olarak yazılır ve np.load(mmap_mode="r") ile açılır; böylece
+aynı makinedeki tüm worker'lar aynı sayfaları paylaşır. Yanına ürün id'leri,
+katalog içerik sürümü (content_version) ve embedder ayarlarını içeren bir
+.json dosyası yazılır; sadece id'ler değil ad / açıklama / etiket değişince de
+dosya kataloğa uymaz sayılır ve yeniden üretilmelidir.
+
+Üretmek için:
+    python -m giftai.embeddings --out data/catalog_embeddings.npy
+"""
+import os
+import json
+import zlib
+import logging
+import argparse
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_source import compact_catalog, content_version, load_catalog
+
+logger = logging.getLogger("giftai")
+
+
+class HashingEmbedder:
+    """
+    Harici model / ağ gerektirmeyen deterministik embedder: karakter n-gram'ları
+    crc32 ile sabit boyutlu bir vektöre işaretli olarak hash'lenir, sonra L2
+    normalize edilir. "fotoğrafçılık" ile "fotoğraf" gibi ek almış Türkçe
+    kelimeler ortak n-gram'lar sayesinde birbirine yakın düşer.
+    """
+
+    def __init__(self, dim: int = 256, ngram_min: int = 3, ngram_max: int = 4):
+        self.dim = dim
+        self.ngram_min = ngram_min
+        self.ngram_max = ngram_max
+
+    def config(self) -> dict:
+        return {
+            "type": "hashing",
+            "dim": self.dim,
+            "ngram_min": self.ngram_min,
+            "ngram_max": self.ngram_max,
+        }
+
+    def _ngrams(self, text: str) -> Iterable[str]:
+        for word in text.lower().replace("_", " ").split():
+            padded = f" {word} "
+            for n in range(self.ngram_min, self.ngram_max + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for gram in self._ngrams(text):
+            h = zlib.crc32(gram.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            matrix[i] = self.embed(text)
+        return matrix
+
+
+def product_text(p: dict) -> str:
+    return " ".join([p["name"], p["category"], " ".join(p["tags"]), p["base_description"]])
+
+
+def meta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def build_catalog_embeddings(
+    catalog: List[dict], path: str, embedder: Optional[HashingEmbedder] = None
+) -> None:
+    """Kataloğu katalog sırasıyla gömüp path'e (.npy) ve meta dosyasına yaz."""
+    embedder = embedder or HashingEmbedder()
+    matrix = embedder.embed_many([product_text(p) for p in catalog])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.save(path, matrix)
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "ids": [p["id"] for p in catalog],
+                "catalog_version": content_version(catalog),
+                "embedder": embedder.config(),
+            },
+            f,
+            ensure_ascii=False,
+        )
+
+
+class CatalogEmbeddings:
+    """Memory-mapped katalog matrisi + sorgu embedder'ı."""
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        ids: List[str],
+        embedder: HashingEmbedder,
+        catalog_version: Optional[str] = None,
+    ):
+        self.matrix = matrix
+        self.ids = ids
+        self.embedder = embedder
+        self.catalog_version = catalog_version
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogEmbeddings":
+        with open(meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        cfg = meta["embedder"]
+        embedder = HashingEmbedder(
+            dim=cfg["dim"], ngram_min=cfg["ngram_min"], ngram_max=cfg["ngram_max"]
+        )
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape != (len(meta["ids"]), embedder.dim):
+            raise ValueError(f"Embedding matrisi meta ile uyuşmuyor: {matrix.shape}")
+        # Sürümsüz (eski) dosyalar hiçbir katalogla eşleşmez
+        return cls(matrix, meta["ids"], embedder, meta.get("catalog_version"))
+
+    def matches_catalog(self, catalog_version: str) -> bool:
+        """Matris bu içerik sürümündeki katalogdan mı üretildi (bkz. content_version)?"""
+        return self.catalog_version is not None and self.catalog_version == catalog_version
+
+    def similarities(self, texts: Iterable[str]) -> Optional[np.ndarray]:
+        """
+        Hobi / stil / serbest metinleri tek bir sorgu vektörüne göm ve tüm
+        katalogla tek matris-vektör çarpımında kosinüs benzerliğini hesapla.
+        Metin yoksa None döner.
+        """
+        text = " ".join(t for t in texts if t)
+        if not text.strip():
+            return None
+        query = self.embedder.embed(text)
+        return self.matrix @ query
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Katalog embedding matrisini üret.")
+    parser.add_argument("--out", default="data/catalog_embeddings.npy")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument(
+        "--catalog",
+        default=os.getenv("GIFTAI_CATALOG_PATH"),
+        help="Katalog dosyası (.jsonl / .csv / .sqlite); yoksa yerleşik katalog.",
+    )
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.catalog) if args.catalog else compact_catalog(PRODUCT_CATALOG)
+    build_catalog_embeddings(catalog, args.out, HashingEmbedder(dim=args.dim))
+    print(f"{len(catalog)} ürün -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
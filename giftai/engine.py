@@ -0,0 +1,213 @@
+# giftai/engine.py
+"""
+Öneri motorunun ön yüzden bağımsız çekirdeği: profil tonu, açıklama,
+ağırlıklar, aday seçimi (bütçe + etiket daraltma + ön sıralama), skorlama
+parça planı ve yerel / OpenAI skorlama. main.py (FastAPI) ve app.py
+(Streamlit) aynı fonksiyonları buradan kullanır.
+"""
+from typing import List, Optional, Tuple
+
+from giftai import fastjson
+from giftai.chunked import plan_chunks
+from giftai.heuristic import heuristic_scores
+from giftai.models import RecommendRequest
+from giftai.prerank import matching_tags, prerank, tokenize
+from giftai.prompt import COMPACT_OUTPUT_TOKENS_PER_ITEM, SCORES_TEXT_FORMAT, ScoringPrompt
+
+SCORING_MODEL = "gpt-4.1-mini"
+SCORING_MAX_OUTPUT_TOKENS = 600
+
+
+def build_profile_tone(purpose: str, relationship: Optional[str]) -> str:
+    if relationship == "partner" or purpose == "romantik":
+        return "romantik"
+    if purpose == "kurumsal" or relationship == "colleague":
+        return "kurumsal"
+    if purpose == "ozur":
+        return "telafi"
+    return "nötr"
+
+
+# İlişkiye göre hitap ve tona göre açıklama kalıbı
+RELATIONSHIP_TARGETS = {
+    "partner": "sevgilin veya eşin",
+    "friend": "yakın arkadaşın",
+    "parent": "annen ya da baban",
+    "sibling": "kardeşin",
+    "colleague": "iş arkadaşın",
+    "other": "hediye almak istediğin kişi",
+    None: "hediye almak istediğin kişi",
+}
+TONE_DESCRIPTION_TEMPLATES = {
+    "romantik": (
+        "{hedef} için düşünülmüş, birlikte anı biriktirmeyi ön plana çıkaran "
+        "romantik bir seçenek. "
+    ),
+    "kurumsal": "İş ortamında rahatlıkla verilebilecek, şık ama risksiz bir ofis hediyesi. ",
+    "telafi": "Küçük bir jestle ortamı yumuşatmak ve gönül almak için uygun bir tercih. ",
+    "nötr": "Günlük hayatta kullanılabilir, çoğu kişinin sevebileceği güvenli bir tercih. ",
+}
+# (ton, ilişki) -> hazır açıklama öneki; istek başına sadece sözlük araması + birleştirme
+DESCRIPTION_PREFIXES = {
+    (tone, relationship): template.format(hedef=hedef)
+    for tone, template in TONE_DESCRIPTION_TEMPLATES.items()
+    for relationship, hedef in RELATIONSHIP_TARGETS.items()
+}
+
+
+def description_prefix(purpose: str, relationship: Optional[str]) -> str:
+    tone = build_profile_tone(purpose, relationship)
+    if relationship not in RELATIONSHIP_TARGETS:
+        relationship = None
+    return DESCRIPTION_PREFIXES[(tone, relationship)]
+
+
+def build_description(product: dict, req: RecommendRequest, prefix: Optional[str] = None) -> str:
+    """prefix verilirse (description_prefix) istek başına bir kez hesaplanıp tekrar kullanılır."""
+    if prefix is None:
+        prefix = description_prefix(req.purpose, req.recipient.relationship)
+    return prefix + product["base_description"]
+
+
+def compute_weights(req: RecommendRequest) -> dict:
+    # Varsayılan ağırlıklar
+    w_interest = 0.4
+    w_emotion = 0.4
+    w_budget = 0.2
+
+    # Romantik / partner -> duygusal ağırlık
+    if req.purpose == "romantik" or req.recipient.relationship == "partner":
+        w_emotion += 0.15
+        w_budget -= 0.1
+
+    # Kurumsal / colleague -> bütçe + nötr
+    if req.purpose == "kurumsal" or req.recipient.relationship == "colleague":
+        w_budget += 0.15
+        w_emotion -= 0.1
+
+    # Risk seviyesine göre ayar
+    if req.risk_level == "cesur":
+        w_interest += 0.05
+        w_emotion += 0.05
+        w_budget -= 0.1
+    elif req.risk_level == "guvenli":
+        w_budget += 0.1
+        w_emotion -= 0.05
+
+    # Normalizasyon
+    total = w_interest + w_emotion + w_budget
+    return {
+        "interest": w_interest / total,
+        "emotion": w_emotion / total,
+        "budget": w_budget / total,
+    }
+
+
+def build_scoring_profile(req: RecommendRequest) -> dict:
+    return {
+        "age": req.recipient.age,
+        "gender": req.recipient.gender,
+        "relationship": req.recipient.relationship,
+        "purpose": req.purpose,
+        "risk_level": req.risk_level,
+        "urgency": req.urgency,
+        "hobbies": req.recipient.hobbies,
+        "style_tags": req.recipient.style_tags,
+        "free_text": req.free_text,
+        "budget_min": req.budget_min,
+        "budget_max": req.budget_max,
+    }
+
+
+def local_scores(req: RecommendRequest, products: List) -> dict:
+    """
+    LLM'siz yerel skorlar: "fast" mod ve upstream'e ulaşılamadığında
+    (key yok, hata, timeout, açık devre) kullanılan degrade yol.
+    """
+    return heuristic_scores(
+        products,
+        req.recipient.hobbies,
+        req.recipient.style_tags,
+        build_profile_tone(req.purpose, req.recipient.relationship),
+        req.budget_min,
+        req.budget_max,
+    )
+
+
+def select_candidates(
+    index,
+    req: RecommendRequest,
+    k: int,
+    embeddings=None,
+    tag_narrowing: bool = True,
+) -> Tuple[list, list]:
+    """
+    Bütçe filtresi + etiket daraltma + yerel ön sıralama. Dönen:
+    (filtered_products, shortlist); LLM'e sadece shortlist gider.
+
+    index bir CatalogIndex, embeddings (varsa) o indeksin kataloğuyla eşleşen
+    CatalogEmbeddings'tir. k <= 0 ise ön sıralama kapalıdır.
+    """
+    # Bütçeye göre ürünleri kabaca filtrele (çok uçları at)
+    budget = (req.budget_min, req.budget_max)
+    candidates = index.filter_budget(*budget)
+    if not candidates:
+        # Hiç bulunamazsa hepsini kullan
+        budget = (None, None)
+        candidates = index.all()
+    filtered_products = list(candidates)
+
+    # Hobi / stil eşleşmesi olan ürünler ters etiket indeksinden bulunur
+    pool = filtered_products
+    tokens = tokenize(req.recipient.hobbies + req.recipient.style_tags)
+    if tag_narrowing and tokens and len(filtered_products) > k > 0:
+        tags = matching_tags(tokens, index.tags())
+        if tags:
+            matched = index.filter(*budget, tags=tags)
+            if len(matched) >= k:
+                pool = list(matched)
+
+    semantic = None
+    if embeddings is not None and len(pool) > k > 0:
+        sims = embeddings.similarities(
+            req.recipient.hobbies + req.recipient.style_tags + [req.free_text or ""]
+        )
+        if sims is not None:
+            semantic = sims[[p.index for p in pool]]
+    shortlist = prerank(
+        pool,
+        req.recipient.hobbies,
+        req.recipient.style_tags,
+        build_profile_tone(req.purpose, req.recipient.relationship),
+        k,
+        semantic=semantic,
+    )
+    return filtered_products, shortlist
+
+
+def plan_scoring_chunks(products: List, max_output_tokens: int = SCORING_MAX_OUTPUT_TOKENS) -> List[list]:
+    """Adayları, her kompakt skorlama cevabı max_output_tokens'a sığacak parçalara böl."""
+    return plan_chunks(products, max_output_tokens, tokens_per_item=COMPACT_OUTPUT_TOKENS_PER_ITEM)
+
+
+def request_openai_scores(
+    client,
+    req: RecommendRequest,
+    products: List,
+    max_output_tokens: int = SCORING_MAX_OUTPUT_TOKENS,
+) -> dict:
+    """
+    Tek bir senkron OpenAI skorlama çağrısı (kompakt prompt + şemalı çıktı).
+    Hata veya bozuk JSON'da exception fırlatır; fallback ve önbellek kararı
+    çağırana aittir.
+    """
+    prompt = ScoringPrompt(req, products)
+    response = client.responses.create(
+        model=SCORING_MODEL,
+        input=prompt.input,
+        text=SCORES_TEXT_FORMAT,
+        max_output_tokens=max_output_tokens,
+    )
+    raw = response.output[0].content[0].text  # type: ignore
+    data = fastjson.loads(raw)
+    return prompt.decode(data.get("scores", []))
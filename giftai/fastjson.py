@@ -0,0 +1,23 @@
+# giftai/fastjson.py
+"""
+Sıcak yoldaki JSON işlemleri: orjson kuruluysa onu, değilse stdlib json'u
+kullanır. Çıktı her iki durumda da kompakt UTF-8'dir.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson isteğe bağlı; yoksa stdlib
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
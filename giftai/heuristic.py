@@ -0,0 +1,106 @@
+# giftai/heuristic.py
+from typing import Iterable, Optional, Sequence
+
+from giftai.prerank import TONE_CATEGORY_HINTS, TONE_TAG_HINTS, token_matches, tokenize
+
+# Kategorinin tek başına taşıdığı duygusal etki (deneyim / anı > teknoloji > ofis)
+CATEGORY_EMOTION = {
+    "memory": 0.85,
+    "experience": 0.8,
+    "photo": 0.75,
+    "music": 0.7,
+    "wellness": 0.65,
+    "coffee": 0.6,
+    "tech": 0.55,
+    "corporate": 0.45,
+}
+DEFAULT_CATEGORY_EMOTION = 0.6
+
+# Tona uymayan etiketler duygusal etkiyi düşürür (ofiste romantik hediye vb.)
+TONE_AVOID_TAGS = {
+    "kurumsal": {"romantik", "kişiselleştirilebilir"},
+    "romantik": {"kurumsal", "ofis", "nötr"},
+}
+
+# Profilde hobi / stil yokken ilgi skoru
+NO_INTEREST_SIGNAL = 0.5
+# Bütçe verilmemişse bütçe skoru
+NO_BUDGET_SIGNAL = 0.7
+
+
+def _clamp(value: float) -> float:
+    return max(0.0, min(1.0, value))
+
+
+def interest_score(tags: Sequence[str], tokens: Sequence[str]) -> float:
+    if not tokens:
+        return NO_INTEREST_SIGNAL
+    hits = 0
+    for token in tokens:
+        for tag in tags:
+            if token_matches(token, tag):
+                hits += 1
+                break
+    # İlk eşleşme en değerlisi; 3 eşleşmede tavan
+    return _clamp(0.3 + 0.7 * min(hits, 3) / 3 + (0.1 if hits else 0.0))
+
+
+def emotion_score(category: str, tags: Sequence[str], tone: str) -> float:
+    score = CATEGORY_EMOTION.get(category, DEFAULT_CATEGORY_EMOTION)
+    tone_tags = TONE_TAG_HINTS.get(tone, ())
+    score += 0.05 * sum(1 for tag in tags if tag in tone_tags)
+    avoid_tags = TONE_AVOID_TAGS.get(tone, ())
+    score -= 0.15 * sum(1 for tag in tags if tag in avoid_tags)
+    if category in TONE_CATEGORY_HINTS.get(tone, ()):
+        score += 0.1
+    return _clamp(score)
+
+
+def budget_score(
+    price: float,
+    budget_min: Optional[float],
+    budget_max: Optional[float],
+    category: str,
+    tone: str,
+) -> float:
+    if not budget_min and not budget_max:
+        score = NO_BUDGET_SIGNAL
+    elif budget_min and price < budget_min:
+        score = 1.0 - (budget_min - price) / budget_min
+    elif budget_max and price > budget_max:
+        score = 1.0 - (price - budget_max) / budget_max
+    else:
+        score = 1.0
+    # Kurumsal bağlamda ofise uygun ürünler bütçe/bağlam uyumunda öne çıkar
+    if tone == "kurumsal" and category in TONE_CATEGORY_HINTS["kurumsal"]:
+        score += 0.1
+    return _clamp(score)
+
+
+def heuristic_scores(
+    products: Sequence,
+    hobbies: Iterable[str],
+    style_tags: Iterable[str],
+    tone: str,
+    budget_min: Optional[float],
+    budget_max: Optional[float],
+) -> dict:
+    """
+    LLM'siz, süreç içi skorlayıcı. Dönen dict OpenAI skorlamasıyla aynı şekildedir:
+    {product_id: {"interest_score":..., "emotion_score":..., "budget_score":...}}
+
+    - interest: hobi / stil kelimelerinin ürün etiketleriyle örtüşmesi
+    - emotion: kategori + profil tonu (build_profile_tone) ipuçları
+    - budget: fiyatın budget_min / budget_max aralığına uzaklığı
+    """
+    tokens = tokenize(list(hobbies) + list(style_tags))
+    scores_by_id = {}
+    for p in products:
+        tags = p["tags"]
+        category = p["category"]
+        scores_by_id[p["id"]] = {
+            "interest_score": interest_score(tags, tokens),
+            "emotion_score": emotion_score(category, tags, tone),
+            "budget_score": budget_score(p["price"], budget_min, budget_max, category, tone),
+        }
+    return scores_by_id
@@ -0,0 +1,69 @@
+# giftai/models.py
+"""FastAPI ve Streamlit ön yüzlerinin paylaştığı istek / yanıt modelleri."""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class Recipient(BaseModel):
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    relationship: Optional[str] = None  # partner, friend, parent, sibling, colleague, other
+    hobbies: List[str] = []
+    style_tags: List[str] = []
+
+
+class RecommendRequest(BaseModel):
+    recipient: Recipient
+    purpose: str              # dogum_gunu, romantik, yeni_baslangic, ozur, kurumsal, icimden_geldi
+    risk_level: str           # guvenli | normal | cesur
+    urgency: str              # flexible | few_days | same_day
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    free_text: Optional[str] = ""
+    top_n: int = 3
+    scoring_mode: str = "llm"  # llm | fast (sadece yerel heuristik, LLM çağrısı yok)
+
+
+class ScoreBlock(BaseModel):
+    interest_score: float
+    emotion_score: float
+    budget_score: float
+
+
+class GiftResult(BaseModel):
+    name: str
+    description: str
+    price: float
+    scores: ScoreBlock
+    final_score: float
+
+
+class RecommendResponse(BaseModel):
+    results: List[GiftResult]
+    # POST /recommend/{session_id}/rerank ile skorlar yeniden kullanılabilir
+    session_id: Optional[str] = None
+
+
+class RerankResponse(RecommendResponse):
+    # Bütçe skorlamadakinden farklıysa budget_score gerçek fiyatla yerel olarak
+    # yeniden hesaplanır; interest / emotion skorları LLM'in verdiği gibi kalır
+    budget_rescored: bool = False
+
+
+class RerankRequest(BaseModel):
+    """Verilmeyen alanlar oturumdaki değerini korur; bütçe için null = sınır yok."""
+    budget_min: Optional[float] = None
+    budget_max: Optional[float] = None
+    risk_level: Optional[str] = None  # guvenli | normal | cesur
+    top_n: Optional[int] = None
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    results: Optional[List[GiftResult]] = None
+    error: Optional[str] = None
+
+
+class BatchRecommendResponse(BaseModel):
+    items: List[BatchItemResult]
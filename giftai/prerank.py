@@ -0,0 +1,151 @@
+# giftai/prerank.py
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Profil tonuna göre öne çıkan etiket / kategoriler (build_profile_tone çıktısı)
+TONE_TAG_HINTS: Dict[str, set] = {
+    "romantik": {"romantik", "anı", "deneyim", "spa", "fotoğraf", "kişiselleştirilebilir"},
+    "kurumsal": {"kurumsal", "ofis", "nötr", "şık"},
+    "telafi": {"rahatlama", "anı", "hediye", "kendine_zaman"},
+    "nötr": set(),
+}
+TONE_CATEGORY_HINTS: Dict[str, set] = {
+    "romantik": {"experience", "memory"},
+    "kurumsal": {"corporate"},
+    "telafi": {"experience", "wellness"},
+    "nötr": set(),
+}
+
+INTEREST_WEIGHT = 1.0
+TONE_TAG_WEIGHT = 0.5
+TONE_CATEGORY_WEIGHT = 0.5
+# Embedding kosinüs benzerliği (0..1) için ağırlık; tam benzerlik ~2 etiket eşleşmesi
+SEMANTIC_WEIGHT = 2.0
+
+
+def tokenize(values: Iterable[str]) -> List[str]:
+    """'müzik dinlemek', 'Retro' -> ['müzik', 'dinlemek', 'retro']"""
+    tokens = []
+    for value in values:
+        for token in str(value).lower().replace("_", " ").split():
+            if len(token) >= 3:
+                tokens.append(token)
+    return tokens
+
+
+def token_matches(token: str, tag: str) -> bool:
+    # Türkçe ekler için kaba prefix eşleşmesi: "kitaplar" ~ "kitap", "fotoğrafçılık" ~ "fotoğraf"
+    return token.startswith(tag) or tag.startswith(token)
+
+
+def matching_tags(tokens: Sequence[str], vocabulary: Iterable[str]) -> List[str]:
+    """Token'lardan en az biriyle (prerank_score'daki kuralla) eşleşen etiketler."""
+    return [tag for tag in vocabulary if any(token_matches(token, tag) for token in tokens)]
+
+
+def prerank_score(product, tokens: Sequence[str], tone: str, semantic: float = 0.0) -> float:
+    tags = product["tags"]
+    score = 0.0
+    for token in tokens:
+        for tag in tags:
+            if token_matches(token, tag):
+                score += INTEREST_WEIGHT
+                break
+    tone_tags = TONE_TAG_HINTS.get(tone, ())
+    score += TONE_TAG_WEIGHT * sum(1 for tag in tags if tag in tone_tags)
+    if product["category"] in TONE_CATEGORY_HINTS.get(tone, ()):
+        score += TONE_CATEGORY_WEIGHT
+    return score + SEMANTIC_WEIGHT * max(0.0, semantic)
+
+
+def prerank(
+    products: Sequence,
+    hobbies: Iterable[str],
+    style_tags: Iterable[str],
+    tone: str,
+    k: int,
+    semantic: Optional[Sequence[float]] = None,
+) -> list:
+    """
+    LLM'e gitmeden önce ucuz, yerel bir ön sıralama ile en iyi k adayı seç.
+
+    Hobiler / stil etiketleri ürün tags ile, profil tonu (purpose/relationship)
+    etiket ve kategori ipuçlarıyla eşleştirilir. semantic verilirse (products
+    ile aynı sırada embedding benzerlikleri) skora eklenir. Eşit skorlarda
+    katalog sırası (ProductView.index) korunur; bütçe filtresinin fiyat
+    sırası kullanılsaydı zayıf sinyalli profillere hep en ucuz k ürün giderdi.
+    """
+    if k <= 0 or len(products) <= k:
+        return list(products)
+    tokens = tokenize(list(hobbies) + list(style_tags))
+    if semantic is None:
+        semantic = [0.0] * len(products)
+    scored = (
+        (prerank_score(p, tokens, tone, float(semantic[i])), -getattr(p, "index", i), p)
+        for i, p in enumerate(products)
+    )
+    return [p for _, _, p in heapq.nlargest(k, scored, key=lambda t: (t[0], t[1]))]
+
+
+def recall_at_n(
+    shortlist_ids: Iterable[str],
+    full_scores_by_id: dict,
+    weights: dict,
+    n: int,
+) -> Optional[float]:
+    """
+    Tüm adaylar skorlandığında ilk n'e giren ürünlerin ne kadarı kısa listede vardı?
+    """
+    def final(sc: dict) -> float:
+        return (
+            sc["interest_score"] * weights["interest"]
+            + sc["emotion_score"] * weights["emotion"]
+            + sc["budget_score"] * weights["budget"]
+        )
+
+    baseline = heapq.nlargest(n, full_scores_by_id, key=lambda pid: final(full_scores_by_id[pid]))
+    if not baseline:
+        return None
+    shortlist = set(shortlist_ids)
+    return sum(1 for pid in baseline if pid in shortlist) / len(baseline)
+
+
+class PrerankStats:
+    """Ön sıralamanın ne sıklıkla devreye girdiği ve gölge (shadow) recall ölçümleri."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.shortlisted = 0
+        self.candidates_in = 0
+        self.candidates_out = 0
+        self.recall_samples = 0
+        self.recall_sum = 0.0
+        self.recall_min: Optional[float] = None
+
+    def record_shortlist(self, n_in: int, n_out: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.candidates_in += n_in
+            self.candidates_out += n_out
+            if n_out < n_in:
+                self.shortlisted += 1
+
+    def record_recall(self, recall: float) -> None:
+        with self._lock:
+            self.recall_samples += 1
+            self.recall_sum += recall
+            self.recall_min = recall if self.recall_min is None else min(self.recall_min, recall)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "shortlisted": self.shortlisted,
+                "avg_candidates_in": (self.candidates_in / self.requests) if self.requests else 0.0,
+                "avg_candidates_out": (self.candidates_out / self.requests) if self.requests else 0.0,
+                "recall_samples": self.recall_samples,
+                "recall_mean": (self.recall_sum / self.recall_samples) if self.recall_samples else None,
+                "recall_min": self.recall_min,
+            }
@@ -0,0 +1,92 @@
+# giftai/pricing.py
+import json
+import time
+import random
+import hashlib
+from array import array
+from typing import Callable, List, Optional
+
+# Base price etrafındaki oynama aralığı
+PRICE_FACTOR_MIN = 0.9
+PRICE_FACTOR_MAX = 1.15
+
+
+def generate_price(base_price: int, rng: random.Random = random) -> float:
+    """Base price etrafında makul bir TL fiyat üret."""
+    factor = rng.uniform(PRICE_FACTOR_MIN, PRICE_FACTOR_MAX)
+    price = base_price * factor
+    # 10 TL yuvarla ve float olarak döndür
+    return float(int(round(price / 10.0) * 10))
+
+
+def catalog_version(catalog: List[dict]) -> str:
+    """Katalog içeriğinden kısa, deterministik bir sürüm etiketi üret."""
+    raw = json.dumps(
+        [(p["id"], p["base_price"]) for p in catalog],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class PriceSnapshot:
+    """
+    Katalog sürümü (ve isteğe bağlı zaman dilimi) başına bir kez hesaplanan fiyatlar.
+
+    Fiyatlar katalog sırasıyla kompakt bir array('d') içinde tutulur ve ürün
+    indeksiyle okunur; istek başına RNG çalışmaz. Her ürünün fiyatı
+    (sürüm, dilim, ürün id) üçlüsünden seed'lenir, yani aynı dilimde tüm
+    worker'lar ve tüm istekler aynı fiyatı görür.
+
+    bucket_s verilirse fiyatlar her bucket_s saniyede bir yenilenir;
+    None / 0 ise sadece katalog sürümü değişince değişir. Nesne tek bir
+    dilimin fiyatlarını tutar ve değişmez; sonraki dilimin fiyatları
+    for_bucket() ile (istek yolunun dışında) yeni bir nesne olarak kurulur.
+    """
+
+    def __init__(
+        self,
+        catalog: List[dict],
+        version: Optional[str] = None,
+        bucket_s: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        bucket: Optional[int] = None,
+    ):
+        self.catalog = catalog
+        self.version = version or catalog_version(catalog)
+        self.bucket_s = bucket_s or None
+        self._clock = clock
+        self.bucket = self.current_bucket() if bucket is None else bucket
+        self._prices = self._compute(self.bucket)
+
+    def current_bucket(self) -> int:
+        """Saate göre şu anki dilim (bu nesnenin dilimi değil)."""
+        if self.bucket_s is None:
+            return 0
+        return int(self._clock() // self.bucket_s)
+
+    def seconds_until_next(self) -> Optional[float]:
+        """Bu nesnenin diliminin bitmesine kalan süre; dilim yoksa None."""
+        if self.bucket_s is None:
+            return None
+        return (self.bucket + 1) * self.bucket_s - self._clock()
+
+    def for_bucket(self, bucket: int) -> "PriceSnapshot":
+        """Aynı katalog + sürüm için verilen dilimin fiyatları."""
+        return PriceSnapshot(self.catalog, self.version, self.bucket_s, self._clock, bucket)
+
+    def _compute(self, bucket: int) -> array:
+        prices = array("d")
+        for p in self.catalog:
+            rng = random.Random(f"{self.version}:{bucket}:{p['id']}")
+            prices.append(generate_price(p["base_price"], rng))
+        return prices
+
+    @property
+    def key(self) -> str:
+        """Önbellek anahtarlarında kullanılabilecek 'sürüm:dilim' etiketi."""
+        return f"{self.version}:{self.bucket}"
+
+    def prices(self) -> array:
+        """Bu dilimin fiyat dizisi (katalog sırasıyla)."""
+        return self._prices
@@ -0,0 +1,283 @@
+# giftai/prompt.py
+"""
+Skorlama çağrıları için kompakt prompt ve şemalı çıktı (tek profil:
+ScoringPrompt, toplu paket: PackedScoringPrompt).
+
+- Sistem mesajı sabittir ve modül yüklenirken bir kez kurulur; değişen
+  kısım (profil + ürün tablosu) en sonda olduğundan upstream'in prompt
+  önbelleği aynı öneki her çağrıda yeniden kullanabilir.
+- Ürünler JSON yerine "|" ile ayrılmış tablo satırları olarak, uzun ürün
+  id'leri yerine kısa takma adlarla ("0", "1", ...) gönderilir.
+- Çıktı sabit bir JSON şemasıyla (structured outputs) kısıtlanır ve kısa
+  anahtarlar (i / e / b) kullanır. Şemaya uymayan satırlar 0.7 gibi bir
+  varsayılanla doldurulmaz, eksik sayılır; parçalı skorlama o ürünleri
+  yeniden dener ya da yerel skorlara düşer.
+"""
+import math
+from typing import List, Optional, Sequence
+
+from giftai.models import RecommendRequest
+
+# Yaklaşık token hesabı (gerçek tokenizer yerine; bench/mock_openai ile aynı)
+CHARS_PER_TOKEN = 4
+# Mesaj başına rol / ayraç maliyeti
+MESSAGE_OVERHEAD_TOKENS = 4
+# Bir kompakt skor satırının ({"id":"12","i":0.82,"e":0.7,"b":0.9},) yaklaşık çıktı token maliyeti
+COMPACT_OUTPUT_TOKENS_PER_ITEM = 24
+# Tablodaki ürün adı bundan uzunsa kesilir
+NAME_MAX_CHARS = 48
+
+SCORE_KEYS = (("i", "interest_score"), ("e", "emotion_score"), ("b", "budget_score"))
+
+COMPACT_SYSTEM_PROMPT = (
+    "You are a scoring engine for a gift recommender system.\n"
+    "Input: one profile line of key=value pairs separated by ';', then a product "
+    "table with columns id|name|category|price|tags (tags are comma separated).\n"
+    "For EVERY product row return numeric scores between 0.0 and 1.0:\n"
+    "- i (interest): How well the gift matches hobbies/style/profile.\n"
+    "- e (emotion): How strong and memorable the emotional impact is.\n"
+    "- b (budget): How well the gift fits the budget and context (corporate vs romantic).\n\n"
+    "Rules:\n"
+    "- Use the short id from the table as id.\n"
+    "- Do NOT generate gift names, prices or descriptions.\n"
+)
+
+SCORES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "string"},
+                    "i": {"type": "number"},
+                    "e": {"type": "number"},
+                    "b": {"type": "number"},
+                },
+                "required": ["id", "i", "e", "b"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["scores"],
+    "additionalProperties": False,
+}
+
+# Responses API "text" parametresi; sabit olduğu için şema upstream'de bir kez derlenir
+SCORES_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "gift_scores",
+        "schema": SCORES_SCHEMA,
+        "strict": True,
+    }
+}
+
+PACKED_SYSTEM_PROMPT = (
+    "You are a scoring engine for a gift recommender system.\n"
+    "Input: a '#products' table with columns id|name|category|price|tags (tags are "
+    "comma separated), then a '#profiles' table with columns key|ids|profile where "
+    "ids are the product ids to score for that profile and profile is key=value "
+    "pairs separated by ';'.\n"
+    "For EVERY profile and EVERY product id listed for it return numeric scores "
+    "between 0.0 and 1.0:\n"
+    "- i (interest): How well the gift matches hobbies/style/profile.\n"
+    "- e (emotion): How strong and memorable the emotional impact is.\n"
+    "- b (budget): How well the gift fits the budget and context (corporate vs romantic).\n\n"
+    "Rules:\n"
+    "- Use the profile key as profile and the short product id as id.\n"
+    "- Do NOT generate gift names, prices or descriptions.\n"
+)
+
+PACKED_SCORES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "profile": {"type": "string"},
+                    "scores": SCORES_SCHEMA["properties"]["scores"],
+                },
+                "required": ["profile", "scores"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+PACKED_SCORES_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "gift_scores_packed",
+        "schema": PACKED_SCORES_SCHEMA,
+        "strict": True,
+    }
+}
+# Paketteki her profilin {"profile":"p0","scores":[...]} sarmalayıcısı
+PACKED_PROFILE_OUTPUT_TOKENS = 10
+
+_SYSTEM_MESSAGE = {"role": "system", "content": COMPACT_SYSTEM_PROMPT}
+_PACKED_SYSTEM_MESSAGE = {"role": "system", "content": PACKED_SYSTEM_PROMPT}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def estimate_output_tokens(n_products: int) -> int:
+    # {"scores":[ ... ]} sarmalayıcısı + satırlar
+    return 10 + COMPACT_OUTPUT_TOKENS_PER_ITEM * n_products
+
+
+def _cell(value) -> str:
+    """Tablo hücresi: ayraç ve satır sonu karakterleri metni bölmesin."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).replace("|", "/").replace(";", ",").split())
+
+
+def _profile_line(req: RecommendRequest) -> str:
+    recipient = req.recipient
+    fields = (
+        ("age", recipient.age),
+        ("gender", recipient.gender),
+        ("relationship", recipient.relationship),
+        ("purpose", req.purpose),
+        ("risk", req.risk_level),
+        ("urgency", req.urgency),
+        ("hobbies", ",".join(recipient.hobbies)),
+        ("style", ",".join(recipient.style_tags)),
+        ("budget_min", req.budget_min),
+        ("budget_max", req.budget_max),
+        ("note", req.free_text),
+    )
+    # Boş alanlar hiç yazılmaz
+    return ";".join(f"{key}={_cell(value)}" for key, value in fields if value not in (None, ""))
+
+
+def _product_row(alias: str, p) -> str:
+    name = p["name"]
+    if len(name) > NAME_MAX_CHARS:
+        name = name[:NAME_MAX_CHARS].rstrip()
+    return "|".join(
+        (alias, _cell(name), _cell(p["category"]), _cell(p["base_price"]), _cell(",".join(p["tags"])))
+    )
+
+
+def _product_table(aliases: Sequence[str], products: Sequence) -> str:
+    return "id|name|category|price|tags\n" + "\n".join(
+        _product_row(alias, p) for alias, p in zip(aliases, products)
+    )
+
+
+def score_value(value) -> Optional[float]:
+    """Geçerli bir skor mu? Sayıysa [0, 1] aralığına kırp, değilse None."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if not math.isfinite(value):
+        return None
+    return min(1.0, max(0.0, float(value)))
+
+
+def decode_rows(items: List, aliases: dict) -> dict:
+    """
+    Kompakt skor satırlarını {product_id: {"interest_score": ..., ...}}
+    sözlüğüne çevir (aliases: takma ad -> ürün id). Bilinmeyen takma ad ya da
+    eksik / sayı olmayan skor içeren satırlar atlanır.
+    """
+    scores_by_id = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        pid = aliases.get(str(item.get("id")))
+        if pid is None:
+            continue
+        scores = {}
+        for short, field in SCORE_KEYS:
+            value = score_value(item.get(short))
+            if value is None:
+                break
+            scores[field] = value
+        else:
+            scores_by_id[pid] = scores
+    return scores_by_id
+
+
+class ScoringPrompt:
+    """Bir skorlama çağrısının mesajları, takma ad tablosu ve token tahmini."""
+
+    __slots__ = ("input", "aliases", "input_tokens", "output_tokens")
+
+    def __init__(self, req: RecommendRequest, products: Sequence):
+        self.aliases = {str(i): p["id"] for i, p in enumerate(products)}
+        user_content = f"{_profile_line(req)}\n{_product_table(self.aliases, products)}"
+        self.input = [_SYSTEM_MESSAGE, {"role": "user", "content": user_content}]
+        self.input_tokens = (
+            estimate_tokens(COMPACT_SYSTEM_PROMPT) + estimate_tokens(user_content) + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        self.output_tokens = estimate_output_tokens(len(products))
+
+    def decode(self, items: List) -> dict:
+        """Cevaptaki "scores" listesini çöz (bkz. decode_rows)."""
+        return decode_rows(items, self.aliases)
+
+
+class PackedScoringPrompt:
+    """
+    Birden fazla profili tek çağrıda skorlayan paket prompt'u. Ürün tablosu
+    paket genelinde tekildir; her profil kısa bir anahtarla ("p0", "p1", ...)
+    ve skorlanacak ürünlerin takma adlarıyla listelenir.
+
+    groups: [(cache_key, req, products), ...]
+    """
+
+    __slots__ = ("input", "aliases", "profile_keys", "profile_aliases", "input_tokens", "output_tokens")
+
+    def __init__(self, groups: Sequence[tuple]):
+        alias_by_id: dict = {}
+        products = []
+        for _, _, group_products in groups:
+            for p in group_products:
+                if p["id"] not in alias_by_id:
+                    alias_by_id[p["id"]] = str(len(products))
+                    products.append(p)
+        self.aliases = {alias: pid for pid, alias in alias_by_id.items()}
+        self.profile_keys = {f"p{i}": key for i, (key, _, _) in enumerate(groups)}
+        # Her profil sadece kendi ürünlerinin skorlarını alır
+        self.profile_aliases = {}
+        profile_rows = []
+        for profile, (_, req, group_products) in zip(self.profile_keys, groups):
+            ids = [alias_by_id[p["id"]] for p in group_products]
+            self.profile_aliases[profile] = {alias: self.aliases[alias] for alias in ids}
+            profile_rows.append(f"{profile}|{','.join(ids)}|{_profile_line(req)}")
+        user_content = (
+            f"#products {_product_table(self.aliases, products)}\n"
+            "#profiles key|ids|profile\n" + "\n".join(profile_rows)
+        )
+        self.input = [_PACKED_SYSTEM_MESSAGE, {"role": "user", "content": user_content}]
+        self.input_tokens = (
+            estimate_tokens(PACKED_SYSTEM_PROMPT) + estimate_tokens(user_content) + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        self.output_tokens = sum(
+            PACKED_PROFILE_OUTPUT_TOKENS + estimate_output_tokens(len(group_products))
+            for _, _, group_products in groups
+        )
+
+    def decode(self, results: List) -> dict:
+        """Cevaptaki "results" listesini {cache_key: scores_by_id} sözlüğüne çevir."""
+        scores_by_key = {}
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            profile = str(item.get("profile"))
+            key = self.profile_keys.get(profile)
+            scores = item.get("scores")
+            if key is None or not isinstance(scores, list):
+                continue
+            scores_by_key[key] = decode_rows(scores, self.profile_aliases[profile])
+        return scores_by_key
@@ -0,0 +1,69 @@
+# giftai/ranking.py
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+SCORE_FIELDS = ("interest_score", "emotion_score", "budget_score")
+WEIGHT_FIELDS = ("interest", "emotion", "budget")
+NEUTRAL_SCORE = 0.7
+NEUTRAL_SCORES = {field: NEUTRAL_SCORE for field in SCORE_FIELDS}
+
+
+def score_matrix(products: Sequence, scores_by_id: dict) -> np.ndarray:
+    """(n, 3) matris: her satır bir ürünün interest / emotion / budget skoru."""
+    rows = [scores_by_id.get(p["id"], NEUTRAL_SCORES) for p in products]
+    flat = np.fromiter(
+        (sc[field] for sc in rows for field in SCORE_FIELDS),
+        dtype=np.float64,
+        count=3 * len(rows),
+    )
+    return flat.reshape(len(products), 3)
+
+
+def weight_vector(weights: dict) -> np.ndarray:
+    """compute_weights çıktısını score_matrix sütun sırasına göre vektöre çevir."""
+    return np.array([weights[field] for field in WEIGHT_FIELDS], dtype=np.float64)
+
+
+def top_n_indices(final_scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    En yüksek n skorun indeksleri, skora göre azalan sırada.
+
+    Tam sıralama yerine argpartition kullanılır (O(n)); sadece kazananlar
+    sıralanır. Eşit skorlarda küçük indeks (giriş sırası) önce gelir, yani
+    sonuç stabil bir sorted(..., reverse=True) ile aynıdır.
+    """
+    count = len(final_scores)
+    n = min(n, count)
+    if n <= 0:
+        return np.empty(0, dtype=np.intp)
+    if n < count:
+        # argpartition n. skora eşit olanlardan rastgele birini seçebilir;
+        # sınırdaki eşitlerin hepsi aday alınır, sıralamadan sonra kesilir
+        nth = -np.partition(-final_scores, n - 1)[n - 1]
+        winners = np.flatnonzero(final_scores >= nth)
+    else:
+        winners = np.arange(count)
+    order = np.lexsort((winners, -final_scores[winners]))
+    return winners[order[:n]]
+
+
+def rank_candidates(
+    products: Sequence,
+    scores_by_id: dict,
+    weights: dict,
+    top_n: int,
+) -> List[Tuple[object, dict, float]]:
+    """
+    Tüm adayların final_score'unu tek matris-vektör çarpımıyla hesapla ve
+    sadece ilk top_n için (ürün, skor sözlüğü, final_score) döndür.
+    Cevap nesneleri / açıklamalar yalnızca bu kazananlar için üretilmelidir.
+    """
+    if not products:
+        return []
+    final_scores = score_matrix(products, scores_by_id) @ weight_vector(weights)
+    ranked = []
+    for i in top_n_indices(final_scores, top_n):
+        p = products[i]
+        ranked.append((p, scores_by_id.get(p["id"], NEUTRAL_SCORES), float(final_scores[i])))
+    return ranked
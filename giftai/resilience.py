@@ -0,0 +1,262 @@
+# giftai/resilience.py
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("giftai")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Upstream devre kesici açık; çağrı hiç yapılmadan reddedildi."""
+
+
+class CircuitBreaker:
+    """
+    Ardışık hata sayısına dayalı basit devre kesici.
+
+    failure_threshold ardışık hatadan sonra devre açılır ve reset_timeout_s
+    boyunca tüm çağrılar anında reddedilir. Süre dolunca devre yarı açık
+    olur ve tek bir deneme çağrısına izin verilir; başarılı olursa kapanır,
+    başarısız olursa tekrar açılır.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout_s:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Çağrı yapılabilir mi? Yarı açık durumda tek deneme çağrısı hakkı tüketir."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Sonucu belli olmadan (iptal) biten çağrının deneme hakkını geri ver."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                if state == CLOSED:
+                    logger.warning(
+                        "Upstream devre kesici açıldı (%d ardışık hata).", self._failures
+                    )
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+                self.opened_count += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "opened_count": self.opened_count,
+                "rejected": self.rejected,
+            }
+
+
+class LatencyTracker:
+    """Son N başarılı çağrının süresi; hedge gecikmesi için yüzdelik hesaplar."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientUpstream:
+    """
+    Upstream çağrıları için ortak katman: süre sınırı (deadline), devre kesici
+    ve isteğe bağlı hedge (ilk çağrı p95 süresini aşarsa aynı isteğin bir
+    kopyasını gönderip hangisi önce biterse onu kullanma).
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        hedge_enabled: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_min_delay_s: float = 0.2,
+    ):
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self.latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay_s, self.latency.quantile(self.hedge_quantile))
+
+    async def call(
+        self,
+        factory: Callable[[], Awaitable],
+        deadline_s: float,
+        hedge: bool = True,
+        timeout_is_failure: bool = True,
+    ):
+        """
+        factory() ile upstream çağrısını yap. Devre açıksa CircuitOpenError,
+        deadline_s aşılırsa asyncio.TimeoutError fırlatır. timeout_is_failure
+        False ise (deadline_s upstream'in değil isteğin süre bütçesinden
+        geliyorsa) timeout devre kesicide hata sayılmaz.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError()
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self._hedged(factory, self.hedge_delay() if hedge else None),
+                timeout=deadline_s,
+            )
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if timeout_is_failure:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def record(self, outcome: str, seconds: float = 0.0, timeout_is_failure: bool = True) -> None:
+        """
+        call() dışında yapılan (breaker.allow() ile izin alınmış) bir çağrının
+        sonucunu işle. Stream çağrıları bu yoldan geçer: yarıda kopyası
+        gönderilen bir stream'in parçaları birleştirilemeyeceği için hedge
+        uygulanmaz, ama gecikme ve sonuç aynı sayaçlara / devre kesiciye girer.
+
+        outcome: "ok" (seconds gecikme penceresine eklenir), "timeout", "error"
+        ya da "cancelled" (sonuç belirsiz; deneme hakkı geri verilir).
+        """
+        self.calls += 1
+        if outcome == "ok":
+            self.breaker.record_success()
+            self.latency.record(seconds)
+        elif outcome == "timeout":
+            self.timeouts += 1
+            if timeout_is_failure:
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+        elif outcome == "error":
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    async def _hedged(self, factory: Callable[[], Awaitable], delay: Optional[float]):
+        primary = asyncio.ensure_future(factory())
+        if delay is None:
+            return await primary
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges_sent += 1
+                tasks.add(asyncio.ensure_future(factory()))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if not primary.done():
+                primary.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.stats(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "latency_p50_s": self.latency.quantile(0.5),
+            "latency_p95_s": self.latency.quantile(0.95),
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_delay_s": self.hedge_delay(),
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": (self.hedges_sent / self.calls) if self.calls else 0.0,
+        }
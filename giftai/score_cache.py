@@ -0,0 +1,108 @@
+# giftai/score_cache.py
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+
+def normalize_profile(profile: dict) -> dict:
+    """
+    Aynı anlama gelen profilleri aynı şekle getir: string'ler kırpılıp küçük
+    harfe çevrilir, hobi / stil listeleri sıralanır ve tekilleştirilir,
+    boş free_text None ile aynı sayılır.
+    """
+    normalized = {}
+    for key, value in profile.items():
+        if isinstance(value, str):
+            value = value.strip().lower() or None
+        elif isinstance(value, (list, tuple)):
+            value = sorted({str(v).strip().lower() for v in value if str(v).strip()})
+        normalized[key] = value
+    return normalized
+
+
+def make_cache_key(profile: dict, product_ids: Iterable[str]) -> str:
+    """Profil + aday ürün kümesi için kanonik (sıra bağımsız) sha256 anahtarı."""
+    payload = {
+        "profile": normalize_profile(profile),
+        "products": sorted(set(product_ids)),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """
+    LLM skorları için sınırlı boyutlu, TTL'li LRU önbellek.
+
+    Değerler {product_id: {"interest_score":..., ...}} sözlükleridir ve
+    paylaşıldığı için çağıranlar tarafından değiştirilmemelidir.
+    Streamlit gibi thread'li ortamlar için tüm işlemler kilit altındadır.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        ttl_s: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: dict) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = self._clock() + self.ttl_s
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,195 @@
+# giftai/sessions.py
+"""
+Yeniden sıralama oturumları: /recommend'in skorladığı aday kümesi sunucuda
+tutulur; bütçe, risk seviyesi veya top_n değişince upstream'e gitmeden
+sadece filtre + ağırlık + top-N seçimi yeniden uygulanır.
+"""
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from giftai.catalog_index import CatalogIndex
+from giftai.engine import build_profile_tone
+from giftai.heuristic import budget_score
+from giftai.models import RecommendRequest
+from giftai.ranking import NEUTRAL_SCORES
+
+# Skorlara dokunmadan değiştirilebilen alanlar
+RERANK_FIELDS = ("budget_min", "budget_max", "risk_level", "top_n")
+
+
+def rerank_key(req: RecommendRequest) -> str:
+    """Skorları belirleyen alanlar (RERANK_FIELDS hariç); aynıysa oturum yeniden kullanılabilir."""
+    return req.model_dump_json(exclude=set(RERANK_FIELDS))
+
+
+class RankingSession:
+    """
+    Skorlanmış adaylar + skorlandıkları istek. Ürünler ProductView olarak
+    tutulduğundan fiyatlar oturum boyunca sabittir (yeni fiyat üretilmez).
+
+    Sadece skorlanan kısa liste tutulur: yeni bütçe aralığı skorlanan
+    aralığın dışına taşarsa (covers_budget False) o aralıktaki diğer ürünler
+    hiç aday olmadığı için oturumdan doğru cevap verilemez.
+    """
+
+    __slots__ = (
+        "req", "products", "scores_by_id", "scored_budget", "scored_bounds", "catalog_version", "key"
+    )
+
+    def __init__(
+        self,
+        req: RecommendRequest,
+        products: Sequence,
+        scores_by_id: dict,
+        catalog_version: str = "",
+    ):
+        self.req = req
+        self.products = list(products)
+        self.scores_by_id = scores_by_id
+        self.scored_budget = (req.budget_min, req.budget_max)
+        low, high = CatalogIndex.budget_bounds(req.budget_min, req.budget_max)
+        if any(not low <= p["price"] <= high for p in self.products):
+            # Bütçeye uyan aday yoktu, tüm katalog aday oldu (select_candidates)
+            low, high = float("-inf"), float("inf")
+        self.scored_bounds = (low, high)
+        self.catalog_version = catalog_version
+        self.key = rerank_key(req)
+
+    def covers(self, products: Sequence) -> bool:
+        """Verilen adayların hepsi bu oturumda skorlanmış mı?"""
+        return all(p["id"] in self.scores_by_id for p in products)
+
+    def covers_budget(self, budget_min: Optional[float], budget_max: Optional[float]) -> bool:
+        """Bu bütçenin fiyat aralığı skorlanan aralığın içinde mi?"""
+        low, high = CatalogIndex.budget_bounds(budget_min, budget_max)
+        scored_low, scored_high = self.scored_bounds
+        return scored_low <= low and high <= scored_high
+
+    def budget_rescored(self) -> bool:
+        """Güncel bütçe skorlamadakinden farklı mı (budget_score yerel olarak yeniden hesaplanır)?"""
+        return (self.req.budget_min, self.req.budget_max) != self.scored_budget
+
+    def apply(self, **updates) -> Tuple[RecommendRequest, List, dict]:
+        """
+        RERANK_FIELDS'taki değişiklikleri isteğe işle (önceki değişikliklerin
+        üstüne) ve (güncel istek, bütçeye uyan adaylar, skorlar) döndür.
+        Bütçe skorlamadakinden farklıysa budget_score gerçek fiyatla yerel
+        olarak yeniden hesaplanır; interest / emotion skorları aynen kalır.
+        """
+        unknown = set(updates) - set(RERANK_FIELDS)
+        if unknown:
+            raise ValueError(f"Yeniden sıralamada değiştirilemeyen alanlar: {', '.join(sorted(unknown))}")
+        req = self.req = self.req.model_copy(update=updates)
+
+        low, high = CatalogIndex.budget_bounds(req.budget_min, req.budget_max)
+        products = [p for p in self.products if low <= p["price"] <= high]
+        if not products:
+            # select_candidates ile aynı: bütçeye uyan yoksa hepsi
+            products = self.products
+
+        if not self.budget_rescored():
+            return req, products, self.scores_by_id
+        tone = build_profile_tone(req.purpose, req.recipient.relationship)
+        scores_by_id = {}
+        for p in products:
+            scores = dict(self.scores_by_id.get(p["id"], NEUTRAL_SCORES))
+            scores["budget_score"] = budget_score(
+                p["price"], req.budget_min, req.budget_max, p["category"], tone
+            )
+            scores_by_id[p["id"]] = scores
+        return req, products, scores_by_id
+
+
+class SessionStore:
+    """
+    TTL'li, sınırlı LRU oturum deposu. Bellek sınırı toplam aday sayısı
+    üzerinden uygulanır (max_candidates); aşılınca en eski oturumlar atılır.
+    Oturumlar süreç içindedir: birden fazla worker varsa yeniden sıralama
+    istekleri aynı worker'a gitmelidir (sticky session), yoksa 404 alınır.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_candidates: int = 500_000,
+        ttl_s: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_sessions = max_sessions
+        self.max_candidates = max_candidates
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._candidates = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, session_id: str) -> None:
+        _, session = self._data.pop(session_id)
+        self._candidates -= len(session.products)
+
+    def create(self, session: RankingSession) -> Optional[str]:
+        """Oturumu sakla ve id'sini döndür; depo kapalıysa (max_sessions=0) None."""
+        if self.max_sessions <= 0 or len(session.products) > self.max_candidates:
+            return None
+        session_id = secrets.token_urlsafe(16)
+        now = self._clock()
+        with self._lock:
+            # Sıra son erişime göre; baştaki süresi dolmuşları temizle
+            while self._data:
+                oldest_id, (oldest_expires, _) = next(iter(self._data.items()))
+                if oldest_expires > now:
+                    break
+                self._drop(oldest_id)
+                self.expirations += 1
+            self._data[session_id] = (now + self.ttl_s, session)
+            self._candidates += len(session.products)
+            self.created += 1
+            while len(self._data) > self.max_sessions or self._candidates > self.max_candidates:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+        return session_id
+
+    def get(self, session_id: str) -> Optional[RankingSession]:
+        """Oturumu getir ve TTL'ini yenile; yoksa / süresi dolduysa None."""
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, session = entry
+            if expires_at <= now:
+                self._drop(session_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data[session_id] = (now + self.ttl_s, session)
+            self._data.move_to_end(session_id)
+            self.hits += 1
+            return session
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._data),
+                "candidates": self._candidates,
+                "max_sessions": self.max_sessions,
+                "max_candidates": self.max_candidates,
+                "ttl_s": self.ttl_s,
+                "created": self.created,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
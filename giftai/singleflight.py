@@ -0,0 +1,64 @@
+# giftai/singleflight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Aynı anahtarla eşzamanlı gelen çağrıları tek bir upstream çağrısında birleştir.
+
+    İlk çağıran (lider) işi başlatır; aynı anahtarla gelen diğerleri aynı
+    sonucu bekler. İş exception fırlatırsa tüm bekleyenlere aynı exception
+    iletilir. Bekleyenlerden biri iptal edilirse sadece o ayrılır; bekleyen
+    kimse kalmazsa upstream işi de iptal edilir. İş bittiğinde anahtar
+    silinir, yani sonuç saklanmaz (önbellek ayrı bir katmandır).
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None or flight.abandoned:
+            task = asyncio.ensure_future(factory())
+            flight = _Flight(task)
+            self._flights[key] = flight
+            task.add_done_callback(lambda _t, key=key, flight=flight: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # shield: bir bekleyenin iptali ortak işi iptal etmesin
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,69 @@
+# giftai/streaming.py
+from typing import List
+
+from giftai import fastjson
+
+
+def sse_event(event: str, data) -> str:
+    """Server-sent events formatında tek bir olay."""
+    payload = fastjson.dumps(data).decode("utf-8")
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class IncrementalScoreParser:
+    """
+    Parça parça gelen {"scores": [{...}, {...}]} JSON'undan, tamamlanan her
+    skor nesnesini metnin geri kalanını beklemeden çıkarır.
+
+    Sadece string / escape durumunu ve süslü parantez derinliğini takip eder;
+    en dış nesnenin içinde kapanan ve "id" alanı olan her nesne döndürülür.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._collecting = False  # şu an bir skor nesnesi toplanıyor mu
+
+    def feed(self, text: str) -> List[dict]:
+        items = []
+        for ch in text:
+            if self._collecting:
+                self._buffer.append(ch)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 2 and not self._collecting:
+                    self._collecting = True
+                    self._buffer = ["{"]
+            elif ch == "}":
+                if self._depth == 2 and self._collecting:
+                    item = self._decode("".join(self._buffer))
+                    if item is not None:
+                        items.append(item)
+                    self._collecting = False
+                    self._buffer = []
+                self._depth -= 1
+        return items
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            item = fastjson.loads(raw)
+        except ValueError:
+            return None
+        if isinstance(item, dict) and "id" in item:
+            return item
+        return None
@@ -1,15 +1,70 @@
 # main.py
 import os
-import json
+import time
 import random
+import asyncio
 import logging
-from typing import List, Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
 
-from openai import OpenAI
+from openai import AsyncOpenAI
+
+from giftai import fastjson
+from giftai.batch import pack_groups
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_index import CatalogIndex
+from giftai.cascade import CascadeStats, rank_agreement, rank_margin
+from giftai.catalog_source import CatalogSource
+from giftai.chunked import OUTPUT_TOKENS_OVERHEAD, score_in_chunks
+from giftai.cohorts import CohortScoreTable
+from giftai.deadline import (
+    DEADLINE_HEADER,
+    STRATEGY_CHEAP,
+    STRATEGY_FULL,
+    STRATEGY_HEURISTIC,
+    Deadline,
+    StrategySelector,
+    parse_deadline_header,
+    parse_policy,
+)
+from giftai.disk_cache import SQLiteScoreStore
+from giftai.embeddings import CatalogEmbeddings
+from giftai.engine import (
+    SCORING_MODEL,
+    build_description,
+    description_prefix,
+    build_scoring_profile,
+    compute_weights,
+    local_scores,
+    plan_scoring_chunks,
+    select_candidates,
+)
+from giftai.metrics import MetricsRegistry
+from giftai.models import (
+    BatchRecommendResponse,
+    RecommendRequest,
+    RecommendResponse,
+    RerankRequest,
+    RerankResponse,
+)
+from giftai.prompt import (
+    COMPACT_OUTPUT_TOKENS_PER_ITEM,
+    PACKED_SCORES_TEXT_FORMAT,
+    SCORES_TEXT_FORMAT,
+    PackedScoringPrompt,
+    ScoringPrompt,
+)
+from giftai.prerank import PrerankStats, recall_at_n
+from giftai.ranking import SCORE_FIELDS, rank_candidates
+from giftai.resilience import OPEN, CircuitBreaker, CircuitOpenError, ResilientUpstream
+from giftai.streaming import IncrementalScoreParser, sse_event
+from giftai.score_cache import ScoreCache, make_cache_key
+from giftai.sessions import RankingSession, SessionStore
+from giftai.singleflight import SingleFlight
 
 # -------------------------------------------------
 # 1. AYARLAR
@@ -23,16 +78,158 @@ logger = logging.getLogger("giftai")
 # - .env dosyası:        OPENAI_API_KEY=sk-xxx  (ve .env'i .gitignore'a ekle)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Tek bir skorlama çağrısı için üst süre (saniye). Süre dolarsa yerel skorlayıcıya düşülür.
+OPENAI_TIMEOUT_S = float(os.getenv("OPENAI_TIMEOUT_S", "20"))
+# İstemcinin bağlantıyı kesip kesmediğini kontrol etme aralığı (saniye)
+DISCONNECT_POLL_S = 0.25
+
+# Upstream dayanıklılığı: art arda GIFTAI_BREAKER_FAILURES hata olursa devre açılır
+# ve GIFTAI_BREAKER_RESET_S boyunca OpenAI'ye gidilmeden fallback skorları kullanılır.
+# GIFTAI_HEDGE=1 ise p95 süresini aşan çağrıların bir kopyası daha gönderilir.
+upstream = ResilientUpstream(
+    CircuitBreaker(
+        failure_threshold=int(os.getenv("GIFTAI_BREAKER_FAILURES", "5")),
+        reset_timeout_s=float(os.getenv("GIFTAI_BREAKER_RESET_S", "30")),
+    ),
+    hedge_enabled=os.getenv("GIFTAI_HEDGE", "0") == "1",
+    hedge_min_delay_s=float(os.getenv("GIFTAI_HEDGE_MIN_DELAY_S", "0.2")),
+)
+
+# Aynı profil + aday kümesi için LLM skorlarını tekrar kullanmak üzere önbellek
+SCORE_CACHE_SIZE = int(os.getenv("GIFTAI_SCORE_CACHE_SIZE", "2048"))
+SCORE_CACHE_TTL_S = float(os.getenv("GIFTAI_SCORE_CACHE_TTL_S", "600"))
+score_cache = ScoreCache(max_size=SCORE_CACHE_SIZE, ttl_s=SCORE_CACHE_TTL_S)
+# Aynı anahtarla eşzamanlı gelen önbellek ıskaları tek bir OpenAI çağrısını paylaşır
+scoring_flights = SingleFlight()
+
+# İsteğe bağlı disk önbelleği (SQLite, WAL). Tüm worker'lar aynı dosyayı paylaşır,
+# restart sonrası skorlar kaybolmaz. Örn: GIFTAI_SCORE_DB=/var/cache/giftai/scores.db
+SCORE_DB_PATH = os.getenv("GIFTAI_SCORE_DB")
+SCORE_DB_MAX_ENTRIES = int(os.getenv("GIFTAI_SCORE_DB_MAX_ENTRIES", "100000"))
+SCORE_DB_TTL_S = float(os.getenv("GIFTAI_SCORE_DB_TTL_S", str(7 * 24 * 3600)))
+
+# İki aşamalı getirme: LLM'e sadece yerel ön sıralamanın ilk K adayı gider.
+# 0 verilirse ön sıralama kapanır ve tüm adaylar skorlanır.
+PRERANK_K = int(os.getenv("GIFTAI_PRERANK_K", "20"))
+# Kısa liste kullanılan isteklerin bu oranında tüm adaylar da (arka planda)
+# skorlanır ve kısa listenin recall'u ölçülür.
+PRERANK_SHADOW_RATE = float(os.getenv("GIFTAI_PRERANK_SHADOW_RATE", "0.0"))
+# Bütçeye uyup hobi / stil etiketi eşleşen en az K ürün varsa ön sıralama
+# etiket indeksiyle bulunan bu ürünlere daraltılır. 0 verilirse kapanır.
+TAG_NARROWING = os.getenv("GIFTAI_TAG_NARROWING", "1") == "1"
+prerank_stats = PrerankStats()
+
+# /recommend'in skorladığı adaylar yeniden sıralama için bu kadar süre (son
+# erişimden itibaren) saklanır. Bellek sınırı toplam aday sayısıyla verilir;
+# GIFTAI_SESSION_MAX=0 oturumları kapatır.
+ranking_sessions = SessionStore(
+    max_sessions=int(os.getenv("GIFTAI_SESSION_MAX", "10000")),
+    max_candidates=int(os.getenv("GIFTAI_SESSION_MAX_CANDIDATES", "500000")),
+    ttl_s=float(os.getenv("GIFTAI_SESSION_TTL_S", "900")),
+)
+
+# Arka plan görevleri GC'ye gitmesin diye referanslarını tutuyoruz
+_background_tasks: set = set()
+
+if SCORE_DB_PATH:
+    score_store = SQLiteScoreStore(
+        SCORE_DB_PATH, max_entries=SCORE_DB_MAX_ENTRIES, ttl_s=SCORE_DB_TTL_S
+    )
+    logger.info("Disk skor önbelleği aktif: %s", SCORE_DB_PATH)
+else:
+    score_store = None
+
+# /metrics (Prometheus text formatı)
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "giftai_stage_seconds",
+    "İstek aşamalarının süresi (candidates, scoring, upstream, parse, ranking, rerank, serialize, total).",
+    ["stage"],
+)
+upstream_calls = metrics.counter(
+    "giftai_upstream_calls_total",
+    "OpenAI çağrıları sonuca göre; fallback = skorlama yerel skorlarla bitti.",
+    ["outcome"],
+)
+openai_tokens = metrics.counter(
+    "giftai_openai_tokens_total", "OpenAI token kullanımı.", ["kind"]
+)
+openai_estimated_tokens = metrics.counter(
+    "giftai_openai_estimated_tokens_total",
+    "Skorlama çağrıları gönderilmeden önce tahmin edilen token sayısı (prompt, completion).",
+    ["kind"],
+)
+requests_in_flight = metrics.gauge(
+    "giftai_requests_in_flight", "İşlenmekte olan istekler.", ["endpoint"]
+)
+upstream_in_flight = metrics.gauge(
+    "giftai_upstream_in_flight", "Cevabı beklenen OpenAI çağrıları."
+)
+singleflight_in_flight = metrics.gauge(
+    "giftai_singleflight_in_flight", "Single-flight ile paylaşılan, süren skorlama işleri."
+)
+cache_lookups = metrics.counter(
+    "giftai_cache_lookups_total", "Skor önbelleği aramaları.", ["cache", "result"]
+)
+cache_hit_ratio = metrics.gauge(
+    "giftai_cache_hit_ratio", "Skor önbelleği isabet oranı (başlangıçtan beri).", ["cache"]
+)
+sessions_active = metrics.gauge(
+    "giftai_ranking_sessions", "Saklanan yeniden sıralama oturumları."
+)
+scoring_strategy = metrics.counter(
+    "giftai_scoring_strategy_total",
+    "Skorların kaynağı: fast, cohort, cache, full, cheap, heuristic.",
+    ["strategy"],
+)
+cascade_decisions = metrics.counter(
+    "giftai_cascade_decisions_total",
+    "Kademeli skorlama kararları: confident = ilk kademe yeterli, escalated = pahalı model.",
+    ["decision"],
+)
+cohort_lookups = metrics.counter(
+    "giftai_cohort_lookups_total",
+    "Kohort skor tablosu aramaları; miss = kişisel detaylı / tablo dışı profil.",
+    ["result"],
+)
+
+
+def collect_cache_metrics() -> None:
+    caches = {"memory": score_cache.stats()}
+    if score_store is not None:
+        caches["disk"] = score_store.stats()
+    for name, stats in caches.items():
+        cache_lookups.set(stats["hits"], cache=name, result="hit")
+        cache_lookups.set(stats["misses"], cache=name, result="miss")
+        cache_hit_ratio.set(stats["hit_ratio"], cache=name)
+    singleflight_in_flight.set(scoring_flights.in_flight())
+    sessions_active.set(len(ranking_sessions))
+
+
+metrics.add_collector(collect_cache_metrics)
+
 if OPENAI_API_KEY:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    # /recommend event loop'u bloklamasın diye async client kullanıyor
+    openai_async_client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT_S)
     logger.info("OPENAI_API_KEY bulundu, gerçek skorlayıcı aktif.")
 else:
-    openai_client = None
+    openai_async_client = None
     logger.warning(
-        "OPENAI_API_KEY bulunamadı. OpenAI skoru yerine nötr fallback skorları kullanılacak."
+        "OPENAI_API_KEY bulunamadı. OpenAI skoru yerine yerel heuristik skorlar kullanılacak."
     )
 
-app = FastAPI(title="GiftAI Recommender")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Kapanışta bekleyen disk yazmalarını bas
+    if score_store is not None:
+        score_store.close()
+    catalog_source.close()
+
+
+app = FastAPI(title="GiftAI Recommender", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,382 +240,791 @@ app.add_middleware(
 )
 
 # -------------------------------------------------
-# 2. MODELLER
+# 2. ÜRÜN KATALOĞU
 # -------------------------------------------------
-class Recipient(BaseModel):
-    age: Optional[int] = None
-    gender: Optional[str] = None
-    relationship: Optional[str] = None  # partner, friend, parent, sibling, colleague, other
-    hobbies: List[str] = []
-    style_tags: List[str] = []
+# GIFTAI_CATALOG_PATH verilirse katalog o dosyadan (.jsonl / .csv / .sqlite)
+# okunur ve dosya değişince GIFTAI_CATALOG_POLL_S'de bir arka planda yeniden
+# yüklenir; verilmezse giftai/catalog.py'deki yerleşik katalog kullanılır.
+# Fiyatlar katalog sürümü başına bir kez hesaplanır (istek başına random yok).
+# GIFTAI_PRICE_BUCKET_S verilirse fiyatlar o kadar saniyede bir yenilenir; bir
+# sonraki dilimin fiyatları ve indeksi arka plandaki thread'de önceden kurulur.
+CATALOG_PATH = os.getenv("GIFTAI_CATALOG_PATH")
+CATALOG_POLL_S = float(os.getenv("GIFTAI_CATALOG_POLL_S", "2"))
+PRICE_BUCKET_S = float(os.getenv("GIFTAI_PRICE_BUCKET_S", "0"))
+catalog_source = CatalogSource(
+    CATALOG_PATH,
+    default_catalog=PRODUCT_CATALOG,
+    bucket_s=PRICE_BUCKET_S,
+    poll_interval_s=CATALOG_POLL_S,
+)
 
 
-class RecommendRequest(BaseModel):
-    recipient: Recipient
-    purpose: str              # dogum_gunu, romantik, yeni_baslangic, ozur, kurumsal, icimden_geldi
-    risk_level: str           # guvenli | normal | cesur
-    urgency: str              # flexible | few_days | same_day
-    budget_min: Optional[float] = None
-    budget_max: Optional[float] = None
-    free_text: Optional[str] = ""
-    top_n: int = 3
+# Çevrimdışı üretilmiş katalog embedding'leri (python -m giftai.embeddings).
+# Dosya mmap ile açılır; worker'lar aynı sayfaları paylaşır.
+EMBEDDINGS_PATH = os.getenv("GIFTAI_EMBEDDINGS_PATH", "data/catalog_embeddings.npy")
+catalog_embeddings: Optional[CatalogEmbeddings] = None
+if os.path.exists(EMBEDDINGS_PATH):
+    try:
+        catalog_embeddings = CatalogEmbeddings.load(EMBEDDINGS_PATH)
+    except Exception as e:
+        logger.warning(f"Embedding dosyası okunamadı ({EMBEDDINGS_PATH}): {e}")
+# (katalog, embedding'ler bu kataloğa uyuyor mu?) — katalog her değiştiğinde bir kez kontrol edilir
+# (katalog sürümü, eşleşiyor mu); uyuşmazlık uyarısı her sürüm için bir kez yazılır
+_embeddings_match: tuple = (None, False)
 
 
-class ScoreBlock(BaseModel):
-    interest_score: float
-    emotion_score: float
-    budget_score: float
+def get_catalog_index() -> CatalogIndex:
+    """Güncel katalog indeksi (dosyadan yeniden yükleme ve fiyat dilimi dahil)."""
+    return catalog_source.index()
 
 
-class GiftResult(BaseModel):
-    name: str
-    description: str
-    price: float
-    scores: ScoreBlock
-    final_score: float
+def embeddings_for(catalog_version: str) -> Optional[CatalogEmbeddings]:
+    """Embedding'ler bu içerik sürümündeki katalogdan üretildiyse onları döndür."""
+    global _embeddings_match
+    if catalog_embeddings is None:
+        return None
+    version, matches = _embeddings_match
+    if version != catalog_version:
+        matches = catalog_embeddings.matches_catalog(catalog_version)
+        if not matches:
+            logger.warning("Embedding dosyası kataloğa uymuyor, yeniden üretilmeli: %s", EMBEDDINGS_PATH)
+        _embeddings_match = (catalog_version, matches)
+    return catalog_embeddings if matches else None
 
 
-class RecommendResponse(BaseModel):
-    results: List[GiftResult]
+# Çevrimdışı üretilmiş kohort skor tablosu (python -m giftai.cohorts). Hobi,
+# stil ve serbest metin içermeyen istekler LLM'e gitmeden buradan skorlanır.
+COHORT_TABLE_PATH = os.getenv("GIFTAI_COHORT_TABLE_PATH", "data/cohort_scores.npy")
+cohort_table: Optional[CohortScoreTable] = None
+if os.path.exists(COHORT_TABLE_PATH):
+    try:
+        cohort_table = CohortScoreTable.load(COHORT_TABLE_PATH)
+        logger.info("Kohort skor tablosu yüklendi: %s", COHORT_TABLE_PATH)
+    except Exception as e:
+        logger.warning(f"Kohort skor tablosu okunamadı ({COHORT_TABLE_PATH}): {e}")
+# Uyuşmazlık uyarısı her katalog sürümü için bir kez yazılır
+_cohort_stale_version: Optional[str] = None
 
 
-# -------------------------------------------------
-# 3. ÜRÜN KATALOĞU (GERÇEKÇİ HEDİYE TİPLERİ)
-# -------------------------------------------------
-PRODUCT_CATALOG = [
-    {
-        "id": "yoga_set",
-        "name": "Renkli Premium Yoga Seti",
-        "category": "wellness",
-        "base_price": 4500,
-        "tags": ["spor", "yoga", "sağlık", "kendine_zaman", "wellness"],
-        "base_description": "Yoga matı, blok ve kaydırmaz çorap içeren konforlu set.",
-    },
-    {
-        "id": "vinyl_player",
-        "name": "Retro Pikap ve Plak Seti",
-        "category": "music",
-        "base_price": 5500,
-        "tags": ["müzik", "retro", "dekorasyon", "ev"],
-        "base_description": "Vintage tasarımlı pikap ve sevilen türde başlangıç plakları.",
-    },
-    {
-        "id": "photo_album",
-        "name": "Kişisel Fotoğraf Albümü",
-        "category": "memory",
-        "base_price": 900,
-        "tags": ["fotoğraf", "anı", "kişiselleştirilebilir", "romantik"],
-        "base_description": "Beraber çekildiğiniz fotoğraflarla doldurulabilecek şık albüm.",
-    },
-    {
-        "id": "spa_day",
-        "name": "Çiftlere Spa ve Masaj Günü",
-        "category": "experience",
-        "base_price": 3200,
-        "tags": ["deneyim", "romantik", "rahatlama", "spa"],
-        "base_description": "Spa giriş, sauna ve çift masajı içeren dinlendirici deneyim.",
-    },
-    {
-        "id": "kindle",
-        "name": "Kindle Paperwhite Okuyucu",
-        "category": "tech",
-        "base_price": 6500,
-        "tags": ["kitap", "teknoloji", "okuma", "seyahat"],
-        "base_description": "Kitap kurdu hediyesi, onlarca kitabı tek cihazda taşıma keyfi.",
-    },
-    {
-        "id": "airpods",
-        "name": "Apple AirPods Kulaklık",
-        "category": "tech",
-        "base_price": 7500,
-        "tags": ["müzik", "teknoloji", "günlük", "apple"],
-        "base_description": "Günlük kullanımda konforlu, kablosuz kulaklık.",
-    },
-    {
-        "id": "coffee_set",
-        "name": "3. Nesil Kahve Deneyim Seti",
-        "category": "coffee",
-        "base_price": 1800,
-        "tags": ["kahve", "gurme", "ev", "hobi"],
-        "base_description": "Özel çekirdek kahveler ve pour-over ekipmanı içeren set.",
-    },
-    {
-        "id": "polaroid",
-        "name": "Instax Mini Anlık Fotoğraf Makinesi",
-        "category": "photo",
-        "base_price": 3500,
-        "tags": ["fotoğraf", "anı", "eğlence", "arkadaş"],
-        "base_description": "Anıları anında baskıya döken eğlenceli fotoğraf makinesi.",
-    },
-    {
-        "id": "corporate_box",
-        "name": "Premium Ofis Hediye Kutusu",
-        "category": "corporate",
-        "base_price": 1500,
-        "tags": ["kurumsal", "ofis", "nötr", "şık"],
-        "base_description": "Ajanda, metal kalem ve kahve kupası içeren zarif kutu.",
-    },
-    {
-        "id": "smart_mug",
-        "name": "Akıllı Isı Korumalı Kupa",
-        "category": "tech",
-        "base_price": 2100,
-        "tags": ["ofis", "teknoloji", "kahve", "hediye"],
-        "base_description": "İçeceğin sıcaklığını uzun süre sabit tutan akıllı kupa.",
-    },
-]
-
-
-def generate_price(base_price: int) -> float:
-    """Base price etrafında makul bir TL fiyat üret."""
-    factor = random.uniform(0.9, 1.15)
-    price = base_price * factor
-    # 10 TL yuvarla ve float olarak döndür
-    return float(int(round(price / 10.0) * 10))
+def cohort_scores(req: RecommendRequest, products: List) -> Optional[dict]:
+    """Kohort tablosundaki skorlar; tablo yoksa / kataloğa uymuyorsa / profil kişiselse None."""
+    global _cohort_stale_version
+    if cohort_table is None:
+        return None
+    version = catalog_source.version
+    if cohort_table.catalog_version != version:
+        if _cohort_stale_version != version:
+            logger.warning("Kohort skor tablosu kataloğa uymuyor, yeniden üretilmeli: %s", COHORT_TABLE_PATH)
+            _cohort_stale_version = version
+        return None
+    scores_by_id = cohort_table.scores_for(req, products)
+    cohort_lookups.inc(result="miss" if scores_by_id is None else "hit")
+    return scores_by_id
 
 
 # -------------------------------------------------
-# 4. YARDIMCI FONKSİYONLAR
+# 3. YARDIMCI FONKSİYONLAR
 # -------------------------------------------------
-def build_profile_tone(purpose: str, relationship: Optional[str]) -> str:
-    if relationship == "partner" or purpose == "romantik":
-        return "romantik"
-    if purpose == "kurumsal" or relationship == "colleague":
-        return "kurumsal"
-    if purpose == "ozur":
-        return "telafi"
-    return "nötr"
-
-
-def build_description(product: dict, req: RecommendRequest) -> str:
-    tone = build_profile_tone(req.purpose, req.recipient.relationship)
-    target_map = {
-        "partner": "sevgilin veya eşin",
-        "friend": "yakın arkadaşın",
-        "parent": "annen ya da baban",
-        "sibling": "kardeşin",
-        "colleague": "iş arkadaşın",
-        "other": "hediye almak istediğin kişi",
-        None: "hediye almak istediğin kişi",
-    }
-    hedef = target_map.get(req.recipient.relationship, target_map[None])
+# Tek bir skorlama çağrısının çıktı bütçesi; adaylar bu bütçeye sığacak
+# parçalara bölünür ve en fazla SCORING_CONCURRENCY parça aynı anda skorlanır.
+SCORING_MAX_OUTPUT_TOKENS = int(os.getenv("GIFTAI_SCORING_MAX_OUTPUT_TOKENS", "600"))
+SCORING_CONCURRENCY = int(os.getenv("GIFTAI_SCORING_CONCURRENCY", "4"))
+SCORING_CHUNK_RETRIES = int(os.getenv("GIFTAI_SCORING_CHUNK_RETRIES", "1"))
 
-    base = product["base_description"]
+# /recommend/batch: birden fazla profil tek bir OpenAI çağrısında skorlanır.
+# Paket başına çıktı bütçesi ve aynı anda çalışacak paket sayısı.
+BATCH_MAX_ITEMS = int(os.getenv("GIFTAI_BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_OUTPUT_TOKENS = int(os.getenv("GIFTAI_BATCH_MAX_OUTPUT_TOKENS", "4000"))
+BATCH_CONCURRENCY = int(os.getenv("GIFTAI_BATCH_CONCURRENCY", "8"))
 
-    if tone == "romantik":
-        return (
-            f"{hedef} için düşünülmüş, birlikte anı biriktirmeyi ön plana çıkaran "
-            f"romantik bir seçenek. {base}"
-        )
-    if tone == "kurumsal":
-        return (
-            "İş ortamında rahatlıkla verilebilecek, şık ama risksiz bir ofis hediyesi. "
-            f"{base}"
-        )
-    if tone == "telafi":
-        return (
-            f"Küçük bir jestle ortamı yumuşatmak ve gönül almak için uygun bir tercih. "
-            f"{base}"
-        )
-    # nötr
-    return f"Günlük hayatta kullanılabilir, çoğu kişinin sevebileceği güvenli bir tercih. {base}"
-
-
-def compute_weights(req: RecommendRequest) -> dict:
-    # Varsayılan ağırlıklar
-    w_interest = 0.4
-    w_emotion = 0.4
-    w_budget = 0.2
-
-    # Romantik / partner -> duygusal ağırlık
-    if req.purpose == "romantik" or req.recipient.relationship == "partner":
-        w_emotion += 0.15
-        w_budget -= 0.1
-
-    # Kurumsal / colleague -> bütçe + nötr
-    if req.purpose == "kurumsal" or req.recipient.relationship == "colleague":
-        w_budget += 0.15
-        w_emotion -= 0.1
-
-    # Risk seviyesine göre ayar
-    if req.risk_level == "cesur":
-        w_interest += 0.05
-        w_emotion += 0.05
-        w_budget -= 0.1
-    elif req.risk_level == "guvenli":
-        w_budget += 0.1
-        w_emotion -= 0.05
-
-    # Normalizasyon
-    total = w_interest + w_emotion + w_budget
-    return {
-        "interest": w_interest / total,
-        "emotion": w_emotion / total,
-        "budget": w_budget / total,
-    }
+# Süre bütçesi: X-Deadline-Ms başlığı yoksa urgency'ye göre politika kullanılır
+# (politikada olmayan urgency'de bütçe yoktur). Önbellek / kohort tablosundan
+# sonra kalan süreye sığan ilk strateji seçilir: tam model, ucuz model, yerel
+# heuristik. Süre skorlama sırasında dolarsa o ana kadar gelen skorlar +
+# eksikler için yerel skorlarla cevap verilir.
+DEADLINE_POLICY = parse_policy(
+    os.getenv("GIFTAI_DEADLINE_POLICY_MS", "flexible=20000,few_days=10000,same_day=4000")
+)
+# Skorlama dışındaki aşamalara (sıralama, serileştirme) ayrılan pay
+DEADLINE_RESERVE_S = float(os.getenv("GIFTAI_DEADLINE_RESERVE_MS", "50")) / 1000.0
+# Boş bırakılırsa ucuz model basamağı atlanır
+CHEAP_SCORING_MODEL = os.getenv("GIFTAI_CHEAP_SCORING_MODEL", "gpt-4.1-nano")
+# Yeterli gözlem (20 başarılı çağrı) olana kadar kullanılan beklenen süreler
+FULL_MODEL_EXPECTED_S = float(os.getenv("GIFTAI_FULL_MODEL_EXPECTED_MS", "3000")) / 1000.0
+CHEAP_MODEL_EXPECTED_S = float(os.getenv("GIFTAI_CHEAP_MODEL_EXPECTED_MS", "1500")) / 1000.0
+scoring_strategies = StrategySelector(
+    [(STRATEGY_FULL, SCORING_MODEL, FULL_MODEL_EXPECTED_S)]
+    + ([(STRATEGY_CHEAP, CHEAP_SCORING_MODEL, CHEAP_MODEL_EXPECTED_S)] if CHEAP_SCORING_MODEL else [])
+)
+
+
+# Kademeli skorlama: off | local (yerel heuristik) | cheap (CHEAP_SCORING_MODEL).
+# İlk kademenin N. ve N+1. sırası arasındaki final_score farkı
+# GIFTAI_CASCADE_MARGIN'den küçükse pahalı modele yükseltilir. Yükseltilmeyen
+# isteklerin GIFTAI_CASCADE_SHADOW_RATE oranı arka planda pahalı modelle de
+# skorlanıp sıralama uyumu ölçülür (bkz. /cascade/stats).
+CASCADE_FIRST_TIER = os.getenv("GIFTAI_CASCADE", "off")
+CASCADE_MARGIN = float(os.getenv("GIFTAI_CASCADE_MARGIN", "0.05"))
+CASCADE_SHADOW_RATE = float(os.getenv("GIFTAI_CASCADE_SHADOW_RATE", "0.0"))
+cascade_stats = CascadeStats()
+
+
+def request_deadline(request: Request, req: RecommendRequest) -> Optional[Deadline]:
+    """X-Deadline-Ms başlığından ya da urgency politikasından isteğin süre bütçesi."""
+    try:
+        budget_s = parse_deadline_header(request.headers.get(DEADLINE_HEADER))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Geçersiz {DEADLINE_HEADER}: {e}")
+    if budget_s is None:
+        budget_s = DEADLINE_POLICY.get(req.urgency)
+    return Deadline(budget_s) if budget_s is not None else None
+
+
+def scoring_cache_key(req: RecommendRequest, products: List[dict], model: str = SCORING_MODEL) -> str:
+    # Katalog sürümü anahtarda: ürün içeriği değişince eski LLM skorları kullanılmaz
+    profile = build_scoring_profile(req)
+    profile["catalog_version"] = catalog_source.version
+    if model != SCORING_MODEL:
+        # Ucuz modelin skorları tam modelinkilerin yerine geçmesin
+        profile["model"] = model
+    return make_cache_key(profile, (p["id"] for p in products))
 
 
-def call_openai_scoring(req: RecommendRequest, products: List[dict]) -> dict:
+async def get_cached_scores(cache_key: str) -> Optional[dict]:
     """
-    OpenAI'den her ürün için interest / emotion / budget skorlarını al.
-    Dönen dict: {product_id: {"interest_score":..., "emotion_score":..., "budget_score":...}}
+    Önce bellek (L1), sonra disk (L2) önbelleğine bak; diskte bulunanı belleğe
+    taşı. Disk okuması event loop'u bloklamaz (SQLiteScoreStore.get_async).
     """
-    profile = {
-        "age": req.recipient.age,
-        "gender": req.recipient.gender,
-        "relationship": req.recipient.relationship,
-        "purpose": req.purpose,
-        "risk_level": req.risk_level,
-        "urgency": req.urgency,
-        "hobbies": req.recipient.hobbies,
-        "style_tags": req.recipient.style_tags,
-        "free_text": req.free_text,
-        "budget_min": req.budget_min,
-        "budget_max": req.budget_max,
-    }
+    cached = score_cache.get(cache_key)
+    if cached is None and score_store is not None:
+        cached = await score_store.get_async(cache_key)
+        if cached is not None:
+            score_cache.set(cache_key, cached)
+    return cached
+
+
+def store_scores(cache_key: str, scores_by_id: dict) -> None:
+    score_cache.set(cache_key, scores_by_id)
+    if score_store is not None:
+        score_store.set(cache_key, scores_by_id)
+
 
-    system_prompt = (
-        "You are a scoring engine for a gift recommender system.\n"
-        "Given a user profile and a list of candidate gifts, you ONLY return JSON "
-        "with numeric scores between 0 and 1 for:\n"
-        "- interest_score: How well the gift matches hobbies/style/profile.\n"
-        "- emotion_score: How strong and memorable the emotional impact is.\n"
-        "- budget_score: How well the gift fits the budget and context (corporate vs romantic).\n\n"
-        "Rules:\n"
-        "- Return a JSON object with key 'scores', value is a list.\n"
-        "- Each item has: id, interest_score, emotion_score, budget_score.\n"
-        "- Do NOT generate gift names, prices or descriptions.\n"
-        "- Scores must be floats between 0.0 and 1.0.\n"
+def report_prompt_estimate(prompt, model: str) -> None:
+    """
+    Çağrı gönderilmeden önce tahmini token sayılarını (ScoringPrompt /
+    PackedScoringPrompt) metriğe ve debug log'a yaz.
+    """
+    openai_estimated_tokens.inc(prompt.input_tokens, kind="prompt")
+    openai_estimated_tokens.inc(prompt.output_tokens, kind="completion")
+    logger.debug(
+        "Skorlama çağrısı: model=%s ürün=%d tahmini token girdi=%d çıktı=%d",
+        model,
+        len(prompt.aliases),
+        prompt.input_tokens,
+        prompt.output_tokens,
     )
 
-    user_payload = {
-        "profile": profile,
-        "products": [
-            {
-                "id": p["id"],
-                "name": p["name"],
-                "category": p["category"],
-                "tags": p["tags"],
-                "base_price": p["base_price"],
-            }
-            for p in products
-        ],
-    }
 
-    # Eğer OpenAI client yoksa (key yoksa) direkt fallback'e geç
-    if openai_client is None:
-        logger.warning("OpenAI client yok, nötr skorlarla devam ediliyor.")
-        scores_list = [
-            {
-                "id": p["id"],
-                "interest_score": 0.7,
-                "emotion_score": 0.7,
-                "budget_score": 0.7,
-            }
-            for p in products
-        ]
-    else:
+def record_token_usage(usage) -> None:
+    if usage is None:
+        return
+    openai_tokens.inc(getattr(usage, "input_tokens", 0) or 0, kind="prompt")
+    openai_tokens.inc(getattr(usage, "output_tokens", 0) or 0, kind="completion")
+
+
+def timeout_is_failure(model: str, timeout: float) -> bool:
+    """
+    Bu süreyle yapılan çağrının timeout'u devre kesicide hata sayılır mı?
+    Sadece isteğin süre bütçesi çağrıyı modelin beklenen süresinin (p95 ya da
+    ön kabul) altına kısalttıysa sayılmaz; diğer her timeout hatadır.
+    """
+    return timeout >= OPENAI_TIMEOUT_S or scoring_strategies.fits_expected(model, timeout)
+
+
+async def call_upstream(factory, timeout: float, hedge: bool = True, model: str = SCORING_MODEL):
+    """upstream.call + metrikler (in-flight, süre, sonuç, token kullanımı)."""
+    with upstream_in_flight.track(), stage_seconds.time(stage="upstream"):
         try:
-            response = openai_client.responses.create(
-                model="gpt-4.1-mini",
-                input=[
-                    {
-                        "role": "system",
-                        "content": system_prompt,
-                    },
-                    {
-                        "role": "user",
-                        "content": json.dumps(user_payload, ensure_ascii=False),
-                    },
-                ],
-                max_output_tokens=600,
+            response = await upstream.call(
+                factory, timeout, hedge=hedge, timeout_is_failure=timeout_is_failure(model, timeout)
             )
+        except asyncio.TimeoutError:
+            upstream_calls.inc(outcome="timeout")
+            raise
+        except CircuitOpenError:
+            upstream_calls.inc(outcome="rejected")
+            raise
+        except Exception:
+            upstream_calls.inc(outcome="error")
+            raise
+    record_token_usage(getattr(response, "usage", None))
+    return response
+
+
+def parse_response_json(response) -> dict:
+    """Responses API cevabındaki JSON metnini çöz; bozuksa parse_error say ve fırlat."""
+    try:
+        with stage_seconds.time(stage="parse"):
             raw = response.output[0].content[0].text  # type: ignore
-            data = json.loads(raw)
-            scores_list = data.get("scores", [])
-        except Exception as e:
-            logger.warning(f"OpenAI scoring failed, using fallback neutral scores. Error: {e}")
-            scores_list = [
-                {
-                    "id": p["id"],
-                    "interest_score": 0.7,
-                    "emotion_score": 0.7,
-                    "budget_score": 0.7,
-                }
-                for p in products
-            ]
+            data = fastjson.loads(raw)
+    except Exception:
+        upstream_calls.inc(outcome="parse_error")
+        raise
+    upstream_calls.inc(outcome="ok")
+    return data
 
-    scores_by_id = {}
-    for item in scores_list:
-        try:
-            pid = item["id"]
-            scores_by_id[pid] = {
-                "interest_score": float(item.get("interest_score", 0.7)),
-                "emotion_score": float(item.get("emotion_score", 0.7)),
-                "budget_score": float(item.get("budget_score", 0.7)),
-            }
-        except Exception:
-            continue
+
+async def request_openai_scores_async(
+    req: RecommendRequest, products: List[dict], timeout: float, model: str = SCORING_MODEL
+) -> dict:
+    """
+    Tek bir OpenAI skorlama çağrısı (deadline + devre kesici + hedge ile),
+    kompakt prompt ve şemalı çıktıyla. Hata, timeout, açık devre veya bozuk
+    JSON'da exception fırlatır; şemaya uymayan satırların ürünleri eksik döner.
+    """
+    if timeout <= 0:
+        # İsteğin süre bütçesi bitti; upstream'i (ve devre kesiciyi) hiç rahatsız etme
+        raise asyncio.TimeoutError()
+    prompt = ScoringPrompt(req, products)
+    report_prompt_estimate(prompt, model)
+    started = time.monotonic()
+    response = await call_upstream(
+        lambda: openai_async_client.responses.create(
+            model=model,
+            input=prompt.input,
+            text=SCORES_TEXT_FORMAT,
+            max_output_tokens=SCORING_MAX_OUTPUT_TOKENS,
+        ),
+        timeout,
+        model=model,
+    )
+    scoring_strategies.record(model, time.monotonic() - started)
+    data = parse_response_json(response)
+    return prompt.decode(data.get("scores", []))
+
+
+async def call_openai_scoring_async(
+    req: RecommendRequest,
+    products: List[dict],
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """
+    OpenAI'den her ürün için interest / emotion / budget skorlarını al
+    (event loop'u bloklamadan). Dönen dict:
+    {product_id: {"interest_score":..., "emotion_score":..., "budget_score":...}}
+
+    Adaylar, cevapları SCORING_MAX_OUTPUT_TOKENS'a sığacak parçalara bölünür ve
+    parçalar eşzamanlı skorlanır; sadece başarısız parçalar tekrar denenir.
+    Her çağrı timeout (saniye) ile sınırlıdır; skorlanamayan ürünler yerel
+    heuristik skorları alır. scoring_mode="fast" ise LLM'e hiç gidilmez; kişisel
+    detay içermeyen profiller kohort tablosundan skorlanır. Başarılı sonuçlar
+    bellek / disk önbelleğine yazılır; fallback skorları önbelleğe girmez. Aynı
+    profil + aday kümesi için eşzamanlı gelen çağrılar tek bir upstream
+    çağrısını paylaşır (single-flight). İptal (CancelledError)
+    yutulmaz, çağırana iletilir; bekleyen kimse kalmazsa upstream istekleri
+    de kapanır.
+
+    deadline verilirse model kalan süreye göre seçilir (tam / ucuz / yerel)
+    ve hiçbir çağrı deadline'ı aşmaz; süre dolduğunda skorlanamayan ürünler
+    yerel skorlarla tamamlanır (kısmi sonuç).
+    """
+    if req.scoring_mode == "fast":
+        scoring_strategy.inc(strategy="fast")
+        return local_scores(req, products)
+
+    cache_key = scoring_cache_key(req, products)
+    stored = await lookup_stored_scores(req, products, cache_key)
+    if stored is not None:
+        return stored
+    return await score_live_async(req, products, cache_key, timeout, deadline)
+
+
+async def lookup_stored_scores(req: RecommendRequest, products: List, cache_key: str) -> Optional[dict]:
+    """Upstream'e gitmeden hazır skorlar: önce kohort tablosu, sonra bellek / disk önbelleği."""
+    table_scores = cohort_scores(req, products)
+    if table_scores is not None:
+        scoring_strategy.inc(strategy="cohort")
+        return table_scores
+
+    cached = await get_cached_scores(cache_key)
+    if cached is not None:
+        scoring_strategy.inc(strategy="cache")
+        return cached
+    return None
+
+
+async def score_live_async(
+    req: RecommendRequest,
+    products: List[dict],
+    cache_key: str,
+    timeout: Optional[float] = None,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """Önbellekte olmayan skorları upstream'den al (model seçimi, single-flight, fallback)."""
+    if openai_async_client is None:
+        logger.warning("OpenAI client yok, yerel skorlarla devam ediliyor.")
+        upstream_calls.inc(outcome="fallback")
+        scoring_strategy.inc(strategy=STRATEGY_HEURISTIC)
+        return local_scores(req, products)
+
+    if upstream.breaker.state == OPEN:
+        # Upstream sağlıksız; parça denemeleriyle vakit kaybetmeden fallback'e düş
+        upstream_calls.inc(outcome="fallback")
+        scoring_strategy.inc(strategy=STRATEGY_HEURISTIC)
+        return local_scores(req, products)
+
+    if deadline is None:
+        timeout = OPENAI_TIMEOUT_S if timeout is None else timeout
+        scoring_strategy.inc(strategy=STRATEGY_FULL)
+        return await scoring_flights.do(
+            cache_key,
+            lambda: score_uncached_async(req, products, lambda: timeout, cache_key),
+        )
+
+    strategy, model = scoring_strategies.choose(deadline.remaining() - DEADLINE_RESERVE_S)
+    if model is None:
+        scoring_strategy.inc(strategy=STRATEGY_HEURISTIC)
+        return local_scores(req, products)
+    if model != SCORING_MODEL:
+        cache_key = scoring_cache_key(req, products, model)
+        cached = await get_cached_scores(cache_key)
+        if cached is not None:
+            scoring_strategy.inc(strategy="cache")
+            return cached
+    scoring_strategy.inc(strategy=strategy)
+    return await score_with_deadline_async(req, products, cache_key, model, deadline)
+
+
+async def score_with_deadline_async(
+    req: RecommendRequest, products: List[dict], cache_key: str, model: str, deadline: Deadline
+) -> dict:
+    """model ile skorla; deadline'a yetişmeyen ürünler yerel skor alır (kısmi sonuç)."""
+
+    def call_timeout() -> float:
+        return min(OPENAI_TIMEOUT_S, deadline.remaining() - DEADLINE_RESERVE_S)
+
+    try:
+        # Çağrılar DEADLINE_RESERVE_S erken kesilir; bu bekleme sadece başka bir
+        # isteğin başlattığı daha uzun süreli skorlamaya katıldıysak dolar
+        return await asyncio.wait_for(
+            scoring_flights.do(
+                cache_key,
+                lambda: score_uncached_async(req, products, call_timeout, cache_key, model),
+            ),
+            timeout=deadline.remaining(),
+        )
+    except asyncio.TimeoutError:
+        upstream_calls.inc(outcome="fallback")
+        return local_scores(req, products)
+
+
+async def score_uncached_async(
+    req: RecommendRequest,
+    products: List[dict],
+    timeout: Callable[[], float],
+    cache_key: str,
+    model: str = SCORING_MODEL,
+) -> dict:
+    """timeout() her çağrı (parça / tekrar) öncesi o çağrının süre sınırını verir."""
+    scores_by_id, failed = await score_in_chunks(
+        lambda chunk: request_openai_scores_async(req, chunk, timeout(), model),
+        products,
+        SCORING_MAX_OUTPUT_TOKENS,
+        concurrency=SCORING_CONCURRENCY,
+        retries=SCORING_CHUNK_RETRIES,
+        plan=lambda items: plan_scoring_chunks(items, SCORING_MAX_OUTPUT_TOKENS),
+    )
+    if failed:
+        logger.warning(
+            "OpenAI scoring failed for %d/%d products, using local heuristic scores.",
+            len(failed),
+            len(products),
+        )
+        # Eksik sonuçlar önbelleğe yazılmaz
+        upstream_calls.inc(outcome="fallback")
+        scores_by_id.update(local_scores(req, failed))
+        return scores_by_id
+
+    store_scores(cache_key, scores_by_id)
     return scores_by_id
 
 
+async def cascade_scoring_async(
+    req: RecommendRequest,
+    products: List[dict],
+    weights: dict,
+    top_n: int,
+    deadline: Optional[Deadline] = None,
+) -> dict:
+    """
+    Kademeli skorlama: kohort / önbellekte hazır skor yoksa önce ilk kademe
+    (CASCADE_FIRST_TIER) çalışır. İlk top_n ile sonraki aday arasındaki fark
+    CASCADE_MARGIN'den küçükse pahalı modele yükseltilir, değilse ilk
+    kademenin skorları kullanılır. Kademe kapalıysa call_openai_scoring_async.
+    """
+    if CASCADE_FIRST_TIER == "off" or req.scoring_mode == "fast":
+        return await call_openai_scoring_async(req, products, deadline=deadline)
+
+    cache_key = scoring_cache_key(req, products)
+    stored = await lookup_stored_scores(req, products, cache_key)
+    if stored is not None:
+        return stored
+
+    live = openai_async_client is not None and upstream.breaker.state != OPEN
+    if CASCADE_FIRST_TIER == "cheap" and CHEAP_SCORING_MODEL and live:
+        cheap_key = scoring_cache_key(req, products, CHEAP_SCORING_MODEL)
+        first = await get_cached_scores(cheap_key)
+        if first is None:
+            if deadline is None:
+                first = await scoring_flights.do(
+                    cheap_key,
+                    lambda: score_uncached_async(
+                        req, products, lambda: OPENAI_TIMEOUT_S, cheap_key, CHEAP_SCORING_MODEL
+                    ),
+                )
+            else:
+                first = await score_with_deadline_async(
+                    req, products, cheap_key, CHEAP_SCORING_MODEL, deadline
+                )
+        first_strategy = STRATEGY_CHEAP
+    else:
+        first = local_scores(req, products)
+        first_strategy = STRATEGY_HEURISTIC
+
+    margin = rank_margin(products, first, weights, top_n)
+    escalate = live and margin is not None and margin < CASCADE_MARGIN
+    cascade_stats.record_decision(margin, escalate)
+    cascade_decisions.inc(decision="escalated" if escalate else "confident")
+    if not escalate:
+        scoring_strategy.inc(strategy=first_strategy)
+        if live and random.random() < CASCADE_SHADOW_RATE:
+            spawn_background(shadow_cascade_agreement(req, products, first, weights, top_n))
+        return first
+
+    final = await score_live_async(req, products, cache_key, deadline=deadline)
+    overlap, top1_match = rank_agreement(products, first, final, weights, top_n)
+    cascade_stats.record_agreement("escalated", overlap, top1_match)
+    return final
+
+
+async def shadow_cascade_agreement(
+    req: RecommendRequest, products: List, first: dict, weights: dict, top_n: int
+) -> None:
+    """Yükseltilmeyen bir isteği pahalı modelle de skorla ve sıralama uyumunu kaydet."""
+    full_scores = await call_openai_scoring_async(req, products)
+    overlap, top1_match = rank_agreement(products, first, full_scores, weights, top_n)
+    cascade_stats.record_agreement("shadow", overlap, top1_match)
+
+
+async def request_openai_batch_scores_async(groups: List[tuple], timeout: float) -> dict:
+    """
+    Birden fazla profili tek bir OpenAI çağrısında skorla (kompakt paket
+    prompt'u + şemalı çıktı).
+    groups: [(cache_key, req, products), ...]
+    Dönen dict: {cache_key: scores_by_id}; cevapta olmayan profiller dönmez.
+    """
+    prompt = PackedScoringPrompt(groups)
+    report_prompt_estimate(prompt, SCORING_MODEL)
+    # Büyük paket çağrılarında hedge maliyeti ikiye katlar; sadece deadline + devre kesici
+    response = await call_upstream(
+        lambda: openai_async_client.responses.create(
+            model=SCORING_MODEL,
+            input=prompt.input,
+            text=PACKED_SCORES_TEXT_FORMAT,
+            max_output_tokens=BATCH_MAX_OUTPUT_TOKENS,
+        ),
+        timeout,
+        hedge=False,
+    )
+    data = parse_response_json(response)
+    return prompt.decode(data.get("results", []))
+
+
+async def score_groups_async(groups: List[tuple]) -> dict:
+    """
+    Farklı profil gruplarını (cache_key, req, products) paketleyip eşzamanlı skorla.
+
+    Paketler ortak OpenAI çağrılarıyla skorlanır. Paket çağrısı başarısız
+    olursa ya da cevapta bir profil eksik / yarım gelirse o profil tek başına
+    call_openai_scoring_async ile (parçalı skorlama + fallback) skorlanır.
+    Paket ve tekli çağrılar aynı sınırı paylaşır: en fazla BATCH_CONCURRENCY
+    tanesi aynı anda çalışır.
+    """
+    if not groups:
+        return {}
+    if openai_async_client is None:
+        upstream_calls.inc(len(groups), outcome="fallback")
+        return {key: local_scores(req, products) for key, req, products in groups}
+
+    max_items = max(1, (BATCH_MAX_OUTPUT_TOKENS - OUTPUT_TOKENS_OVERHEAD) // COMPACT_OUTPUT_TOKENS_PER_ITEM)
+    # Profil sarmalayıcısı ({"profile": ..., "scores": [...]}) yaklaşık bir satır tutar
+    packs = pack_groups(groups, max_items, size=lambda g: len(g[2]) + 1)
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+    scores_by_key: dict = {}
+
+    async def score_alone(key: str, req: RecommendRequest, products: List) -> None:
+        async with semaphore:
+            scores_by_key[key] = await call_openai_scoring_async(req, products)
+
+    async def run_pack(pack: List[tuple]) -> None:
+        packed: dict = {}
+        if len(pack) > 1:
+            async with semaphore:
+                try:
+                    packed = await request_openai_batch_scores_async(pack, OPENAI_TIMEOUT_S)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Toplu skorlama ({len(pack)} profil) başarısız: {e!r}")
+        alone = []
+        for key, req, products in pack:
+            scores = packed.get(key)
+            if scores is not None and all(p["id"] in scores for p in products):
+                store_scores(key, scores)
+                scores_by_key[key] = scores
+            else:
+                alone.append((key, req, products))
+        # Paket semaforu bırakıldı; tekli denemeler aynı sınırla paralel koşar
+        await asyncio.gather(*(score_alone(*group) for group in alone))
+
+    await asyncio.gather(*(run_pack(pack) for pack in packs))
+    return scores_by_key
+
+
+async def stream_openai_scores(
+    req: RecommendRequest, products: List[dict], timeout: float, model: str = SCORING_MODEL
+) -> AsyncIterator[dict]:
+    """
+    Skorları streaming Responses API ile al; gelen metin parça parça
+    çözümlenir ve tamamlanan her skor grubu {product_id: {...}} olarak verilir.
+    Toplam süre timeout'u aşarsa asyncio.TimeoutError fırlatır.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    prompt = ScoringPrompt(req, products)
+    report_prompt_estimate(prompt, model)
+    max_output_tokens = max(SCORING_MAX_OUTPUT_TOKENS, OUTPUT_TOKENS_OVERHEAD + prompt.output_tokens)
+    stream = await asyncio.wait_for(
+        openai_async_client.responses.create(
+            model=model,
+            input=prompt.input,
+            text=SCORES_TEXT_FORMAT,
+            max_output_tokens=max_output_tokens,
+            stream=True,
+        ),
+        timeout=timeout,
+    )
+    parser = IncrementalScoreParser()
+    events = stream.__aiter__()
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            try:
+                event = await asyncio.wait_for(events.__anext__(), timeout=remaining)
+            except StopAsyncIteration:
+                break
+            if event.type == "response.output_text.delta":
+                scores = prompt.decode(parser.feed(event.delta))
+                if scores:
+                    yield scores
+            elif event.type == "response.completed":
+                record_token_usage(getattr(event.response, "usage", None))
+    finally:
+        await stream.close()
+
+
+class ClientDisconnected(Exception):
+    """İstemci cevap beklemeden bağlantıyı kapattı."""
+
+
+async def run_until_disconnect(request: Request, coro):
+    """
+    coro'yu çalıştır; istemci bu sırada bağlantıyı keserse işi iptal edip
+    ClientDisconnected fırlat. Böylece kimsenin beklemediği OpenAI çağrıları
+    boşuna sürmez.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def candidates_for(req: RecommendRequest) -> tuple:
+    """Güncel katalog ve ayarlarla select_candidates. Dönen: (filtered_products, shortlist)"""
+    # İndeks ve sürüm aynı durumdan okunur; arada yeniden yükleme olsa da tutarlıdır
+    state = catalog_source.state
+    filtered_products, shortlist = select_candidates(
+        state.index,
+        req,
+        PRERANK_K,
+        embeddings=embeddings_for(state.version),
+        tag_narrowing=TAG_NARROWING,
+    )
+    prerank_stats.record_shortlist(len(filtered_products), len(shortlist))
+    return filtered_products, shortlist
+
+
+def build_results(
+    req: RecommendRequest, products: List, scores_by_id: dict, weights: dict, top_n: int
+) -> List[dict]:
+    """
+    Skorları vektörel hesapla ve sadece top_n kazanan için GiftResult şeklinde
+    sözlük üret. Pydantic modeli kurulmaz; açıklama öneki istek başına bir kez
+    hesaplanır.
+    """
+    prefix = description_prefix(req.purpose, req.recipient.relationship)
+    return [
+        {
+            "name": p["name"],
+            "description": build_description(p, req, prefix),
+            "price": p["price"],
+            "scores": {field: float(sc[field]) for field in SCORE_FIELDS},
+            "final_score": final_score,
+        }
+        for p, sc, final_score in rank_candidates(products, scores_by_id, weights, top_n)
+    ]
+
+
+def json_response(data) -> Response:
+    """response_model doğrulamasını atlayıp orjson (varsa) ile serileştir."""
+    return Response(content=fastjson.dumps(data), media_type="application/json")
+
+
+async def shadow_prerank_recall(
+    req: RecommendRequest, all_products: List, shortlist: List, weights: dict, top_n: int
+) -> None:
+    """Tüm adayları skorla ve kısa listenin ilk top_n'i ne kadar yakaladığını kaydet."""
+    full_scores = await call_openai_scoring_async(req, all_products)
+    recall = recall_at_n((p["id"] for p in shortlist), full_scores, weights, top_n)
+    if recall is not None:
+        prerank_stats.record_recall(recall)
+
+
+def spawn_background(coro) -> None:
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 # -------------------------------------------------
-# 5. ENDPOINT
+# 4. ENDPOINT
 # -------------------------------------------------
-@app.post("/recommend", response_model=RecommendResponse)
-async def recommend(req: RecommendRequest):
-    top_n = max(1, min(req.top_n, 5))
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = {"memory": score_cache.stats(), "singleflight": scoring_flights.stats()}
+    if score_store is not None:
+        stats["disk"] = score_store.stats()
+    return stats
 
-    # Bütçeye göre ürünleri kabaca filtrele (çok uçları at)
-    filtered_products = []
-    for p in PRODUCT_CATALOG:
-        price = generate_price(p["base_price"])
-        if req.budget_min and price < req.budget_min * 0.6:
-            continue
-        if req.budget_max and price > req.budget_max * 1.4:
-            continue
-        filtered_products.append({**p, "price": price})
 
-    if not filtered_products:
-        # Hiç bulunamazsa hepsini kullan
-        filtered_products = [
-            {**p, "price": generate_price(p["base_price"])} for p in PRODUCT_CATALOG
-        ]
+@app.get("/upstream/status")
+async def upstream_status():
+    return {**upstream.stats(), "strategies": scoring_strategies.stats()}
 
-    scores_by_id = call_openai_scoring(req, filtered_products)
-    weights = compute_weights(req)
 
-    results: List[GiftResult] = []
-    for p in filtered_products:
-        sc = scores_by_id.get(
-            p["id"],
-            {"interest_score": 0.7, "emotion_score": 0.7, "budget_score": 0.7},
-        )
+@app.get("/catalog/status")
+async def catalog_status():
+    return catalog_source.stats()
+
+
+@app.get("/cascade/stats")
+async def cascade_stats_endpoint():
+    return {
+        "first_tier": CASCADE_FIRST_TIER,
+        "margin": CASCADE_MARGIN,
+        "shadow_rate": CASCADE_SHADOW_RATE,
+        **cascade_stats.snapshot(),
+    }
+
+
+@app.get("/sessions/stats")
+async def sessions_stats():
+    return ranking_sessions.stats()
 
-        final_score = (
-            sc["interest_score"] * weights["interest"]
-            + sc["emotion_score"] * weights["emotion"]
-            + sc["budget_score"] * weights["budget"]
-        )
 
-        desc = build_description(p, req)
+@app.get("/cohorts/status")
+async def cohorts_status():
+    if cohort_table is None:
+        return {"loaded": False, "path": COHORT_TABLE_PATH}
+    return {
+        "loaded": True,
+        "path": COHORT_TABLE_PATH,
+        "matches_catalog": cohort_table.catalog_version == catalog_source.version,
+        **cohort_table.stats(),
+    }
+
+
+@app.get("/prerank/stats")
+async def prerank_stats_endpoint():
+    return {"k": PRERANK_K, "shadow_rate": PRERANK_SHADOW_RATE, **prerank_stats.snapshot()}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(
+        content=metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
 
-        results.append(
-            GiftResult(
-                name=p["name"],
-                description=desc,
-                price=p["price"],
-                scores=ScoreBlock(**sc),
-                final_score=final_score,
+@app.post("/recommend", response_model=RecommendResponse)
+async def recommend(req: RecommendRequest, request: Request):
+    """
+    X-Deadline-Ms başlığı (veya urgency politikası) cevabın en geç ne zaman
+    dönmesi gerektiğini belirler; skorlama stratejisi buna göre seçilir.
+    """
+    deadline = request_deadline(request, req)
+    with requests_in_flight.track(endpoint="recommend"), stage_seconds.time(stage="total"):
+        return await recommend_timed(req, request, deadline)
+
+
+async def recommend_timed(
+    req: RecommendRequest, request: Request, deadline: Optional[Deadline] = None
+) -> Response:
+    top_n = max(1, min(req.top_n, 5))
+    with stage_seconds.time(stage="candidates"):
+        filtered_products, shortlist = candidates_for(req)
+        weights = compute_weights(req)
+
+    # 2. aşama: kısa listeyi LLM ile skorla
+    try:
+        with stage_seconds.time(stage="scoring"):
+            scores_by_id = await run_until_disconnect(
+                request, cascade_scoring_async(req, shortlist, weights, top_n, deadline)
             )
+    except ClientDisconnected:
+        logger.info("[GiftAI] İstemci bağlantıyı kapattı, skorlama iptal edildi.")
+        # 499: Client Closed Request (nginx geleneği); cevap zaten okunmayacak
+        return Response(status_code=499)
+
+    # Yerel fallback skorlarıyla recall ölçmek anlamsız; sadece gerçek skorlayıcıda
+    if (
+        openai_async_client is not None
+        and len(shortlist) < len(filtered_products)
+        and random.random() < PRERANK_SHADOW_RATE
+    ):
+        spawn_background(
+            shadow_prerank_recall(req, filtered_products, shortlist, weights, top_n)
         )
 
-    # Skora göre sırala, top_n al
-    results_sorted = sorted(results, key=lambda x: x.final_score, reverse=True)[
-        :top_n
-    ]
+    with stage_seconds.time(stage="ranking"):
+        results_sorted = build_results(req, shortlist, scores_by_id, weights, top_n)
+    session_id = ranking_sessions.create(
+        RankingSession(req, shortlist, scores_by_id, catalog_source.version)
+    )
 
-    top3_names = [r.name for r in results_sorted]
+    top3_names = [r["name"] for r in results_sorted]
     logger.info(
         "[GiftAI] Öneri üretildi - purpose=%s, relationship=%s, risk=%s, urgency=%s, top_n=%s, top3=%s",
         req.purpose,
@@ -429,4 +1035,266 @@ async def recommend(req: RecommendRequest):
         top3_names,
     )
 
-    return RecommendResponse(results=results_sorted)
+    # Cevap zaten RecommendResponse şeklinde; yeniden doğrulamadan JSON'a çevrilir
+    with stage_seconds.time(stage="serialize"):
+        return json_response({"results": results_sorted, "session_id": session_id})
+
+
+@app.post("/recommend/{session_id}/rerank", response_model=RerankResponse)
+async def recommend_rerank(session_id: str, body: RerankRequest):
+    """
+    /recommend'in döndürdüğü oturumdaki skorlarla yeniden sırala: bütçe
+    filtresi, risk seviyesine göre ağırlıklar ve top_n yeniden uygulanır,
+    upstream'e gidilmez.
+
+    Oturum sadece ön sıralamanın kısa listesini tutar; seçim bu adaylar
+    arasından yapılır. Yeni bütçe skorlanan fiyat aralığının dışına taşarsa
+    409 döner (o aralıktaki diğer ürünler hiç skorlanmadı; /recommend ile
+    yeniden öneri alınmalı). Bütçe değiştiyse budget_score yerel olarak
+    yeniden hesaplanır ve cevapta budget_rescored=true döner.
+    """
+    with requests_in_flight.track(endpoint="rerank"), stage_seconds.time(stage="rerank"):
+        session = ranking_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Oturum bulunamadı veya süresi doldu; /recommend ile yeni öneri alın.",
+            )
+        updates = {
+            field: value
+            for field, value in body.model_dump(exclude_unset=True).items()
+            # Bütçede null "sınır yok" demek; risk / top_n için null yok sayılır
+            if value is not None or field in ("budget_min", "budget_max")
+        }
+        budget = (
+            updates.get("budget_min", session.req.budget_min),
+            updates.get("budget_max", session.req.budget_max),
+        )
+        if not session.covers_budget(*budget):
+            raise HTTPException(
+                status_code=409,
+                detail="Yeni bütçe skorlanan fiyat aralığının dışında; /recommend ile yeni öneri alın.",
+            )
+        req, products, scores_by_id = session.apply(**updates)
+        top_n = max(1, min(req.top_n, 5))
+        results = build_results(req, products, scores_by_id, compute_weights(req), top_n)
+        return json_response(
+            {"results": results, "session_id": session_id, "budget_rescored": session.budget_rescored()}
+        )
+
+
+def ranking_snapshot(products: List, scores_by_id: dict, weights: dict, top_n: int) -> list:
+    """Şu ana kadar skoru gelen ürünler arasındaki güncel ilk top_n."""
+    scored = [p for p in products if p["id"] in scores_by_id]
+    return [
+        {"id": p["id"], "name": p["name"], "final_score": final_score}
+        for p, _, final_score in rank_candidates(scored, scores_by_id, weights, top_n)
+    ]
+
+
+async def recommend_stream_events(
+    req: RecommendRequest, deadline: Optional[Deadline] = None
+) -> AsyncIterator[str]:
+    with requests_in_flight.track(endpoint="stream"):
+        async for event in recommend_stream_events_inner(req, deadline):
+            yield event
+
+
+async def recommend_stream_events_inner(
+    req: RecommendRequest, deadline: Optional[Deadline] = None
+) -> AsyncIterator[str]:
+    top_n = max(1, min(req.top_n, 5))
+    _, shortlist = candidates_for(req)
+    weights = compute_weights(req)
+
+    # Adaylar skor beklemeden hemen gönderilir
+    yield sse_event(
+        "candidates",
+        {
+            "candidates": [
+                {
+                    "id": p["id"],
+                    "name": p["name"],
+                    "description": build_description(p, req),
+                    "price": p["price"],
+                }
+                for p in shortlist
+            ]
+        },
+    )
+
+    cache_key = scoring_cache_key(req, shortlist)
+    if req.scoring_mode == "fast":
+        scores_by_id = local_scores(req, shortlist)
+    else:
+        scores_by_id = cohort_scores(req, shortlist)
+        if scores_by_id is None:
+            scores_by_id = await get_cached_scores(cache_key)
+
+    stream_model, stream_timeout = SCORING_MODEL, OPENAI_TIMEOUT_S
+    if scores_by_id is None and deadline is not None:
+        # Süre bütçesine sığmıyorsa ucuz modele ya da (model None) yerel skorlara in
+        _, stream_model = scoring_strategies.choose(deadline.remaining() - DEADLINE_RESERVE_S)
+        stream_timeout = min(OPENAI_TIMEOUT_S, deadline.remaining() - DEADLINE_RESERVE_S)
+        if stream_model is not None and stream_model != SCORING_MODEL:
+            cache_key = scoring_cache_key(req, shortlist, stream_model)
+    if (
+        scores_by_id is None
+        and stream_model is not None
+        and openai_async_client is not None
+        and upstream.breaker.allow()
+    ):
+        # Stream upstream.call'dan geçmez (hedge bir stream'e uygulanamaz);
+        # sonuç ve süre upstream.record ile devre kesiciye ve gecikme
+        # penceresine, başarılı süre model seçicisine işlenir.
+        scores_by_id = {}
+        outcome = "cancelled"
+        started = time.monotonic()
+        try:
+            async for new_scores in stream_openai_scores(
+                req, shortlist, stream_timeout, stream_model
+            ):
+                scores_by_id.update(new_scores)
+                yield sse_event(
+                    "scores",
+                    {
+                        "scores": new_scores,
+                        "ranking": ranking_snapshot(shortlist, scores_by_id, weights, top_n),
+                    },
+                )
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            upstream_calls.inc(outcome="timeout")
+            logger.warning(
+                "OpenAI streaming %.1f sn içinde bitmedi, eksikler yerel skorla tamamlanıyor.",
+                stream_timeout,
+            )
+        except Exception as e:
+            outcome = "error"
+            upstream_calls.inc(outcome="error")
+            logger.warning(f"OpenAI streaming scoring failed, using local heuristic scores. Error: {e}")
+        finally:
+            # "cancelled": istemci bağlantıyı kesti; upstream hakkında bir şey öğrenmedik.
+            # Süre bütçesinin modelin beklenen süresinden kısa kestiği çağrı upstream hatası sayılmaz.
+            elapsed = time.monotonic() - started
+            upstream.record(
+                outcome, elapsed, timeout_is_failure=timeout_is_failure(stream_model, stream_timeout)
+            )
+            if outcome == "ok":
+                upstream_calls.inc(outcome="ok")
+                scoring_strategies.record(stream_model, elapsed)
+
+        missing = [p for p in shortlist if p["id"] not in scores_by_id]
+        if missing:
+            upstream_calls.inc(outcome="fallback")
+            scores_by_id.update(local_scores(req, missing))
+        else:
+            store_scores(cache_key, scores_by_id)
+    elif scores_by_id is None:
+        upstream_calls.inc(outcome="fallback")
+        scores_by_id = local_scores(req, shortlist)
+
+    results = build_results(req, shortlist, scores_by_id, weights, top_n)
+    session_id = ranking_sessions.create(
+        RankingSession(req, shortlist, scores_by_id, catalog_source.version)
+    )
+    yield sse_event("final", {"results": results, "session_id": session_id})
+
+
+@app.post("/recommend/stream")
+async def recommend_stream(req: RecommendRequest, request: Request):
+    """
+    /recommend'in SSE sürümü. Olaylar:
+    - candidates: bütçe filtresinden geçen adaylar ve açıklamaları (hemen)
+    - scores: LLM cevabından çözümlenen yeni skorlar + güncel sıralama
+    - final: /recommend ile aynı şekilde son top_n sonuç ve session_id
+    İstemci bağlantıyı kesince generator iptal edilir ve OpenAI stream'i kapanır.
+    X-Deadline-Ms / urgency politikası final olayının en geç zamanını belirler.
+    """
+    deadline = request_deadline(request, req)
+    return StreamingResponse(
+        recommend_stream_events(req, deadline),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/recommend/batch", response_model=BatchRecommendResponse)
+async def recommend_batch(reqs: List[RecommendRequest]):
+    """
+    Kurumsal / toplu hediye işleri için çoklu öneri.
+
+    Aynı profil + aday kümesi tek kez skorlanır, farklı profiller ortak LLM
+    çağrılarına paketlenir. Her öğe için ya results ya da error döner.
+    """
+    with requests_in_flight.track(endpoint="batch"):
+        return await recommend_batch_items(reqs)
+
+
+async def recommend_batch_items(reqs: List[RecommendRequest]) -> Response:
+    if len(reqs) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"En fazla {BATCH_MAX_ITEMS} alıcı gönderilebilir.",
+        )
+
+    prepared: dict = {}
+    errors: dict = {}
+    groups: dict = {}
+    local: dict = {}
+    for i, req in enumerate(reqs):
+        try:
+            _, shortlist = candidates_for(req)
+            if req.scoring_mode == "fast":
+                # Yerel skorlar mikro saniyeler sürer; gruplamaya / önbelleğe gerek yok
+                local[i] = local_scores(req, shortlist)
+                prepared[i] = (None, shortlist)
+                continue
+            table_scores = cohort_scores(req, shortlist)
+            if table_scores is not None:
+                local[i] = table_scores
+                prepared[i] = (None, shortlist)
+                continue
+            key = scoring_cache_key(req, shortlist)
+        except Exception as e:
+            logger.warning(f"Toplu öneri öğesi {i} hazırlanamadı: {e!r}")
+            errors[i] = str(e) or e.__class__.__name__
+            continue
+        prepared[i] = (key, shortlist)
+        groups.setdefault(key, (key, req, shortlist))
+
+    scores_by_key = {}
+    misses = []
+    for key, group in groups.items():
+        cached = await get_cached_scores(key)
+        if cached is not None:
+            scores_by_key[key] = cached
+        else:
+            misses.append(group)
+    scores_by_key.update(await score_groups_async(misses))
+
+    items: List[dict] = []
+    for i, req in enumerate(reqs):
+        if i in errors:
+            items.append({"index": i, "results": None, "error": errors[i]})
+            continue
+        key, shortlist = prepared[i]
+        try:
+            top_n = max(1, min(req.top_n, 5))
+            scores_by_id = local[i] if key is None else scores_by_key[key]
+            results = build_results(req, shortlist, scores_by_id, compute_weights(req), top_n)
+        except Exception as e:
+            logger.warning(f"Toplu öneri öğesi {i} başarısız: {e!r}")
+            items.append({"index": i, "results": None, "error": str(e) or e.__class__.__name__})
+            continue
+        items.append({"index": i, "results": results, "error": None})
+
+    logger.info(
+        "[GiftAI] Toplu öneri üretildi - items=%d, unique=%d, cache_hit=%d, errors=%d",
+        len(reqs),
+        len(groups),
+        len(groups) - len(misses),
+        len(errors),
+    )
+    return json_response({"items": items})
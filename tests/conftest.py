@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# main.py ve giftai/ repo kökünden import edilir
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,101 @@
+# tests/test_batch.py
+import asyncio
+
+import pytest
+
+from giftai.models import Recipient, RecommendRequest
+from giftai.ranking import NEUTRAL_SCORES
+
+main = pytest.importorskip("main")
+TestClient = pytest.importorskip("fastapi.testclient").TestClient
+
+
+def _groups(n: int) -> list:
+    products = list(main.get_catalog_index().all())[:3]
+    groups = []
+    for i in range(n):
+        req = RecommendRequest(
+            recipient=Recipient(age=20 + i, hobbies=["müzik"]),
+            purpose="dogum_gunu",
+            risk_level="normal",
+            urgency="flexible",
+        )
+        groups.append((f"key{i}", req, products))
+    return groups
+
+
+def test_failed_pack_falls_back_in_parallel_within_the_limit(monkeypatch):
+    limit = 3
+    running = 0
+    peak = 0
+
+    async def failing_pack(pack, timeout):
+        raise RuntimeError("paket başarısız")
+
+    async def score_alone(req, products, *args, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {p["id"]: dict(NEUTRAL_SCORES) for p in products}
+
+    monkeypatch.setattr(main, "openai_async_client", object())
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", limit)
+    monkeypatch.setattr(main, "request_openai_batch_scores_async", failing_pack)
+    monkeypatch.setattr(main, "call_openai_scoring_async", score_alone)
+
+    groups = _groups(9)
+    scores = asyncio.run(main.score_groups_async(groups))
+    assert set(scores) == {key for key, _, _ in groups}
+    # Tek paketteki profiller sırayla değil, sınıra kadar paralel skorlanır
+    assert peak == limit
+
+
+def _payload(age: int) -> dict:
+    return {
+        "recipient": {"age": age, "hobbies": ["müzik"]},
+        "purpose": "dogum_gunu",
+        "risk_level": "normal",
+        "urgency": "flexible",
+        "top_n": 2,
+    }
+
+
+def test_batch_reports_errors_per_item_and_scores_duplicates_once(monkeypatch):
+    candidates_for = main.candidates_for
+    scored_groups = []
+
+    def failing_for_age_99(req):
+        if req.recipient.age == 99:
+            raise ValueError("bozuk profil")
+        return candidates_for(req)
+
+    async def score_groups(groups):
+        scored_groups.extend(key for key, _, _ in groups)
+        return {key: main.local_scores(req, products) for key, req, products in groups}
+
+    monkeypatch.setattr(main, "candidates_for", failing_for_age_99)
+    monkeypatch.setattr(main, "score_groups_async", score_groups)
+    monkeypatch.setattr(main, "cohort_table", None)
+    monkeypatch.setattr(main, "score_cache", main.ScoreCache())
+    monkeypatch.setattr(main, "score_store", None)
+
+    response = TestClient(main.app).post(
+        "/recommend/batch", json=[_payload(30), _payload(99), _payload(30), _payload(45)]
+    )
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["index"] for item in items] == [0, 1, 2, 3]
+    assert items[1] == {"index": 1, "results": None, "error": "bozuk profil"}
+    for item in (items[0], items[2], items[3]):
+        assert item["error"] is None and len(item["results"]) == 2
+    assert items[0]["results"] == items[2]["results"]
+    # Aynı profil + aday kümesi tek grup olarak skorlanır
+    assert len(scored_groups) == 2
+
+
+def test_batch_rejects_too_many_items(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_ITEMS", 2)
+    response = TestClient(main.app).post("/recommend/batch", json=[_payload(30)] * 3)
+    assert response.status_code == 413
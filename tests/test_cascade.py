@@ -0,0 +1,120 @@
+# tests/test_cascade.py
+import asyncio
+
+import pytest
+
+from giftai.cascade import CascadeStats, rank_agreement, rank_margin
+from giftai.catalog_index import CatalogIndex
+from giftai.models import Recipient, RecommendRequest
+from giftai.resilience import CircuitBreaker, ResilientUpstream
+
+WEIGHTS = {"interest": 1.0, "emotion": 0.0, "budget": 0.0}
+
+
+def _products(n):
+    catalog = [{"id": f"p{i}", "category": "tech", "tags": []} for i in range(n)]
+    return list(CatalogIndex(catalog, [100.0] * n).all())
+
+
+def _scores(interests):
+    return {
+        f"p{i}": {"interest_score": v, "emotion_score": 0.5, "budget_score": 0.5}
+        for i, v in enumerate(interests)
+    }
+
+
+def test_margin_is_the_gap_between_rank_n_and_n_plus_one():
+    products = _products(5)
+    scores = _scores([0.9, 0.2, 0.7, 0.65, 0.1])
+    assert rank_margin(products, scores, WEIGHTS, 2) == pytest.approx(0.05)
+    assert rank_margin(products, scores, WEIGHTS, 1) == pytest.approx(0.2)
+    # Seçilecek küme zaten belli
+    assert rank_margin(products, scores, WEIGHTS, 5) is None
+
+
+def test_agreement_compares_top_n_sets_and_first_place():
+    products = _products(4)
+    first = _scores([0.9, 0.8, 0.1, 0.2])
+    assert rank_agreement(products, first, first, WEIGHTS, 2) == (1.0, True)
+    second = _scores([0.8, 0.1, 0.9, 0.2])
+    assert rank_agreement(products, first, second, WEIGHTS, 2) == (0.5, False)
+
+
+def test_stats_track_escalation_rate_and_agreement():
+    stats = CascadeStats()
+    stats.record_decision(0.01, True)
+    stats.record_decision(0.3, False)
+    stats.record_decision(None, False)
+    stats.record_agreement("escalated", 0.5, False)
+    snapshot = stats.snapshot()
+    assert snapshot["escalation_rate"] == pytest.approx(1 / 3)
+    assert snapshot["margin_mean"] == pytest.approx(0.155)
+    assert snapshot["agreement"]["escalated"] == {"samples": 1, "overlap_mean": 0.5, "top1_agreement": 0.0}
+    assert snapshot["agreement"]["shadow"]["samples"] == 0
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    """Yerel heuristik ilk kademe; pahalı model çağrıları sayılır."""
+    main = pytest.importorskip("main")
+    calls = []
+
+    async def nothing_stored(*args, **kwargs):
+        return None
+
+    async def expensive(req, products, cache_key, timeout=None, deadline=None):
+        calls.append(len(products))
+        return _scores([0.1] * (len(products) - 1) + [0.99])
+
+    monkeypatch.setattr(main, "CASCADE_FIRST_TIER", "heuristic")
+    monkeypatch.setattr(main, "CASCADE_MARGIN", 0.05)
+    monkeypatch.setattr(main, "CASCADE_SHADOW_RATE", 0.0)
+    monkeypatch.setattr(main, "cascade_stats", CascadeStats())
+    monkeypatch.setattr(main, "upstream", ResilientUpstream(CircuitBreaker()))
+    monkeypatch.setattr(main, "openai_async_client", object())
+    monkeypatch.setattr(main, "lookup_stored_scores", nothing_stored)
+    monkeypatch.setattr(main, "score_live_async", expensive)
+    return main, calls
+
+
+def _req() -> RecommendRequest:
+    return RecommendRequest(
+        recipient=Recipient(age=30, hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+    )
+
+
+def test_confident_first_tier_is_returned_without_escalating(cascade, monkeypatch):
+    main, calls = cascade
+    products = _products(4)
+    first = _scores([0.9, 0.2, 0.1, 0.1])
+    monkeypatch.setattr(main, "local_scores", lambda req, products: first)
+
+    assert asyncio.run(main.cascade_scoring_async(_req(), products, WEIGHTS, 1)) is first
+    assert calls == []
+    assert main.cascade_stats.snapshot()["escalated"] == 0
+
+
+def test_narrow_margin_escalates_to_the_expensive_model(cascade, monkeypatch):
+    main, calls = cascade
+    products = _products(4)
+    monkeypatch.setattr(main, "local_scores", lambda req, products: _scores([0.9, 0.88, 0.1, 0.1]))
+
+    scores = asyncio.run(main.cascade_scoring_async(_req(), products, WEIGHTS, 1))
+    assert calls == [4]
+    assert scores["p3"]["interest_score"] == 0.99
+    snapshot = main.cascade_stats.snapshot()
+    assert snapshot["escalated"] == 1
+    assert snapshot["agreement"]["escalated"] == {"samples": 1, "overlap_mean": 0.0, "top1_agreement": 0.0}
+
+
+def test_no_escalation_without_a_live_upstream(cascade, monkeypatch):
+    main, calls = cascade
+    monkeypatch.setattr(main, "openai_async_client", None)
+    products = _products(4)
+    monkeypatch.setattr(main, "local_scores", lambda req, products: _scores([0.9, 0.88, 0.1, 0.1]))
+
+    asyncio.run(main.cascade_scoring_async(_req(), products, WEIGHTS, 1))
+    assert calls == []
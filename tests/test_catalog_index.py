@@ -0,0 +1,47 @@
+# tests/test_catalog_index.py
+import random
+
+from giftai.catalog_index import CatalogIndex
+
+TAGS = ["müzik", "retro", "kitap", "spa", "kahve", "ofis", "anı", "yoga"]
+
+
+def synthetic_catalog(n: int, seed: int = 3):
+    rng = random.Random(seed)
+    catalog = [
+        {"id": f"p{i}", "category": "tech", "tags": rng.sample(TAGS, rng.randint(0, 3))}
+        for i in range(n)
+    ]
+    prices = [float(rng.randint(1, 100) * 50) for _ in range(n)]
+    return catalog, prices
+
+
+def test_tag_lookup_matches_linear_scan():
+    catalog, prices = synthetic_catalog(500)
+    index = CatalogIndex(catalog, prices)
+    rng = random.Random(5)
+    assert set(index.tags()) <= set(TAGS)
+    for _ in range(50):
+        wanted = set(rng.sample(TAGS + ["yok"], rng.randint(1, 3)))
+        expected = [i for i, p in enumerate(catalog) if wanted & set(p["tags"])]
+        assert index.ids_with_tags(wanted) == expected
+
+
+def test_budget_and_tag_filter_matches_linear_scan():
+    catalog, prices = synthetic_catalog(500)
+    index = CatalogIndex(catalog, prices)
+    rng = random.Random(6)
+    for _ in range(50):
+        wanted = set(rng.sample(TAGS, 2))
+        budget_min, budget_max = sorted(rng.sample(range(100, 5000, 100), 2))
+        low, high = CatalogIndex.budget_bounds(budget_min, budget_max)
+        expected = [
+            p["id"]
+            for i, p in enumerate(catalog)
+            if wanted & set(p["tags"]) and low <= prices[i] <= high
+        ]
+        got = index.filter(budget_min, budget_max, tags=wanted)
+        assert [p["id"] for p in got] == expected
+        assert sorted(p["id"] for p in index.filter(budget_min, budget_max)) == sorted(
+            p["id"] for i, p in enumerate(catalog) if low <= prices[i] <= high
+        )
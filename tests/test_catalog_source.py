@@ -0,0 +1,204 @@
+# tests/test_catalog_source.py
+import csv
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_source import PRODUCT_FIELDS, CatalogSource, load_catalog
+
+RECORDS = [
+    {
+        "id": "a1",
+        "name": "Plak Çalar",
+        "category": "music",
+        "base_price": 1200,
+        "tags": ["müzik", "retro"],
+        "base_description": "Ahşap kasalı pikap",
+    },
+    {
+        "id": "a2",
+        "name": "Kupa",
+        "category": "home",
+        "base_price": 149.9,
+        "tags": ["ev"],
+        "base_description": "Seramik kupa",
+    },
+]
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _write_csv(path, records):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({**record, "tags": "|".join(record["tags"])})
+
+
+def _write_sqlite(path, records):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"CREATE TABLE products ({', '.join(PRODUCT_FIELDS)})")
+        conn.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?)",
+            [(*(r[f] for f in PRODUCT_FIELDS[:4]), json.dumps(r["tags"]), r["base_description"]) for r in records],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _touch(path, seconds):
+    # Aynı boyutta yeniden yazılan dosyada da damga değişsin
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.mark.parametrize(
+    "name, writer",
+    [("katalog.jsonl", _write_jsonl), ("katalog.csv", _write_csv), ("katalog.sqlite", _write_sqlite)],
+)
+def test_every_format_loads_the_same_products(tmp_path, name, writer):
+    path = str(tmp_path / name)
+    writer(path, RECORDS)
+    products = load_catalog(path)
+    assert [[p[f] for f in PRODUCT_FIELDS] for p in products] == [
+        ["a1", "Plak Çalar", "music", 1200, ("müzik", "retro"), "Ahşap kasalı pikap"],
+        ["a2", "Kupa", "home", 149.9, ("ev",), "Seramik kupa"],
+    ]
+    # Etiket string'leri ürünler arasında paylaşılır
+    other = load_catalog(path)
+    assert products[0].tags[0] is other[0].tags[0]
+
+
+@pytest.mark.parametrize(
+    "records, message",
+    [
+        ([{**RECORDS[0], "name": ""}], "eksik alan"),
+        ([{**RECORDS[0], "base_price": "bedava"}], "Geçersiz base_price"),
+        ([RECORDS[0], RECORDS[0]], "tekrarlanan"),
+        ([], "boş"),
+    ],
+)
+def test_invalid_catalogs_are_rejected(tmp_path, records, message):
+    path = str(tmp_path / "katalog.jsonl")
+    _write_jsonl(path, records)
+    with pytest.raises(ValueError, match=message):
+        load_catalog(path)
+
+
+def test_broken_json_line_and_unknown_extension_are_rejected(tmp_path):
+    path = tmp_path / "katalog.jsonl"
+    path.write_text(json.dumps(RECORDS[0]) + "\n{bozuk\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=":2 geçerli JSON değil"):
+        load_catalog(str(path))
+    with pytest.raises(ValueError, match="Desteklenmeyen"):
+        load_catalog(str(tmp_path / "katalog.xml"))
+
+
+def test_reload_swaps_state_and_malformed_file_keeps_the_old_one(tmp_path):
+    path = str(tmp_path / "katalog.jsonl")
+    _write_jsonl(path, RECORDS[:1])
+    _touch(path, 1)
+    source = CatalogSource(path=path, poll_interval_s=0)
+    first = source.state
+    assert not source.check_reload()  # dosya değişmedi
+
+    _write_jsonl(path, RECORDS)
+    _touch(path, 2)
+    assert source.check_reload()
+    reloaded = source.state
+    assert reloaded is not first and len(reloaded.catalog) == 2
+    assert reloaded.version != first.version
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{bozuk\n")
+    _touch(path, 3)
+    assert not source.check_reload()
+    assert source.state is reloaded
+    stats = source.stats()
+    assert stats["reloads"] == 1 and stats["reload_errors"] == 1
+    assert "geçerli JSON değil" in stats["last_error"]
+    # Aynı bozuk dosya her turda yeniden denenmez
+    assert not source.check_reload()
+    assert source.stats()["reload_errors"] == 1
+
+
+def test_price_bucket_rollover_does_not_rebuild_on_request_path(monkeypatch):
+    built = []
+    build_bucket = CatalogSource._build_bucket
+
+    def recording(state, bucket):
+        built.append(bucket)
+        return build_bucket(state, bucket)
+
+    monkeypatch.setattr(CatalogSource, "_build_bucket", staticmethod(recording))
+    clock = FakeClock(1000.0)
+    source = CatalogSource(default_catalog=PRODUCT_CATALOG, bucket_s=60, poll_interval_s=0, clock=clock)
+    first = source.index()
+    bucket = source.state.price_snapshot.bucket
+    assert not source.check_prices()
+    assert built == [bucket + 1]  # sonraki dilim önceden hazırlanır
+
+    clock.now += 60
+    # Dilim değişti ama istek yolu hiçbir şey kurmaz
+    assert source.index() is first
+    assert source.check_prices()
+    # Geçişte yeni dilim kurulmaz, sadece bir sonraki hazırlanır
+    assert built == [bucket + 1, bucket + 2]
+    assert source.state.price_snapshot.bucket == bucket + 1
+    assert source.index().snapshot_key != first.snapshot_key
+
+
+def test_skipped_buckets_are_built_for_the_current_bucket():
+    clock = FakeClock(1000.0)
+    source = CatalogSource(default_catalog=PRODUCT_CATALOG, bucket_s=60, poll_interval_s=0, clock=clock)
+    source.check_prices()
+    clock.now += 600
+    assert source.check_prices()
+    assert source.state.price_snapshot.bucket == int(clock.now // 60)
+
+
+def test_watcher_thread_picks_up_file_changes_and_price_buckets(tmp_path):
+    path = str(tmp_path / "katalog.jsonl")
+    _write_jsonl(path, RECORDS[:1])
+    _touch(path, 1)
+    clock = FakeClock(1000.0)
+    source = CatalogSource(path=path, bucket_s=60, poll_interval_s=0.01, clock=clock)
+    try:
+        first = source.index()
+        clock.now += 60
+        assert _wait_until(lambda: source.index() is not first)
+        assert source.stats()["price_refreshes"] == 1
+
+        _write_jsonl(path, RECORDS)
+        _touch(path, 2)
+        assert _wait_until(lambda: source.stats()["reloads"] == 1)
+        assert len(source.catalog) == 2
+    finally:
+        source.close()
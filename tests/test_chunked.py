@@ -0,0 +1,32 @@
+# tests/test_chunked.py
+import asyncio
+
+from giftai.chunked import OUTPUT_TOKENS_OVERHEAD, OUTPUT_TOKENS_PER_ITEM, score_in_chunks
+from giftai.prompt import COMPACT_OUTPUT_TOKENS_PER_ITEM
+
+
+def test_retry_chunks_use_the_same_tokens_per_item():
+    assert COMPACT_OUTPUT_TOKENS_PER_ITEM != OUTPUT_TOKENS_PER_ITEM
+    per_chunk = 10
+    max_output_tokens = OUTPUT_TOKENS_OVERHEAD + COMPACT_OUTPUT_TOKENS_PER_ITEM * per_chunk
+    products = [{"id": f"p{i}"} for i in range(per_chunk)]
+    chunk_sizes = []
+
+    async def score_chunk(chunk):
+        chunk_sizes.append(len(chunk))
+        if len(chunk_sizes) == 1:
+            raise RuntimeError("ilk deneme başarısız")
+        return {p["id"]: {} for p in chunk}
+
+    scores_by_id, failed = asyncio.run(
+        score_in_chunks(
+            score_chunk,
+            products,
+            max_output_tokens,
+            retries=1,
+            tokens_per_item=COMPACT_OUTPUT_TOKENS_PER_ITEM,
+        )
+    )
+    assert not failed and len(scores_by_id) == per_chunk
+    # İlk geçiş ve tekrar aynı parça boyutuyla planlanır
+    assert chunk_sizes == [per_chunk, per_chunk]
@@ -0,0 +1,123 @@
+# tests/test_cohorts.py
+import json
+
+import numpy as np
+import pytest
+
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_index import CatalogIndex
+from giftai.catalog_source import compact_catalog, content_version
+from giftai.cohorts import (
+    COHORT_COUNT,
+    DIMENSIONS,
+    CohortScoreTable,
+    cohort_of,
+    cohort_request,
+    meta_path,
+)
+from giftai.models import Recipient, RecommendRequest
+from giftai.pricing import PriceSnapshot
+from giftai.ranking import SCORE_FIELDS
+
+
+def _req(**recipient) -> RecommendRequest:
+    return RecommendRequest(
+        recipient=Recipient(age=30, relationship="friend", **recipient),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+    )
+
+
+def test_cohort_request_round_trips():
+    for cohort in range(COHORT_COUNT):
+        assert cohort_of(cohort_request(cohort)) == cohort
+
+
+def test_gender_is_a_cohort_axis_not_a_personal_detail():
+    unknown = cohort_of(_req())
+    assert unknown is not None
+    # Streamlit formunun gönderdiği değerler
+    assert cohort_of(_req(gender="bilmiyorum / söylemek istemiyorum")) == unknown
+    woman, man = cohort_of(_req(gender="Kadın")), cohort_of(_req(gender="erkek"))
+    assert None not in (woman, man)
+    assert len({unknown, woman, man}) == 3
+    assert cohort_of(_req(gender="belirsiz")) is None
+
+
+def test_personal_details_need_live_scoring():
+    assert cohort_of(_req(hobbies=["müzik"])) is None
+    assert cohort_of(_req(style_tags=["retro"])) is None
+
+
+def _catalog_index():
+    catalog = compact_catalog(PRODUCT_CATALOG)
+    return catalog, CatalogIndex(catalog, PriceSnapshot(catalog).prices())
+
+
+def _write_table(tmp_path, catalog, version=None):
+    path = str(tmp_path / "cohorts.npy")
+    table = np.zeros((COHORT_COUNT, len(catalog), len(SCORE_FIELDS)), dtype=np.uint8)
+    # Her ürünün skoru kendi sırasından türetilir; okunan satır kontrol edilebilir
+    for j in range(len(catalog)):
+        table[:, j] = (j * 10, 255 - j * 10, 51)
+    np.save(path, table)
+    meta = {
+        "ids": [p["id"] for p in catalog],
+        "catalog_version": version or content_version(catalog),
+        "dimensions": {k: list(v) for k, v in DIMENSIONS.items()},
+        "source": "local",
+    }
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return path, meta
+
+
+def test_table_rows_follow_catalog_index_and_budget_is_recomputed(tmp_path):
+    catalog, index = _catalog_index()
+    path, _ = _write_table(tmp_path, catalog)
+    table = CohortScoreTable.load(path)
+    products = list(index.all())[::-1]
+
+    scores = table.scores_for(_req(), products)
+    for p in products:
+        j = p.index
+        assert scores[p["id"]] == pytest.approx(
+            {"interest_score": j * 10 / 255, "emotion_score": 1 - j * 10 / 255, "budget_score": 0.2}
+        )
+
+    budgeted = table.scores_for(_req().model_copy(update={"budget_min": 0, "budget_max": 1}), products)
+    assert all(sc["budget_score"] < 0.2 for sc in budgeted.values())
+    assert budgeted[products[0]["id"]]["interest_score"] == scores[products[0]["id"]]["interest_score"]
+
+    assert table.scores_for(_req(hobbies=["müzik"]), products) is None
+    assert table.stats()["hits"] == 2
+
+
+def test_load_rejects_tables_built_for_other_dimensions_or_catalogs(tmp_path):
+    catalog, _ = _catalog_index()
+    path, meta = _write_table(tmp_path, catalog)
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump({**meta, "dimensions": {**meta["dimensions"], "gender": ["bilinmiyor"]}}, f)
+    with pytest.raises(ValueError, match="boyutları"):
+        CohortScoreTable.load(path)
+
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump({**meta, "ids": meta["ids"][:-1]}, f)
+    with pytest.raises(ValueError, match="meta ile uyuşmuyor"):
+        CohortScoreTable.load(path)
+
+
+def test_service_ignores_a_table_from_another_catalog_version(tmp_path, monkeypatch):
+    main = pytest.importorskip("main")
+    products = list(main.get_catalog_index().all())
+    catalog = main.catalog_source.catalog
+
+    path, _ = _write_table(tmp_path, catalog, version="eski-surum")
+    monkeypatch.setattr(main, "cohort_table", CohortScoreTable.load(path))
+    assert main.cohort_scores(_req(), products) is None
+
+    path, _ = _write_table(tmp_path, catalog, version=main.catalog_source.version)
+    monkeypatch.setattr(main, "cohort_table", CohortScoreTable.load(path))
+    scores = main.cohort_scores(_req(), products)
+    assert scores is not None and set(scores) == {p["id"] for p in products}
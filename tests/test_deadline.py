@@ -0,0 +1,69 @@
+# tests/test_deadline.py
+import asyncio
+
+import pytest
+
+from giftai.deadline import Deadline, StrategySelector
+from giftai.models import Recipient, RecommendRequest
+from giftai.resilience import OPEN, CircuitBreaker, ResilientUpstream
+
+
+def test_fits_expected_uses_prior_until_enough_samples():
+    selector = StrategySelector([("full", "big", 3.0)], min_samples=2)
+    assert selector.fits_expected("big", 3.5)
+    assert not selector.fits_expected("big", 1.0)
+    selector.record("big", 0.5)
+    selector.record("big", 0.5)
+    assert selector.fits_expected("big", 1.0)
+    # Bilinmeyen model: timeout her zaman anlamlı
+    assert selector.fits_expected("other", 0.01)
+
+
+class _HangingResponses:
+    async def create(self, **kwargs):
+        await asyncio.sleep(3600)
+
+
+class _HangingClient:
+    responses = _HangingResponses()
+
+
+def test_breaker_opens_on_timeouts_under_default_deadline_policy(monkeypatch):
+    main = pytest.importorskip("main")
+    # Varsayılan süreler 50 kat kısaltılmış (DEADLINE_RESERVE_S hariç): flexible
+    # bütçesi OPENAI_TIMEOUT_S'ye eşit, yani her çağrının timeout'u deadline'a göre kısalır
+    scale = 0.02
+    monkeypatch.setattr(main, "OPENAI_TIMEOUT_S", main.OPENAI_TIMEOUT_S * scale)
+    monkeypatch.setattr(
+        main, "scoring_strategies",
+        StrategySelector(
+            [(name, model, prior * scale) for name, model, prior in main.scoring_strategies.models],
+            margin_s=main.scoring_strategies.margin_s * scale,
+        ),
+    )
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout_s=30.0)
+    monkeypatch.setattr(main, "upstream", ResilientUpstream(breaker))
+    monkeypatch.setattr(main, "openai_async_client", _HangingClient())
+
+    products = list(main.get_catalog_index().all())
+    for attempt in range(10):
+        if breaker.state == OPEN:
+            break
+        req = RecommendRequest(
+            recipient=Recipient(age=30, hobbies=["müzik"]),
+            purpose="dogum_gunu",
+            risk_level="normal",
+            urgency="flexible",
+            free_text=f"deneme {attempt}",
+        )
+        deadline = Deadline(main.DEADLINE_POLICY[req.urgency] * scale)
+        asyncio.run(main.call_openai_scoring_async(req, products, deadline=deadline))
+    assert breaker.state == OPEN
+
+
+def test_deadline_cut_below_expected_latency_is_not_a_failure():
+    main = pytest.importorskip("main")
+    prior = main.scoring_strategies.expected_s(main.SCORING_MODEL, main.FULL_MODEL_EXPECTED_S)
+    assert not main.timeout_is_failure(main.SCORING_MODEL, prior / 2)
+    assert main.timeout_is_failure(main.SCORING_MODEL, prior)
+    assert main.timeout_is_failure(main.SCORING_MODEL, main.OPENAI_TIMEOUT_S)
@@ -0,0 +1,71 @@
+# tests/test_disk_cache.py
+import asyncio
+import threading
+
+from giftai.disk_cache import SQLiteScoreStore
+
+SCORES = {"p1": {"interest_score": 0.5, "emotion_score": 0.6, "budget_score": 0.7}}
+
+
+def test_get_async_reads_pending_and_flushed_entries(tmp_path):
+    store = SQLiteScoreStore(str(tmp_path / "scores.db"), flush_interval_s=60)
+    try:
+        store.set("k", SCORES)
+        assert asyncio.run(store.get_async("k")) == SCORES
+        store.flush()
+        assert store.stats()["pending_writes"] == 0
+        assert asyncio.run(store.get_async("k")) == SCORES
+        assert asyncio.run(store.get_async("yok")) is None
+        assert (store.hits, store.misses) == (2, 1)
+    finally:
+        store.close()
+
+
+def test_entries_survive_a_restart_until_ttl(tmp_path):
+    path = str(tmp_path / "scores.db")
+    store = SQLiteScoreStore(path, flush_interval_s=60)
+    store.set("k", SCORES)
+    store.close()
+
+    reopened = SQLiteScoreStore(path, flush_interval_s=60)
+    assert reopened.get("k") == SCORES
+    reopened.close()
+    expired = SQLiteScoreStore(path, ttl_s=0, flush_interval_s=60)
+    assert expired.get("k") is None
+    expired.close()
+
+
+def test_hit_and_miss_counters_are_exact_under_threads(tmp_path):
+    store = SQLiteScoreStore(str(tmp_path / "scores.db"), flush_interval_s=60)
+    store.set("k", SCORES)
+    lookups = 2000
+
+    def worker():
+        for i in range(lookups):
+            store.get("k" if i % 2 else "yok")
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = store.stats()
+    store.close()
+    assert stats["hits"] + stats["misses"] == 4 * lookups
+    assert stats["hits"] == stats["misses"]
+
+
+def test_oldest_entries_are_evicted_over_max_entries(tmp_path):
+    store = SQLiteScoreStore(str(tmp_path / "scores.db"), max_entries=3, flush_interval_s=60)
+    try:
+        for i in range(3):
+            store.set(f"k{i}", SCORES)
+            store.flush()
+        store.set("k3", SCORES)
+        store.flush()
+        assert store.get("k0") is None
+        assert all(store.get(f"k{i}") == SCORES for i in range(1, 4))
+        assert store.stats()["evictions"] == 1
+        assert store.stats()["approx_size"] == 3
+    finally:
+        store.close()
@@ -0,0 +1,55 @@
+# tests/test_embeddings.py
+import json
+
+import numpy as np
+
+from giftai.catalog import PRODUCT_CATALOG
+from giftai.catalog_source import compact_catalog, content_version
+from giftai.embeddings import CatalogEmbeddings, HashingEmbedder, build_catalog_embeddings, meta_path
+
+
+def test_sidecar_matches_only_the_same_catalog_content(tmp_path):
+    catalog = compact_catalog(PRODUCT_CATALOG)
+    path = str(tmp_path / "emb.npy")
+    build_catalog_embeddings(catalog, path)
+    embeddings = CatalogEmbeddings.load(path)
+    assert embeddings.matches_catalog(content_version(catalog))
+
+    # Aynı id'ler, düzeltilmiş açıklama: matris artık bu kataloğu temsil etmiyor
+    records = [dict(r) for r in PRODUCT_CATALOG]
+    records[0]["base_description"] += " (yeni)"
+    edited = compact_catalog(records)
+    assert [p["id"] for p in edited] == embeddings.ids
+    assert not embeddings.matches_catalog(content_version(edited))
+
+
+def test_sidecar_without_catalog_version_never_matches(tmp_path):
+    catalog = compact_catalog(PRODUCT_CATALOG)
+    path = str(tmp_path / "emb.npy")
+    build_catalog_embeddings(catalog, path)
+    with open(meta_path(path), encoding="utf-8") as f:
+        meta = json.load(f)
+    del meta["catalog_version"]
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    assert not CatalogEmbeddings.load(path).matches_catalog(content_version(catalog))
+
+
+def test_inflected_words_land_near_their_stem():
+    embedder = HashingEmbedder()
+    stem = embedder.embed("fotoğraf")
+    assert abs(float(np.linalg.norm(stem)) - 1.0) < 1e-6
+    assert float(embedder.embed("fotoğrafçılık") @ stem) > float(embedder.embed("yoga") @ stem)
+
+
+def test_similarities_rank_the_matching_product_first(tmp_path):
+    catalog = compact_catalog(PRODUCT_CATALOG)
+    path = str(tmp_path / "emb.npy")
+    build_catalog_embeddings(catalog, path)
+    embeddings = CatalogEmbeddings.load(path)
+    assert embeddings.similarities(["", "  "]) is None
+
+    sims = embeddings.similarities(["fotoğrafçılık"])
+    assert sims.shape == (len(catalog),)
+    best = catalog[int(np.argmax(sims))]
+    assert any("fotoğraf" in tag for tag in best["tags"])
@@ -0,0 +1,47 @@
+# tests/test_engine.py
+from giftai.catalog_index import CatalogIndex
+from giftai.engine import SCORING_MAX_OUTPUT_TOKENS, plan_scoring_chunks, select_candidates
+from giftai.models import Recipient, RecommendRequest
+from giftai.prompt import estimate_output_tokens
+
+
+def _index(n: int) -> CatalogIndex:
+    catalog = [
+        {"id": f"p{i}", "category": "tech", "tags": ["müzik"] if i % 3 == 0 else ["ofis"]}
+        for i in range(n)
+    ]
+    return CatalogIndex(catalog, [float(100 + 10 * i) for i in range(n)])
+
+
+def _req(**kwargs) -> RecommendRequest:
+    return RecommendRequest(
+        recipient=Recipient(hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+        **kwargs,
+    )
+
+
+def test_select_candidates_shortlists_budget_matches():
+    index = _index(120)
+    req = _req(budget_min=300, budget_max=900)
+    filtered, shortlist = select_candidates(index, req, 10)
+    low, high = CatalogIndex.budget_bounds(300, 900)
+    assert filtered and all(low <= p["price"] <= high for p in filtered)
+    assert len(shortlist) == 10
+    assert {p["id"] for p in shortlist} <= {p["id"] for p in filtered}
+    assert all("müzik" in p["tags"] for p in shortlist)
+
+
+def test_select_candidates_without_prerank_keeps_every_candidate():
+    index = _index(50)
+    filtered, shortlist = select_candidates(index, _req(), 0)
+    assert [p["id"] for p in shortlist] == [p["id"] for p in filtered]
+
+
+def test_scoring_chunks_fit_the_output_budget():
+    products = [{"id": f"p{i}"} for i in range(100)]
+    chunks = plan_scoring_chunks(products)
+    assert [p for chunk in chunks for p in chunk] == products
+    assert all(estimate_output_tokens(len(chunk)) <= SCORING_MAX_OUTPUT_TOKENS for chunk in chunks)
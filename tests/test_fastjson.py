@@ -0,0 +1,72 @@
+# tests/test_fastjson.py
+import json
+
+import numpy as np
+import pytest
+
+from giftai import fastjson
+from giftai.models import Recipient, RecommendRequest, RecommendResponse
+
+DATA = {"results": [{"name": "Plak Çalar", "price": 1200.5, "scores": {"i": 0.25}}], "session_id": None}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_is_compact_utf8_with_or_without_orjson(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fastjson, "orjson", None)
+    raw = fastjson.dumps(DATA)
+    assert isinstance(raw, bytes)
+    assert "Plak Çalar".encode("utf-8") in raw and b", " not in raw and b": " not in raw
+    assert fastjson.loads(raw) == DATA
+    assert json.loads(raw) == DATA
+
+
+def _request(**overrides) -> RecommendRequest:
+    fields = {
+        "recipient": Recipient(age=30, hobbies=["müzik"]),
+        "purpose": "dogum_gunu",
+        "risk_level": "normal",
+        "urgency": "flexible",
+        "scoring_mode": "fast",
+        **overrides,
+    }
+    return RecommendRequest(**fields)
+
+
+def test_build_results_match_the_response_schema():
+    main = pytest.importorskip("main")
+    req = _request()
+    products = list(main.get_catalog_index().all())
+    scores = main.local_scores(req, products)
+    # numpy skaleri gelse de çıktı düz float olmalı
+    first = products[0]["id"]
+    scores[first] = {k: np.float32(v) for k, v in scores[first].items()}
+    results = main.build_results(req, products, scores, main.compute_weights(req), 3)
+
+    assert len(results) == 3
+    finals = [r["final_score"] for r in results]
+    assert finals == sorted(finals, reverse=True)
+    assert all(type(v) is float for r in results for v in r["scores"].values())
+    validated = RecommendResponse.model_validate({"results": results, "session_id": "s"})
+    assert validated.model_dump()["results"] == json.loads(fastjson.dumps(results))
+
+
+def test_recommend_endpoint_body_validates_against_the_response_model(monkeypatch):
+    main = pytest.importorskip("main")
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    monkeypatch.setattr(main, "cohort_table", None)
+    body = {
+        "recipient": {"age": 30, "hobbies": ["müzik"]},
+        "purpose": "dogum_gunu",
+        "risk_level": "normal",
+        "urgency": "flexible",
+        "top_n": 2,
+        "scoring_mode": "fast",
+    }
+    response = TestClient(main.app).post("/recommend", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    parsed = RecommendResponse.model_validate_json(response.content)
+    assert len(parsed.results) == 2 and parsed.session_id
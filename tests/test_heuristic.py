@@ -0,0 +1,61 @@
+# tests/test_heuristic.py
+import asyncio
+
+import pytest
+
+from giftai.heuristic import NO_BUDGET_SIGNAL, NO_INTEREST_SIGNAL, budget_score, heuristic_scores
+from giftai.models import Recipient, RecommendRequest
+
+
+def _product(pid, category, tags, price):
+    return {"id": pid, "category": category, "tags": tags, "price": price}
+
+
+def test_scores_stay_in_range_and_follow_the_signals():
+    products = [
+        _product("a", "music", ["müzik", "retro"], 800.0),
+        _product("b", "corporate", ["ofis", "kurumsal"], 800.0),
+        _product("c", "memory", ["anı", "romantik"], 5000.0),
+    ]
+    scores = heuristic_scores(products, ["müzik"], ["retro"], "romantik", 500, 1000)
+    assert set(scores) == {"a", "b", "c"}
+    for sc in scores.values():
+        assert all(0.0 <= v <= 1.0 for v in sc.values())
+    assert scores["a"]["interest_score"] > scores["b"]["interest_score"]
+    # Romantik tonda ofis ürünü duygusal olarak geride kalır
+    assert scores["c"]["emotion_score"] > scores["b"]["emotion_score"]
+    assert scores["a"]["budget_score"] == 1.0 > scores["c"]["budget_score"]
+
+
+def test_missing_signals_use_neutral_defaults():
+    scores = heuristic_scores([_product("a", "tech", ["teknoloji"], 300.0)], [], [], "nötr", None, None)
+    assert scores["a"]["interest_score"] == NO_INTEREST_SIGNAL
+    assert scores["a"]["budget_score"] == NO_BUDGET_SIGNAL
+
+
+def test_budget_score_decays_with_distance_from_the_range():
+    inside = budget_score(500, 400, 600, "tech", "nötr")
+    near = budget_score(650, 400, 600, "tech", "nötr")
+    far = budget_score(1100, 400, 600, "tech", "nötr")
+    assert inside == 1.0 > near > far
+    assert budget_score(2000, 400, 600, "tech", "nötr") == 0.0
+
+
+def test_fast_mode_never_reaches_upstream(monkeypatch):
+    main = pytest.importorskip("main")
+
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("fast modda upstream çağrılmamalı")
+
+    monkeypatch.setattr(main, "openai_async_client", object())
+    monkeypatch.setattr(main, "request_openai_scores_async", unexpected)
+    req = RecommendRequest(
+        recipient=Recipient(age=30, hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+        scoring_mode="fast",
+    )
+    products = list(main.get_catalog_index().all())
+    scores = asyncio.run(main.call_openai_scoring_async(req, products))
+    assert scores == main.local_scores(req, products)
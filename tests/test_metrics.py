@@ -0,0 +1,76 @@
+# tests/test_metrics.py
+import pytest
+
+from giftai.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_help_type_and_sorted_samples():
+    registry = MetricsRegistry()
+    calls = registry.counter("giftai_calls_total", "Çağrılar", ["outcome"])
+    in_flight = registry.gauge("giftai_in_flight", "Süren istekler")
+    calls.inc(outcome="timeout")
+    calls.inc(2, outcome="ok")
+    with in_flight.track():
+        assert in_flight.value() == 1
+    in_flight.inc(0.5)
+
+    assert registry.render() == (
+        "# HELP giftai_calls_total Çağrılar\n"
+        "# TYPE giftai_calls_total counter\n"
+        'giftai_calls_total{outcome="ok"} 2\n'
+        'giftai_calls_total{outcome="timeout"} 1\n'
+        "# HELP giftai_in_flight Süren istekler\n"
+        "# TYPE giftai_in_flight gauge\n"
+        "giftai_in_flight 0.5\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    registry = MetricsRegistry()
+    stage = registry.histogram("giftai_stage_seconds", "Aşama süresi", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        stage.observe(value, stage="openai")
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'giftai_stage_seconds_bucket{stage="openai",le="0.1"} 2',
+        'giftai_stage_seconds_bucket{stage="openai",le="1"} 3',
+        'giftai_stage_seconds_bucket{stage="openai",le="+Inf"} 4',
+        'giftai_stage_seconds_sum{stage="openai"} 3.65',
+        'giftai_stage_seconds_count{stage="openai"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("giftai_x_total", "x", ["reason"])
+    counter.inc(reason='a"b\\c\nd')
+    assert 'giftai_x_total{reason="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_wrong_labels_and_duplicate_names_are_rejected():
+    registry = MetricsRegistry()
+    counter = registry.counter("giftai_y_total", "y", ["outcome"])
+    with pytest.raises(ValueError):
+        counter.inc(stage="openai")
+    with pytest.raises(ValueError):
+        registry.gauge("giftai_y_total", "tekrar")
+
+
+def test_collectors_run_before_each_render():
+    registry = MetricsRegistry()
+    size = registry.gauge("giftai_cache_size", "Önbellek boyutu")
+    source = {"size": 3}
+    registry.add_collector(lambda: size.set(source["size"]))
+    assert "giftai_cache_size 3\n" in registry.render()
+    source["size"] = 7
+    assert "giftai_cache_size 7\n" in registry.render()
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    main = pytest.importorskip("main")
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE giftai_stage_seconds histogram" in response.text
@@ -0,0 +1,61 @@
+# tests/test_prerank.py
+from giftai.catalog_index import CatalogIndex
+from giftai.prerank import PrerankStats, prerank, recall_at_n
+
+WEIGHTS = {"interest": 0.5, "emotion": 0.3, "budget": 0.2}
+
+
+def test_ties_keep_catalog_order_not_price_order():
+    # Katalog sırası fiyatın tersi: bütçe filtresi en ucuzdan başlayarak döner
+    catalog = [{"id": f"p{i}", "category": "tech", "tags": ["ofis"]} for i in range(10)]
+    index = CatalogIndex(catalog, [float(1000 - 50 * i) for i in range(10)])
+    candidates = list(index.filter_budget(None, None))
+    assert candidates[0]["id"] == "p9"
+
+    shortlist = prerank(candidates, [], [], "nötr", 3)
+    assert [p["id"] for p in shortlist] == ["p0", "p1", "p2"]
+
+
+def test_matching_products_outrank_ties():
+    catalog = [{"id": f"p{i}", "category": "tech", "tags": ["müzik"] if i == 7 else ["ofis"]} for i in range(10)]
+    index = CatalogIndex(catalog, [100.0] * 10)
+    shortlist = prerank(list(index.all()), ["müzik"], [], "nötr", 3)
+    assert [p["id"] for p in shortlist] == ["p7", "p0", "p1"]
+
+
+def test_small_candidate_sets_and_disabled_prerank_are_not_cut():
+    index = CatalogIndex([{"id": f"p{i}", "category": "tech", "tags": []} for i in range(5)], [100.0] * 5)
+    products = list(index.all())
+    assert prerank(products, ["müzik"], [], "nötr", 5) == products
+    assert prerank(products, ["müzik"], [], "nötr", 0) == products
+
+
+def test_semantic_similarity_breaks_keyword_ties():
+    index = CatalogIndex([{"id": f"p{i}", "category": "tech", "tags": []} for i in range(6)], [100.0] * 6)
+    products = list(index.all())
+    semantic = [0.0, 0.1, 0.0, 0.9, -0.5, 0.3]
+    shortlist = prerank(products, [], [], "nötr", 2, semantic=semantic)
+    assert [p["id"] for p in shortlist] == ["p3", "p5"]
+
+
+def _scores(interest):
+    return {"interest_score": interest, "emotion_score": 0.5, "budget_score": 0.5}
+
+
+def test_recall_counts_true_top_n_found_in_the_shortlist():
+    full = {f"p{i}": _scores(i / 10) for i in range(10)}
+    assert recall_at_n(["p9", "p8", "p7"], full, WEIGHTS, 3) == 1.0
+    assert recall_at_n(["p9", "p0", "p1"], full, WEIGHTS, 3) == 1 / 3
+    assert recall_at_n([], {}, WEIGHTS, 3) is None
+
+
+def test_stats_track_shortlisting_and_recall():
+    stats = PrerankStats()
+    stats.record_shortlist(100, 20)
+    stats.record_shortlist(10, 10)
+    stats.record_recall(1.0)
+    stats.record_recall(0.5)
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 2 and snapshot["shortlisted"] == 1
+    assert snapshot["avg_candidates_in"] == 55 and snapshot["avg_candidates_out"] == 15
+    assert snapshot["recall_mean"] == 0.75 and snapshot["recall_min"] == 0.5
@@ -0,0 +1,112 @@
+# tests/test_prompt.py
+import json
+import random
+
+import pytest
+
+from giftai.models import Recipient, RecommendRequest
+from giftai.prompt import (
+    COMPACT_OUTPUT_TOKENS_PER_ITEM,
+    NAME_MAX_CHARS,
+    PACKED_PROFILE_OUTPUT_TOKENS,
+    PackedScoringPrompt,
+    ScoringPrompt,
+    estimate_output_tokens,
+    estimate_tokens,
+)
+
+
+def _product(pid: str) -> dict:
+    return {"id": pid, "name": f"Ürün {pid}", "category": "hobi", "base_price": 100.0, "tags": ["müzik"]}
+
+
+def _req(age: int) -> RecommendRequest:
+    return RecommendRequest(
+        recipient=Recipient(age=age, hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+    )
+
+
+def test_decode_drops_rows_that_do_not_match_the_schema():
+    prompt = ScoringPrompt(_req(30), [_product("a"), _product("b"), _product("c")])
+    scores = prompt.decode(
+        [
+            {"id": "0", "i": 0.8, "e": 1.4, "b": 0.5},
+            {"id": "1", "i": "yüksek", "e": 0.5, "b": 0.5},
+            {"id": "9", "i": 0.5, "e": 0.5, "b": 0.5},
+            "0",
+        ]
+    )
+    assert scores == {"a": {"interest_score": 0.8, "emotion_score": 1.0, "budget_score": 0.5}}
+
+
+def test_packed_prompt_shares_the_product_table_across_profiles():
+    shared, own = _product("shared"), _product("own")
+    prompt = PackedScoringPrompt([("k0", _req(30), [shared]), ("k1", _req(40), [shared, own])])
+    user_content = prompt.input[-1]["content"]
+    assert user_content.count("|Ürün shared|") == 1
+    assert "\np0|0|" in user_content and "\np1|0,1|" in user_content
+    assert prompt.output_tokens > 0
+
+
+def test_packed_decode_only_accepts_each_profiles_own_products():
+    prompt = PackedScoringPrompt([("k0", _req(30), [_product("a")]), ("k1", _req(40), [_product("b")])])
+    row = {"i": 0.5, "e": 0.5, "b": 0.5}
+    scores = prompt.decode(
+        [
+            {"profile": "p0", "scores": [dict(row, id="0"), dict(row, id="1")]},
+            {"profile": "p1", "scores": [dict(row, id="1")]},
+            {"profile": "p7", "scores": [dict(row, id="0")]},
+            {"profile": "p1", "scores": "yok"},
+        ]
+    )
+    assert set(scores) == {"k0", "k1"}
+    assert set(scores["k0"]) == {"a"}
+    assert set(scores["k1"]) == {"b"}
+
+
+def test_profile_cells_cannot_break_the_table_and_empty_fields_are_omitted():
+    req = RecommendRequest(
+        recipient=Recipient(age=30, hobbies=["müzik", "kitap"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+        budget_max=500.0,
+        free_text="kahve|çay;\nsever",
+    )
+    product = dict(_product("a"), name="x" * (NAME_MAX_CHARS + 10) + "|son")
+    user_content = ScoringPrompt(req, [product]).input[-1]["content"]
+    profile, header, row = user_content.split("\n")
+    assert profile == (
+        "age=30;purpose=dogum_gunu;risk=normal;urgency=flexible;"
+        "hobbies=müzik,kitap;budget_max=500;note=kahve/çay, sever"
+    )
+    assert header == "id|name|category|price|tags"
+    assert row == f"0|{'x' * NAME_MAX_CHARS}|hobi|100|müzik"
+
+
+def test_token_estimates_grow_with_the_prompt_and_output_rows():
+    assert estimate_tokens("") == 1 and estimate_tokens("abcde") == 2
+    small = ScoringPrompt(_req(30), [_product("a")])
+    large = ScoringPrompt(_req(30), [_product(str(i)) for i in range(10)])
+    assert large.input_tokens > small.input_tokens
+    assert large.output_tokens - small.output_tokens == 9 * COMPACT_OUTPUT_TOKENS_PER_ITEM
+    packed = PackedScoringPrompt([("k0", _req(30), [_product("a")]), ("k1", _req(40), [_product("a")])])
+    assert packed.output_tokens == 2 * (PACKED_PROFILE_OUTPUT_TOKENS + estimate_output_tokens(1))
+
+
+def test_mock_upstream_answers_decode_back_to_every_product():
+    mock = pytest.importorskip("bench.mock_openai")
+    rng = random.Random(1)
+    products = [_product(str(i)) for i in range(5)]
+    single = ScoringPrompt(_req(30), products)
+    text = mock.build_output_text({"input": single.input}, rng)
+    assert set(single.decode(json.loads(text)["scores"])) == {p["id"] for p in products}
+
+    packed = PackedScoringPrompt([("k0", _req(30), products[:3]), ("k1", _req(40), products[2:])])
+    text = mock.build_output_text({"input": packed.input}, rng)
+    scores = packed.decode(json.loads(text)["results"])
+    assert set(scores["k0"]) == {"0", "1", "2"}
+    assert set(scores["k1"]) == {"2", "3", "4"}
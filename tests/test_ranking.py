@@ -0,0 +1,24 @@
+# tests/test_ranking.py
+import random
+
+import numpy as np
+
+from giftai.ranking import top_n_indices
+
+
+def _stable_top_n(values, n):
+    return sorted(range(len(values)), key=lambda i: values[i], reverse=True)[:n]
+
+
+def test_ties_at_boundary_keep_input_order():
+    scores = np.array([0.5] * 20 + [0.9])
+    assert top_n_indices(scores, 3).tolist() == [20, 0, 1]
+
+
+def test_matches_stable_sort():
+    rng = random.Random(7)
+    for _ in range(200):
+        # Az sayıda farklı değer: sınırda bol eşitlik
+        values = [rng.choice([0.1, 0.3, 0.5, 0.7]) for _ in range(rng.randint(1, 30))]
+        n = rng.randint(0, 35)
+        assert top_n_indices(np.array(values), n).tolist() == _stable_top_n(values, n)
@@ -0,0 +1,138 @@
+# tests/test_resilience.py
+import asyncio
+
+import pytest
+
+from giftai.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, ResilientUpstream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_record_feeds_breaker_and_latency_for_calls_outside_call():
+    clock = FakeClock()
+    upstream = ResilientUpstream(CircuitBreaker(failure_threshold=2, reset_timeout_s=10, clock=clock))
+
+    assert upstream.breaker.allow()
+    upstream.record("ok", 0.4)
+    assert len(upstream.latency) == 1 and upstream.latency.quantile(0.5) == 0.4
+
+    # Süre bütçesinin kısa kestiği timeout hata sayılmaz
+    upstream.record("timeout", timeout_is_failure=False)
+    upstream.record("error")
+    assert upstream.breaker.state == CLOSED
+    upstream.record("timeout")
+    assert upstream.breaker.state == OPEN
+    assert upstream.stats()["calls"] == 4
+    assert upstream.stats()["timeouts"] == 2 and upstream.stats()["failures"] == 1
+    # Başarısız çağrılar gecikme penceresine girmez
+    assert len(upstream.latency) == 1
+
+
+def test_cancelled_record_returns_the_half_open_probe():
+    clock = FakeClock()
+    upstream = ResilientUpstream(CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=clock))
+    upstream.breaker.allow()
+    upstream.record("error")
+    clock.now = 10
+    assert upstream.breaker.state == HALF_OPEN
+
+    assert upstream.breaker.allow()
+    assert not upstream.breaker.allow()
+    upstream.record("cancelled")
+    assert upstream.breaker.state == HALF_OPEN
+    assert upstream.breaker.allow()
+    upstream.record("ok", 0.1)
+    assert upstream.breaker.state == CLOSED
+
+
+def test_breaker_opens_after_threshold_and_probes_once_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=30, clock=clock)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()  # başarı ardışık sayacı sıfırlar
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    # Yarı açıkken başarısız deneme devreyi hemen yeniden açar
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened_count"] == 2
+    assert breaker.stats()["rejected"] == 2
+
+
+def test_open_breaker_rejects_without_calling_upstream():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    upstream = ResilientUpstream(breaker)
+    calls = 0
+
+    async def factory():
+        nonlocal calls
+        calls += 1
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(upstream.call(factory, 1.0))
+    assert calls == 0
+
+
+def test_hedge_fires_after_p95_and_the_faster_copy_wins():
+    upstream = ResilientUpstream(
+        CircuitBreaker(), hedge_enabled=True, hedge_min_samples=5, hedge_min_delay_s=0.01
+    )
+    for _ in range(5):
+        upstream.latency.record(0.02)
+    assert upstream.hedge_delay() == 0.02
+    attempts = 0
+
+    async def factory():
+        nonlocal attempts
+        attempts += 1
+        # İlk istek takılır, hedge kopyası hızlı döner
+        await asyncio.sleep(1.0 if attempts == 1 else 0.01)
+        return attempts
+
+    assert asyncio.run(upstream.call(factory, 2.0)) == 2
+    stats = upstream.stats()
+    assert stats["hedges_sent"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_no_hedge_before_enough_samples_or_when_disabled_per_call():
+    upstream = ResilientUpstream(CircuitBreaker(), hedge_enabled=True, hedge_min_samples=5)
+    assert upstream.hedge_delay() is None
+    for _ in range(5):
+        upstream.latency.record(0.001)
+
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "tek"
+
+    assert asyncio.run(upstream.call(slow, 2.0, hedge=False)) == "tek"
+    assert upstream.stats()["hedges_sent"] == 0
+
+
+def test_timeout_counts_as_failure_only_when_asked():
+    async def hang():
+        await asyncio.sleep(1.0)
+
+    upstream = ResilientUpstream(CircuitBreaker(failure_threshold=1))
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(upstream.call(hang, 0.01, timeout_is_failure=False))
+    assert upstream.breaker.state == CLOSED
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(upstream.call(hang, 0.01))
+    assert upstream.breaker.state == OPEN
@@ -0,0 +1,85 @@
+# tests/test_score_cache.py
+import asyncio
+
+import pytest
+
+from giftai.models import Recipient, RecommendRequest
+from giftai.score_cache import ScoreCache, make_cache_key
+
+SCORES = {"p1": {"interest_score": 0.5, "emotion_score": 0.6, "budget_score": 0.7}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ScoreCache(max_size=10, ttl_s=60, clock=clock)
+    cache.set("k", SCORES)
+    clock.now = 59
+    assert cache.get("k") is SCORES
+    clock.now = 60
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ScoreCache(max_size=2, ttl_s=60)
+    cache.set("a", SCORES)
+    cache.set("b", SCORES)
+    assert cache.get("a") is SCORES  # "a" artık en yeni
+    cache.set("c", SCORES)
+    assert cache.get("b") is None
+    assert cache.get("a") is SCORES and cache.get("c") is SCORES
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ScoreCache(max_size=0)
+    cache.set("k", SCORES)
+    assert len(cache) == 0 and cache.get("k") is None
+
+
+def test_key_ignores_profile_formatting_and_candidate_order():
+    a = make_cache_key({"hobbies": ["Müzik ", "kahve"], "free_text": ""}, ["p2", "p1"])
+    b = make_cache_key({"hobbies": ["kahve", "müzik", "kahve"], "free_text": None}, ["p1", "p2", "p1"])
+    assert a == b
+    assert a != make_cache_key({"hobbies": ["kahve"], "free_text": None}, ["p1", "p2"])
+    assert a != make_cache_key({"hobbies": ["kahve", "müzik"], "free_text": None}, ["p1"])
+
+
+def test_partial_fallback_results_are_not_cached(monkeypatch):
+    main = pytest.importorskip("main")
+    products = list(main.get_catalog_index().all())[:4]
+    req = RecommendRequest(
+        recipient=Recipient(age=30, hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+    )
+
+    async def half_scored(req, chunk, timeout, model=main.SCORING_MODEL):
+        # Her parçada ilk ürün hiç skorlanmaz (kesilmiş cevap)
+        return {p["id"]: dict(SCORES["p1"]) for p in chunk[1:]}
+
+    monkeypatch.setattr(main, "request_openai_scores_async", half_scored)
+    monkeypatch.setattr(main, "score_cache", ScoreCache())
+    monkeypatch.setattr(main, "score_store", None)
+
+    key = main.scoring_cache_key(req, products)
+    scores = asyncio.run(main.score_uncached_async(req, products, lambda: 1.0, key))
+    assert set(scores) == {p["id"] for p in products}
+    assert main.score_cache.get(key) is None
+
+    async def fully_scored(req, chunk, timeout, model=main.SCORING_MODEL):
+        return {p["id"]: dict(SCORES["p1"]) for p in chunk}
+
+    monkeypatch.setattr(main, "request_openai_scores_async", fully_scored)
+    asyncio.run(main.score_uncached_async(req, products, lambda: 1.0, key))
+    assert main.score_cache.get(key) is not None
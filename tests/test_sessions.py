@@ -0,0 +1,152 @@
+# tests/test_sessions.py
+import pytest
+
+from giftai.catalog_index import CatalogIndex
+from giftai.models import Recipient, RecommendRequest
+from giftai.sessions import RankingSession, SessionStore
+
+
+def _products(prices):
+    catalog = [{"id": f"p{i}", "category": "tech", "tags": []} for i in range(len(prices))]
+    return list(CatalogIndex(catalog, prices).all())
+
+
+def _req(budget_min=None, budget_max=None) -> RecommendRequest:
+    return RecommendRequest(
+        recipient=Recipient(age=30, hobbies=["müzik"]),
+        purpose="dogum_gunu",
+        risk_level="normal",
+        urgency="flexible",
+        budget_min=budget_min,
+        budget_max=budget_max,
+    )
+
+
+def _scores(products):
+    return {
+        p["id"]: {"interest_score": 0.9, "emotion_score": 0.8, "budget_score": 0.1} for p in products
+    }
+
+
+def test_apply_keeps_llm_scores_and_recomputes_budget_score():
+    products = _products([300.0, 500.0, 700.0])
+    session = RankingSession(_req(200, 800), products, _scores(products))
+    assert not session.budget_rescored()
+
+    req, candidates, scores_by_id = session.apply(budget_min=600, budget_max=800, top_n=1)
+    assert req.top_n == 1 and session.budget_rescored()
+    assert [p["id"] for p in candidates] == ["p1", "p2"]
+    for p in candidates:
+        assert scores_by_id[p["id"]]["interest_score"] == 0.9
+        assert scores_by_id[p["id"]]["emotion_score"] == 0.8
+        assert scores_by_id[p["id"]]["budget_score"] != 0.1
+
+    # Skorlanan bütçeye dönünce orijinal skorlar aynen kullanılır
+    _, _, scores_by_id = session.apply(budget_min=200, budget_max=800)
+    assert not session.budget_rescored()
+    assert scores_by_id["p0"]["budget_score"] == 0.1
+
+
+def test_budget_outside_the_scored_range_is_not_covered():
+    products = _products([300.0, 500.0, 700.0])
+    session = RankingSession(_req(200, 800), products, _scores(products))
+    assert session.covers_budget(300, 600)
+    assert not session.covers_budget(200, 2000)
+    assert not session.covers_budget(None, 800)
+
+
+def test_fallback_to_the_whole_catalog_covers_any_budget():
+    # Bütçeye uyan ürün yoktu; tüm katalog skorlandı
+    products = _products([300.0, 500.0])
+    session = RankingSession(_req(5000, 9000), products, _scores(products))
+    assert session.covers_budget(None, None)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _session(n=2):
+    products = _products([100.0] * n)
+    return RankingSession(_req(), products, _scores(products))
+
+
+def test_store_expires_sessions_and_refreshes_ttl_on_access():
+    clock = FakeClock()
+    store = SessionStore(ttl_s=10, clock=clock)
+    kept, dropped = store.create(_session()), store.create(_session())
+    clock.now = 8
+    assert store.get(kept) is not None  # erişim TTL'i yeniler
+    clock.now = 12
+    assert store.get(dropped) is None
+    assert store.get(kept) is not None
+    assert store.get("yok") is None
+    stats = store.stats()
+    assert stats["sessions"] == 1 and stats["expirations"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+
+def test_store_evicts_least_recently_used_within_session_and_candidate_limits():
+    store = SessionStore(max_sessions=2, max_candidates=5)
+    first, second = store.create(_session()), store.create(_session())
+    store.get(first)
+    third = store.create(_session())
+    # second en uzun süredir kullanılmayan
+    assert store.get(second) is None
+    assert store.get(first) is not None and store.get(third) is not None
+
+    big = store.create(_session(4))
+    # Toplam aday sınırı (5) için iki eski oturum da atılır
+    assert len(store) == 1 and store.get(big) is not None
+    assert store.stats()["candidates"] == 4 and store.stats()["evictions"] == 3
+
+    assert store.create(_session(6)) is None
+    assert SessionStore(max_sessions=0).create(_session()) is None
+
+
+def test_apply_rejects_fields_that_change_the_scores():
+    session = _session()
+    with pytest.raises(ValueError, match="purpose"):
+        session.apply(purpose="romantik")
+
+
+def _recommend_body(**fields) -> dict:
+    return {
+        "recipient": {"age": 30, "hobbies": ["müzik"]},
+        "purpose": "dogum_gunu",
+        "risk_level": "normal",
+        "urgency": "flexible",
+        "scoring_mode": "fast",
+        **fields,
+    }
+
+
+def test_rerank_endpoint_reuses_the_session_and_refuses_unscored_budgets(monkeypatch):
+    main = pytest.importorskip("main")
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    monkeypatch.setattr(main, "cohort_table", None)
+    monkeypatch.setattr(main, "ranking_sessions", SessionStore())
+    client = TestClient(main.app)
+
+    first = client.post("/recommend", json=_recommend_body(budget_min=1000, budget_max=5000, top_n=3)).json()
+    session_id = first["session_id"]
+    assert session_id
+
+    same = client.post(f"/recommend/{session_id}/rerank", json={}).json()
+    assert same["results"] == first["results"] and same["budget_rescored"] is False
+
+    narrowed = client.post(
+        f"/recommend/{session_id}/rerank", json={"budget_min": 1500, "budget_max": 4000, "top_n": 1}
+    )
+    assert narrowed.status_code == 200
+    body = narrowed.json()
+    assert len(body["results"]) == 1 and body["budget_rescored"] is True
+    assert body["session_id"] == session_id
+
+    widened = client.post(f"/recommend/{session_id}/rerank", json={"budget_max": None})
+    assert widened.status_code == 409
+    assert client.post("/recommend/yok/rerank", json={}).status_code == 404
@@ -0,0 +1,101 @@
+# tests/test_singleflight.py
+import asyncio
+
+import pytest
+
+from giftai.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        # İş bitince anahtar silinir; sonraki çağrı yeni bir iş başlatır
+        await flights.do("k", work)
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+    assert calls == 2
+    assert all(r is results[0] for r in results)
+    assert flights.stats() == {"in_flight": 0, "leaders": 2, "coalesced": 4}
+
+
+def test_errors_reach_every_waiter():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream")
+
+    async def scenario():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+        return flights, results
+
+    flights, results = asyncio.run(scenario())
+    assert [type(r) for r in results] == [RuntimeError] * 3
+    assert flights.in_flight() == 0
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call_running():
+    cancelled = False
+
+    async def work():
+        nonlocal cancelled
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "sonuç"
+
+    async def scenario():
+        flights = SingleFlight()
+        leaver = asyncio.ensure_future(flights.do("k", work))
+        stayer = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        leaver.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaver
+        return await stayer
+
+    assert asyncio.run(scenario()) == "sonuç"
+    assert not cancelled
+
+
+def test_shared_call_is_cancelled_when_every_waiter_leaves():
+    started = 0
+    cancelled = False
+
+    async def work():
+        nonlocal started, cancelled
+        started += 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        return "geç"
+
+    async def quick():
+        return "yeni"
+
+    async def scenario():
+        flights = SingleFlight()
+        waiters = [asyncio.ensure_future(flights.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        # Terk edilmiş iş yeniden kullanılmaz
+        return await flights.do("k", quick)
+
+    assert asyncio.run(scenario()) == "yeni"
+    assert started == 1 and cancelled
@@ -0,0 +1,80 @@
+# tests/test_streaming.py
+import json
+import random
+
+import pytest
+
+from giftai.streaming import IncrementalScoreParser, sse_event
+
+TEXT = json.dumps(
+    {
+        "scores": [
+            {"id": "0", "i": 0.8, "e": 0.7, "b": 0.9},
+            {"id": "1", "i": 0.1, "e": 0.2, "b": 0.3, "note": "{ \"kapanmayan } parantez"},
+            {"id": "2", "i": 0.5, "e": 0.5, "b": 0.5},
+        ]
+    },
+    ensure_ascii=False,
+)
+EXPECTED = json.loads(TEXT)["scores"]
+
+
+def _feed_in_chunks(text, cuts):
+    parser = IncrementalScoreParser()
+    items = []
+    bounds = [0] + sorted(cuts) + [len(text)]
+    for start, stop in zip(bounds, bounds[1:]):
+        items.extend(parser.feed(text[start:stop]))
+    return items
+
+
+def test_every_single_split_point_yields_the_same_items():
+    for cut in range(len(TEXT) + 1):
+        assert _feed_in_chunks(TEXT, [cut]) == EXPECTED
+
+
+def test_random_chunking_yields_items_as_soon_as_they_close():
+    rng = random.Random(3)
+    for _ in range(200):
+        cuts = rng.sample(range(1, len(TEXT)), rng.randint(1, 20))
+        assert _feed_in_chunks(TEXT, cuts) == EXPECTED
+
+    parser = IncrementalScoreParser()
+    first_end = TEXT.index("}") + 1
+    assert parser.feed(TEXT[:first_end]) == EXPECTED[:1]
+
+
+def test_objects_without_id_or_invalid_json_are_skipped():
+    parser = IncrementalScoreParser()
+    text = '{"scores": [{"i": 0.5}, {"id": "3", "i": tru}, {"id": "4", "i": 0.1}]}'
+    assert parser.feed(text) == [{"id": "4", "i": 0.1}]
+
+
+def test_sse_event_format():
+    assert sse_event("final", {"a": "ş"}) == 'event: final\ndata: {"a":"ş"}\n\n'
+
+
+def test_stream_endpoint_emits_candidates_then_final(monkeypatch):
+    main = pytest.importorskip("main")
+    TestClient = pytest.importorskip("fastapi.testclient").TestClient
+    monkeypatch.setattr(main, "cohort_table", None)
+    body = {
+        "recipient": {"age": 30, "hobbies": ["müzik"]},
+        "purpose": "dogum_gunu",
+        "risk_level": "normal",
+        "urgency": "flexible",
+        "top_n": 2,
+        "scoring_mode": "fast",
+    }
+    response = TestClient(main.app).post("/recommend/stream", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [name for name, _ in events] == ["candidates", "final"]
+    final = events[-1][1]
+    assert len(final["results"]) == 2
+    candidate_names = {c["name"] for c in events[0][1]["candidates"]}
+    assert {r["name"] for r in final["results"]} <= candidate_names